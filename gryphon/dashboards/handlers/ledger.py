@@ -58,7 +58,7 @@ class LedgerHandler(AdminBaseHandler, StartAndEndTimeMixin):
             currency = currency.upper()
 
         exchange_name = exchange_name.capitalize()
-        exchange = exchange_factory.make_exchange_from_key(exchange_name)
+        exchange = exchange_factory.shared_exchange_from_key(exchange_name)
         exchange_data = exchange_factory.make_exchange_data_from_key(
             exchange_name,
             self.trading_db,
@@ -37,6 +37,7 @@ def get_assets_series(db, start_time, end_time):
         end_time=start_time,
         include_pending=True,
         exchange_names=account_keys,
+        use_checkpoints=True,
     )
 
     assets_series = []
@@ -0,0 +1,45 @@
+"""Make metric (metric_type, timestamp) unique
+
+Revision ID: 7b3e9d04a1c6
+Revises: None
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '7b3e9d04a1c6'
+down_revision = None
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    # Overlapping metric_series_generator runs could write the same metric twice. Keep
+    # the latest copy of each, which is the one Metric.get_as_pandas already used.
+    op.execute("""
+        DELETE older FROM metric older
+        JOIN metric newer
+            ON newer.metric_type = older.metric_type
+            AND newer.timestamp = older.timestamp
+            AND newer.metric_id > older.metric_id
+    """)
+
+    op.drop_index('idx_metric_type_timestamp', 'metric')
+
+    op.create_index(
+        'idx_metric_type_timestamp',
+        'metric',
+        ['metric_type', 'timestamp'],
+        unique=True,
+    )
+
+
+def downgrade():
+    op.drop_index('idx_metric_type_timestamp', 'metric')
+
+    op.create_index(
+        'idx_metric_type_timestamp',
+        'metric',
+        ['metric_type', 'timestamp'],
+    )
@@ -10,3 +10,16 @@ EXCHANGE_VOLUME_BINDING_KEY = '*.exchange_volume.tinker'
 TRADES_QUEUE_OLD = 'trades'
 ORDERBOOK_QUEUE_OLD = 'orderbook'
 EXCHANGE_VOLUME_QUEUE_OLD = 'exchange_volume'
+
+# Batching for the trades and orderbook consumers: a batch is written once it holds
+# CONSUMER_BATCH_SIZE messages or its oldest message is CONSUMER_BATCH_INTERVAL
+# seconds old, whichever comes first.
+CONSUMER_BATCH_SIZE = 500
+CONSUMER_BATCH_INTERVAL = 0.5
+
+# Where the orderbook consumer writes books: the orderbook table's JSON rows, the
+# orderbook_segment table's keyframe + delta segments (see gryphon.lib.orderbook_history)
+# or both. Set with the ORDERBOOK_STORAGE environment variable.
+ORDERBOOK_STORAGE_JSON = 'json'
+ORDERBOOK_STORAGE_SEGMENTS = 'segments'
+ORDERBOOK_STORAGE_BOTH = 'both'
@@ -2,12 +2,12 @@ import pyximport; pyximport.install()
 
 import json
 import os
-import subprocess
 
 from delorean import epoch
 from raven import Client
 
 from gryphon.data_service.consts import *
+from gryphon.data_service.heartbeat import HeartbeatTicker
 from gryphon.data_service.queue_consumer import QueueConsumer
 from gryphon.lib import session
 from gryphon.lib.models.emeraldhavoc.exchange_volume import ExchangeVolume
@@ -16,11 +16,13 @@ from gryphon.lib.money import Money
 
 s = Client(dsn=os.environ.get('SENTRY_DSN'))
 
+heartbeat = HeartbeatTicker('monit/heartbeat/exchange_volumes_consumer.txt')
 
-def exchange_volumes_consumer_function(message, db):
-    subprocess.call(['touch', 'monit/heartbeat/exchange_volumes_consumer.txt'])
 
+def exchange_volumes_consumer_function(message, db):
     exchange_volume_json = json.loads(message)
+    heartbeat.record(timestamp=float(exchange_volume_json['timestamp']))
+
     timestamp = epoch(exchange_volume_json['timestamp']).datetime
     exchange = exchange_volume_json['exchange_name']
     exch_vol_money = Money(exchange_volume_json['volume'], 'BTC')
@@ -0,0 +1,86 @@
+"""
+In-process heartbeats for the data service consumers.
+
+Monit watches the mtime of files in monit/heartbeat/. Touching those files by forking
+`touch` for every message caps a consumer at a few hundred messages a second, so
+instead HeartbeatTicker counts messages in memory and rewrites its file at most once
+every interval seconds. The file contents are a small JSON object with the consumer's
+throughput and lag, for anything that wants more than the mtime.
+"""
+
+import json
+import time
+
+from gryphon.lib.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_HEARTBEAT_INTERVAL = 5  # Seconds.
+
+
+class HeartbeatTicker(object):
+    def __init__(self, path, interval=DEFAULT_HEARTBEAT_INTERVAL):
+        self.path = path
+        self.interval = interval
+
+        self.message_count = 0
+        self.lag = None
+
+        self.last_beat_time = 0
+        self.last_beat_message_count = 0
+        self.messages_per_second = 0
+
+    def record(self, count=1, timestamp=None):
+        """
+        Record count successfully processed messages. If given, timestamp is the epoch
+        time of the newest message and is used to report the consumer's lag.
+        """
+        self.message_count += count
+
+        if timestamp is not None:
+            self.lag = time.time() - timestamp
+
+        self.tick()
+
+    def tick(self):
+        """
+        Beat if we've processed anything since the last beat and the interval has
+        passed. Safe to call as often as you like, e.g. from a timer so that counts
+        from the end of a burst still get written out.
+        """
+        now = time.time()
+
+        if now - self.last_beat_time < self.interval:
+            return
+
+        if self.message_count == self.last_beat_message_count:
+            return
+
+        self.beat(now)
+
+    def beat(self, now=None):
+        if now is None:
+            now = time.time()
+
+        elapsed = now - self.last_beat_time
+        new_messages = self.message_count - self.last_beat_message_count
+
+        if self.last_beat_time and elapsed > 0:
+            self.messages_per_second = new_messages / elapsed
+
+        self.last_beat_time = now
+        self.last_beat_message_count = self.message_count
+
+        try:
+            with open(self.path, 'w') as f:
+                f.write(json.dumps(self.stats()))
+        except (IOError, OSError):
+            logger.exception('Could not write heartbeat file %s' % self.path)
+
+    def stats(self):
+        return {
+            'timestamp': self.last_beat_time,
+            'message_count': self.message_count,
+            'messages_per_second': self.messages_per_second,
+            'lag_seconds': self.lag,
+        }
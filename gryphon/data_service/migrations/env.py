@@ -26,6 +26,7 @@ sys.path.append(lib_path)
 
 from gryphon.lib.models.emeraldhavoc.base import EmeraldHavocBase
 from gryphon.lib.models.emeraldhavoc.orderbook import Orderbook
+from gryphon.lib.models.emeraldhavoc.orderbook_segment import OrderbookSegment
 from gryphon.lib.models.emeraldhavoc.trade import Trade
 from gryphon.lib.models.emeraldhavoc.exchange_volume import ExchangeVolume
 
@@ -0,0 +1,45 @@
+"""Add orderbook_segment
+
+Revision ID: 5d8e2a91c3f0
+Revises: 2c7cc7d09efe
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '5d8e2a91c3f0'
+down_revision = '2c7cc7d09efe'
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+def upgrade():
+    op.create_table('orderbook_segment',
+    sa.Column('orderbook_segment_id', sa.Integer(), nullable=False),
+    sa.Column('unique_id', sa.Unicode(length=64), nullable=False),
+    sa.Column('time_created', sa.DateTime(), nullable=False),
+    sa.Column('exchange', sa.Unicode(length=64), nullable=False),
+    sa.Column('start_time', mysql.DATETIME(fsp=6), nullable=False),
+    sa.Column('end_time', mysql.DATETIME(fsp=6), nullable=False),
+    sa.Column('book_count', sa.Integer(), nullable=False),
+    sa.Column('data', sa.LargeBinary(length=2147483648), nullable=False),
+    sa.PrimaryKeyConstraint('orderbook_segment_id')
+    )
+
+    op.create_index(
+        'idx_exchange_start_time',
+        'orderbook_segment',
+        ['exchange', 'start_time'],
+    )
+
+    op.create_index(
+        'idx_exchange_end_time',
+        'orderbook_segment',
+        ['exchange', 'end_time'],
+    )
+
+
+def downgrade():
+    op.drop_table('orderbook_segment')
@@ -1,24 +1,32 @@
 import pyximport; pyximport.install()
+from collections import OrderedDict
+from datetime import datetime
 import json
 import os
-import subprocess
+import uuid
 
 from delorean import epoch
 from raven import Client
 
 import gryphon.data_service.consts as consts
+from gryphon.data_service.heartbeat import HeartbeatTicker
 from gryphon.data_service.queue_consumer import QueueConsumer
 from gryphon.lib import session
 from gryphon.lib.models.emeraldhavoc.orderbook import Orderbook
+from gryphon.lib.orderbook_history import OrderbookHistoryWriter
 
 
 s = Client(dsn=os.environ.get('SENTRY_DSN'))
 
+heartbeat = HeartbeatTicker('monit/heartbeat/orderbook_consumer.txt')
+
+storage = os.environ.get('ORDERBOOK_STORAGE', consts.ORDERBOOK_STORAGE_JSON)
+history_writer = OrderbookHistoryWriter()
 
-def orderbook_consumer_function(message, db):
-    subprocess.call(["touch", "monit/heartbeat/orderbook_consumer.txt"])
 
+def orderbook_consumer_function(message, db):
     ob = json.loads(message)
+    heartbeat.record(timestamp=float(ob['timestamp']))
 
     assert len(ob.keys()) == 2
 
@@ -36,18 +44,66 @@ def orderbook_consumer_function(message, db):
     session.commit_mysql_session(db)
 
 
+def orderbook_row(ob):
+    """Builds a row for a bulk insert into the orderbook table from a decoded message."""
+    assert len(ob.keys()) == 2
+
+    exchange_name = list(set(ob.keys()) - set(['timestamp'])).pop()
+    orderbook_data = ob[exchange_name]
+
+    return {
+        'unique_id': unicode(uuid.uuid4().hex),
+        'time_created': datetime.utcnow(),
+        'timestamp': epoch(ob['timestamp']).datetime,
+        'exchange': exchange_name,
+        'bids': json.dumps(orderbook_data['bids'], ensure_ascii=False),
+        'asks': json.dumps(orderbook_data['asks'], ensure_ascii=False),
+    }
+
+
+def orderbook_batch_consumer_function(messages, db):
+    """
+    Writes a batch of orderbooks with a single multi-row insert, and/or appends them to
+    their exchanges' segments, in one transaction.
+    """
+    obs = [json.loads(message) for message in messages]
+
+    heartbeat.record(len(obs), timestamp=max(float(ob['timestamp']) for ob in obs))
+
+    if storage in [consts.ORDERBOOK_STORAGE_JSON, consts.ORDERBOOK_STORAGE_BOTH]:
+        rows = [orderbook_row(ob) for ob in obs]
+
+        db.execute(Orderbook.__table__.insert().values(rows))
+
+    if storage in [consts.ORDERBOOK_STORAGE_SEGMENTS, consts.ORDERBOOK_STORAGE_BOTH]:
+        exchange_books = OrderedDict()
+
+        for ob in obs:
+            exchange_name = list(set(ob.keys()) - set(['timestamp'])).pop()
+            book = (float(ob['timestamp']), ob[exchange_name])
+
+            exchange_books.setdefault(exchange_name, []).append(book)
+
+        for exchange_name, books in exchange_books.iteritems():
+            history_writer.write(db, exchange_name, books)
+
+    session.commit_mysql_session(db)
+
+
 def main():
     db = session.get_a_gds_db_mysql_session()
 
     try:
         orderbook_consumer = QueueConsumer(
             os.environ.get('AMPQ_ADDRESS'),
-            orderbook_consumer_function,
+            orderbook_batch_consumer_function,
             db,
             consts.EXCHANGE,
             consts.EXCHANGE_TYPE,
             consts.ORDERBOOK_BINDING_KEY,
             consts.ORDERBOOK_QUEUE,
+            batch_size=consts.CONSUMER_BATCH_SIZE,
+            batch_interval=consts.CONSUMER_BATCH_INTERVAL,
         )
 
         orderbook_consumer.run()
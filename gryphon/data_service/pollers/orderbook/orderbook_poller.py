@@ -7,6 +7,7 @@ from twisted.python import log
 import gryphon.data_service.consts as consts
 from gryphon.data_service.pollers.request_poller import RequestPoller
 import gryphon.data_service.util as util
+from gryphon.lib import packed_orderbook
 
 
 class OrderbookPoller(RequestPoller):
@@ -25,6 +26,45 @@ class OrderbookPoller(RequestPoller):
 
         super(OrderbookPoller, self).start()
 
+    @defer.inlineCallbacks
+    def publish_packed_orderbook(self, orderbook, timestamp):
+        """
+        Write the orderbook to redis in the packed binary format as well as JSON, both
+        the full book and its depth-limited views. ExchangeAPIWrapper reads these if
+        they're there.
+        """
+        self.packed_orderbook_sequence = getattr(self, 'packed_orderbook_sequence', 0) + 1
+
+        try:
+            views = packed_orderbook.pack_orderbook_views(
+                orderbook,
+                timestamp,
+                self.packed_orderbook_sequence,
+            )
+        except packed_orderbook.PackedOrderbookException as e:
+            # Readers fall back to the JSON orderbook.
+            log.err('Could not pack %s orderbook: %s' % (self.exchange_name, e))
+            yield self.clear_packed_orderbook()
+            return
+
+        for depth, packed in views.iteritems():
+            key = packed_orderbook.packed_orderbook_key(self.exchange_name, depth)
+            yield self.redis.set(key, packed)
+
+    @defer.inlineCallbacks
+    def notify_orderbook_update(self, timestamp):
+        """
+        Wake up any bots waiting on this exchange's orderbook (see TickScheduler).
+        """
+        channel = packed_orderbook.orderbook_updates_channel(self.exchange_name)
+        yield self.redis.publish(channel, str(timestamp))
+
+    @defer.inlineCallbacks
+    def clear_packed_orderbook(self):
+        for depth in (None,) + packed_orderbook.VIEW_DEPTHS:
+            key = packed_orderbook.packed_orderbook_key(self.exchange_name, depth)
+            yield self.redis.set(key, None)
+
     def get_bids_and_asks(self, raw_orderbook):
         raw_bids = raw_orderbook['bids']
         raw_asks = raw_orderbook['asks']
@@ -50,9 +90,10 @@ class OrderbookPoller(RequestPoller):
         raw_bids, raw_asks = self.get_bids_and_asks(response)
 
         bids, asks = self.parse_orderbook(raw_bids, raw_asks)
+        timestamp = Delorean().epoch
 
         new_orderbook = {
-            'timestamp': Delorean().epoch,
+            'timestamp': timestamp,
             self.exchange_name: {
                 'bids': bids,
                 'asks': asks,
@@ -70,6 +111,8 @@ class OrderbookPoller(RequestPoller):
         if current_orderbook_string != new_orderbook_string:
             # There is a new orderbook. Save it and publish it.
             yield self.redis.set(self.orderbook_key, new_orderbook_string)
+            yield self.publish_packed_orderbook(new_orderbook[self.exchange_name], timestamp)
+            yield self.notify_orderbook_update(timestamp)
 
             if self.producer:
                 self.producer.publish_message(new_orderbook_string)
@@ -7,6 +7,7 @@ from twisted.internet import defer, ssl
 import gryphon.data_service.consts as consts
 import gryphon.data_service.util as util
 from gryphon.data_service.websocket_client import EmeraldWebSocketClientProtocol
+from gryphon.data_service.pollers.orderbook.websocket.price_level_book import PriceLevelBook
 from gryphon.data_service.pollers.orderbook.websocket.websocket_orderbook_poller import WebsocketOrderbookPoller
 from gryphon.lib.logger import get_logger
 
@@ -56,14 +57,13 @@ class BitfinexOrderbookWebsocket(EmeraldWebSocketClientProtocol, WebsocketOrderb
         self.producer = yield util.setup_producer(consts.ORDERBOOK_QUEUE, binding_key)
 
         # Reset everything.
-        self.orderbook = {'bids': None, 'asks': None}
-        self.bids_dict = {}
-        self.asks_dict = {}
+        self.orderbook = PriceLevelBook()
         self.channel_id = None
         self.have_gotten_base_orderbook = False
-        self.last_amqp_push = 0
 
-        yield self.redis.set(self.orderbook_key, None)
+        self.reset_publishing()
+
+        yield self.clear_cached_orderbook()
 
         self.subscribe_to_websocket()
 
@@ -72,7 +72,8 @@ class BitfinexOrderbookWebsocket(EmeraldWebSocketClientProtocol, WebsocketOrderb
         should_continue = yield self.check_should_continue()
 
         if not should_continue:
-            yield self.redis.set(self.orderbook_key, None)
+            self.cancel_pending_publish()
+            yield self.clear_cached_orderbook()
             return
 
         payload = json.loads(payload, parse_float=Decimal)
@@ -115,39 +116,19 @@ class BitfinexOrderbookWebsocket(EmeraldWebSocketClientProtocol, WebsocketOrderb
         volume = change[2]
 
         if volume > 0:
-            self.bids_dict[price] = volume
+            self.orderbook.set_level('bids', price, volume)
         elif volume < 0:
-            self.asks_dict[price] = abs(volume)
+            self.orderbook.set_level('asks', price, abs(volume))
         else:
             # When volume is 0 we don't know if this is for bids or asks we can safely
             # remove both, since there will never be a bid and an ask at the same price.
-            self.bids_dict[price] = 0
-            self.asks_dict[price] = 0
-
-    def get_orderbook_to_publish(self):
-        # We store the orderbook internally as a bid and ask dict, so we convert it here
-        # to sorted lists of [price, volume] orders.
-        bids = []
-        asks = []
-
-        for price, volume in sorted(self.bids_dict.iteritems(), reverse=True):
-            if volume > 0:
-                bids.append([str(price), str(volume), ''])
-
-        for price, volume in sorted(self.asks_dict.iteritems()):
-            if volume > 0:
-                asks.append([str(price), str(volume), ''])
-
-        orderbook = {}
-        orderbook['bids'] = bids
-        orderbook['asks'] = asks
-
-        return orderbook
+            self.orderbook.set_level('bids', price, 0)
+            self.orderbook.set_level('asks', price, 0)
 
     def print_orderbook(self):
         """Print current orderbook in format similar to Bitfinex's homepage orderbook"""
-        bids = self.orderbook['bids']
-        asks = self.orderbook['asks']
+        bids = list(self.orderbook.bids.levels())
+        asks = list(self.orderbook.asks.levels())
 
         if not bids or not asks:
             return
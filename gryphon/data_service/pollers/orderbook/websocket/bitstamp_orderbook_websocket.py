@@ -1,4 +1,3 @@
-from collections import OrderedDict
 import json
 
 from autobahn.twisted.websocket import WebSocketClientFactory
@@ -10,6 +9,7 @@ from twisted.python import log
 import gryphon.data_service.consts as consts
 import gryphon.data_service.util as util
 from gryphon.data_service.websocket_client import EmeraldWebSocketClientProtocol
+from gryphon.data_service.pollers.orderbook.websocket.price_level_book import PriceLevelBook
 from gryphon.data_service.pollers.orderbook.websocket.websocket_orderbook_poller import WebsocketOrderbookPoller
 from gryphon.lib.logger import get_logger
 
@@ -91,10 +91,8 @@ class BitstampOrderbookWebsocket(EmeraldWebSocketClientProtocol, WebsocketOrderb
 
         if (self.orderbook_timestamp > self.first_change_timestamp
                 and self.message_count > self.message_count_buffer):
-            self.orderbook = {
-                'bids': self.parse_orders(resp_obj['bids']),
-                'asks': self.parse_orders(resp_obj['asks']),
-            }
+            self.orderbook = PriceLevelBook()
+            self.apply_change_to_orderbook(resp_obj)
         else:
             # Get the orderbook again since it was too old.
             self.retry_request()
@@ -111,15 +109,16 @@ class BitstampOrderbookWebsocket(EmeraldWebSocketClientProtocol, WebsocketOrderb
         self.producer = yield util.setup_producer(consts.ORDERBOOK_QUEUE, binding_key)
 
         # Reset everything
-        self.orderbook = ''
+        self.orderbook = None
         self.orderbook_timestamp = None
         self.orderbook_change_backlog = {}
         self.first_change_timestamp = None
         self.message_count = 0
         self.message_count_buffer = 3
-        self.last_amqp_push = 0
 
-        yield self.redis.set(self.orderbook_key, None)
+        self.reset_publishing()
+
+        yield self.clear_cached_orderbook()
 
         # Start fetching the base orderbook from self.url the request poller will call
         # parse_response with the response.
@@ -135,7 +134,8 @@ class BitstampOrderbookWebsocket(EmeraldWebSocketClientProtocol, WebsocketOrderb
             should_continue = yield self.check_should_continue()
 
             if not should_continue:
-                yield self.redis.set(self.orderbook_key, None)
+                self.cancel_pending_publish()
+                yield self.clear_cached_orderbook()
                 return
 
             self.message_count += 1
@@ -205,49 +205,12 @@ class BitstampOrderbookWebsocket(EmeraldWebSocketClientProtocol, WebsocketOrderb
     # HELPER FUNCTIONS
 
     def apply_change_to_orderbook(self, change):
-        bids_changes = self.parse_orders(change['bids'])
-        asks_changes = self.parse_orders(change['asks'])
-
-        # Remove the 0 volumes from the orderbook.
-        self.orderbook['bids'].update(bids_changes)
-
-        for k, v in self.orderbook['bids'].iteritems():
-            if v == "0":
-                self.orderbook['bids'].pop(k)
-
-        # Re-sort the bids.
-        self.orderbook['bids'] = OrderedDict(sorted(
-            self.orderbook['bids'].iteritems(),
-            key=lambda (k, v): float(k),
-            reverse=True,
-        ))
-
-        self.orderbook['asks'].update(asks_changes)
-
-        for k, v in self.orderbook['asks'].iteritems():
-            if v == "0":
-                self.orderbook['asks'].pop(k)
-
-        # Re-sort the asks.
-        self.orderbook['asks'] = OrderedDict(
-            sorted(self.orderbook['asks'].iteritems(), key=lambda (k, v): float(k)),
-        )
-
-    def parse_orders(self, orders):
-        """Returns a price keyed orders"""
-        orders_dict = OrderedDict()
-
-        for order in orders:
-            orders_dict[order[0]] = order[1]
-
-        return orders_dict
-
-    def get_orderbook_to_publish(self):
-        """Returns a string keyed orderbook from price keyed"""
-        price_key_orderbook = self.orderbook
-
-        return {
-            'bids': [[k, v, ''] for k, v in price_key_orderbook['bids'].iteritems()],
-            'asks': [[k, v, ''] for k, v in price_key_orderbook['asks'].iteritems()],
-        }
+        """
+        Bitstamp sends the new total volume at each changed price level, with a volume
+        of "0" meaning the level has been cleared.
+        """
+        for order in change['bids']:
+            self.orderbook.set_level('bids', order[0], order[1])
 
+        for order in change['asks']:
+            self.orderbook.set_level('asks', order[0], order[1])
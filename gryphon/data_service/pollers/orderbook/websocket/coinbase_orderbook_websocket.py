@@ -1,13 +1,12 @@
-from collections import defaultdict
 import json
 
 from autobahn.twisted.websocket import connectWS, WebSocketClientFactory
-from cdecimal import Decimal
 from twisted.internet import defer, reactor, ssl
 
 import gryphon.data_service.consts as consts
 import gryphon.data_service.util as util
 from gryphon.data_service.websocket_client import EmeraldWebSocketClientProtocol
+from gryphon.data_service.pollers.orderbook.websocket.price_level_book import PriceLevelBook
 from gryphon.data_service.pollers.orderbook.websocket.websocket_orderbook_poller import WebsocketOrderbookPoller
 from gryphon.lib.logger import get_logger
 
@@ -65,10 +64,9 @@ class CoinbaseOrderbookWebsocket(EmeraldWebSocketClientProtocol, WebsocketOrderb
         if (self.orderbook_sequence_number > self.first_sequence_number
                 and self.first_sequence_number != 0):
 
-            self.orderbook = {
-                'bids': self.parse_orders(resp_obj['bids']),
-                'asks': self.parse_orders(resp_obj['asks'])
-            }
+            self.orderbook = PriceLevelBook()
+            self.parse_orders('bids', resp_obj['bids'])
+            self.parse_orders('asks', resp_obj['asks'])
 
             logger.info(
                 'Established Orderbook, Sequence: %s' % self.orderbook_sequence_number,
@@ -92,14 +90,16 @@ class CoinbaseOrderbookWebsocket(EmeraldWebSocketClientProtocol, WebsocketOrderb
         self.producer = yield util.setup_producer(consts.ORDERBOOK_QUEUE, binding_key)
 
         # Reset everything.
-        self.orderbook = ''
+        self.orderbook = None
         self.orderbook_change_backlog = {}
         self.first_sequence_number = 0
         self.current_sequence_number = 0
         self.orderbook_sequence_number = 0
         self.received_orders = {}
-        self.last_amqp_push = 0
-        yield self.redis.set(self.orderbook_key, None)
+
+        self.reset_publishing()
+
+        yield self.clear_cached_orderbook()
 
         # Start fetching the base orderbook from self.url. The request poller will call
         # parse_response with the response.
@@ -135,7 +135,8 @@ class CoinbaseOrderbookWebsocket(EmeraldWebSocketClientProtocol, WebsocketOrderb
         should_continue = yield self.check_should_continue()
 
         if not should_continue:
-            yield self.redis.set(self.orderbook_key, None)
+            self.cancel_pending_publish()
+            yield self.clear_cached_orderbook()
             return
 
         payload = json.loads(payload)
@@ -255,21 +256,23 @@ class CoinbaseOrderbookWebsocket(EmeraldWebSocketClientProtocol, WebsocketOrderb
 
             change.update(received_order)
 
-            self.orderbook[side][change['order_id']] = {
-                'price': change['price'],
-                'volume': change['remaining_size'],
-            }
+            self.orderbook.add_order(
+                change['order_id'],
+                side,
+                change['price'],
+                change['remaining_size'],
+            )
 
         elif change['type'] == 'done':
-            if change['order_id'] in self.orderbook[side]:
-                self.orderbook[side].pop(change['order_id'])
+            if self.orderbook.has_order(change['order_id']):
+                self.orderbook.remove_order(change['order_id'])
             else:
                 # An order was closed before it hit the orderbook - match.
                 pass
 
         elif change['type'] == 'change':
-            if change['order_id'] in self.orderbook[side]:
-                self.orderbook[side][change['order_id']]['volume'] = change['new_size']
+            if self.orderbook.has_order(change['order_id']):
+                self.orderbook.change_order(change['order_id'], change['new_size'])
             elif change['order_id'] in self.received_orders:
                 self.received_orders[change['order_id']]['volume'] = change['new_size']
             else:
@@ -280,50 +283,7 @@ class CoinbaseOrderbookWebsocket(EmeraldWebSocketClientProtocol, WebsocketOrderb
         else:
             pass
 
-    def get_order_from_orderbook(self, order_id):
-        if order_id in self.orderbook['bids']:
-            return self.orderbook['bids'][order_id]
-        elif order_id in self.orderbook['asks']:
-            return self.orderbook['asks'][order_id]
-        else:
-            return None
-
-    def parse_orders(self, orders):
-        """Returns a price keyed orders"""
-        orders_dict = {}
-
+    def parse_orders(self, side, orders):
+        """Loads level-3 [price, size, order_id] orders into one side of the book."""
         for order in orders:
-            orders_dict[order[2]] = {'price': order[0], 'volume': order[1]}
-
-        return orders_dict
-
-    def get_orderbook_to_publish(self):
-        orderbook = self.orderbook
-        fancy_orderbook = {'bids': defaultdict(Decimal), 'asks': defaultdict(Decimal)}
-
-        for bid in orderbook['bids']:
-            fancy_orderbook['bids'][[bid]['price']] += Decimal(bid['volume'])
-
-        for ask in orderbook['asks']:
-            fancy_orderbook['asks'][ask['price']] += Decimal(ask['volume'])
-
-        sorted_bid_keys = sorted(
-            fancy_orderbook['bids'].keys(),
-            key=lambda (k): float(k),
-            reverse=True,
-        )
-
-        sorted_ask_keys = sorted(
-            fancy_orderbook['asks'].keys(),
-            key=lambda (k): float(k),
-        )
-
-        bids = [[k, str(fancy_orderbook['bids'][k]), ''] for k in sorted_bid_keys]
-
-        asks = [[k, str(fancy_orderbook['asks'][k]), ''] for k in sorted_ask_keys]
-
-        return {
-            'bids': bids,
-            'asks': asks,
-        }
-
+            self.orderbook.add_order(order[2], side, order[0], order[1])
@@ -0,0 +1,183 @@
+"""
+An incrementally maintained, price-aggregated orderbook for the websocket pollers.
+
+The websocket feeds send us one change at a time, so rather than re-aggregating and
+re-sorting the whole book on every message we keep each side as a sorted list of
+prices alongside a price -> volume dict. Lookups and level updates are a dict access
+plus a binary search; inserting or removing a level is a bisect and a list insert,
+which is a memmove of the price list rather than a python-level re-sort.
+
+Level-3 feeds (Coinbase) additionally keep an order_id -> (side, price, volume) index
+so that 'done' and 'change' messages can adjust the right level without a scan.
+
+Each side counts the changes made to it in a version number, so the pollers can tell
+whether the book has changed since they last published it without comparing every
+level.
+"""
+
+import bisect
+
+from cdecimal import Decimal
+
+BIDS = 'bids'
+ASKS = 'asks'
+
+
+class PriceLevels(object):
+    """
+    One side of an orderbook: a map of price -> aggregated volume which iterates
+    best-price-first. Prices and volumes are Decimals.
+    """
+
+    def __init__(self, descending=False):
+        self.descending = descending
+        self._sort_keys = []
+        self._volumes = {}
+        self.version = 0
+
+    def __len__(self):
+        return len(self._volumes)
+
+    def __contains__(self, price):
+        return price in self._volumes
+
+    def _sort_key(self, price):
+        return -price if self.descending else price
+
+    def get(self, price, default=None):
+        return self._volumes.get(price, default)
+
+    def set(self, price, volume):
+        """Set the volume at a price level, removing the level if volume is <= 0."""
+        if volume <= 0:
+            self.remove(price)
+            return
+
+        if price not in self._volumes:
+            bisect.insort(self._sort_keys, self._sort_key(price))
+        elif self._volumes[price] == volume:
+            return
+
+        self._volumes[price] = volume
+        self.version += 1
+
+    def add(self, price, volume_delta):
+        """Adjust the volume at a price level by volume_delta."""
+        self.set(price, self._volumes.get(price, Decimal('0')) + volume_delta)
+
+    def remove(self, price):
+        if price not in self._volumes:
+            return
+
+        del self._volumes[price]
+
+        sort_key = self._sort_key(price)
+        index = bisect.bisect_left(self._sort_keys, sort_key)
+        del self._sort_keys[index]
+
+        self.version += 1
+
+    def clear(self):
+        if self._volumes:
+            self.version += 1
+
+        self._sort_keys = []
+        self._volumes = {}
+
+    def levels(self, depth=None):
+        """Yields (price, volume) tuples, best price first, up to depth levels."""
+        sort_keys = self._sort_keys
+
+        if depth is not None:
+            sort_keys = sort_keys[:depth]
+
+        for sort_key in sort_keys:
+            price = -sort_key if self.descending else sort_key
+            yield price, self._volumes[price]
+
+
+class PriceLevelBook(object):
+    """
+    A two-sided price-level orderbook with an optional per-order index for level-3
+    feeds. Sides are addressed by the strings 'bids' and 'asks', as in the rest of the
+    pollers.
+    """
+
+    def __init__(self):
+        self.bids = PriceLevels(descending=True)
+        self.asks = PriceLevels()
+        self.orders = {}
+
+    @property
+    def version(self):
+        """Increases whenever a level on either side changes."""
+        return self.bids.version + self.asks.version
+
+    def side(self, side):
+        if side == BIDS:
+            return self.bids
+        elif side == ASKS:
+            return self.asks
+        else:
+            raise ValueError('Unknown orderbook side: %s' % side)
+
+    def clear(self):
+        self.bids.clear()
+        self.asks.clear()
+        self.orders = {}
+
+    # Level-2 (price aggregated) updates.
+
+    def set_level(self, side, price, volume):
+        self.side(side).set(Decimal(price), Decimal(volume))
+
+    # Level-3 (per order) updates.
+
+    def has_order(self, order_id):
+        return order_id in self.orders
+
+    def add_order(self, order_id, side, price, volume):
+        if order_id in self.orders:
+            self.remove_order(order_id)
+
+        price = Decimal(price)
+        volume = Decimal(volume)
+
+        self.orders[order_id] = (side, price, volume)
+        self.side(side).add(price, volume)
+
+    def remove_order(self, order_id):
+        """Removes an order from the book. Returns False if we weren't tracking it."""
+        if order_id not in self.orders:
+            return False
+
+        side, price, volume = self.orders.pop(order_id)
+        self.side(side).add(price, -volume)
+
+        return True
+
+    def change_order(self, order_id, new_volume):
+        """Changes an order's size. Returns False if we weren't tracking it."""
+        if order_id not in self.orders:
+            return False
+
+        side, price, volume = self.orders[order_id]
+        new_volume = Decimal(new_volume)
+
+        self.orders[order_id] = (side, price, new_volume)
+        self.side(side).add(price, new_volume - volume)
+
+        return True
+
+    # Output.
+
+    def to_publish(self, depth=None):
+        """
+        Returns the book in the format the pollers publish to redis and AMQP:
+            {'bids': [[price, volume, ''], ...], 'asks': [...]}
+        with prices and volumes as strings and at most depth levels per side.
+        """
+        return {
+            BIDS: [[str(p), str(v), ''] for p, v in self.bids.levels(depth)],
+            ASKS: [[str(p), str(v), ''] for p, v in self.asks.levels(depth)],
+        }
@@ -1,7 +1,7 @@
 import json
 
 from delorean import Delorean
-from twisted.internet import defer
+from twisted.internet import defer, reactor
 
 from gryphon.data_service.pollers.orderbook.orderbook_poller import OrderbookPoller
 from gryphon.lib.logger import get_logger
@@ -11,6 +11,8 @@ logger = get_logger(__name__)
 
 class WebsocketOrderbookPoller(OrderbookPoller):
     AMQP_PUSH_MAX_FREQUENCY = 1  # Seconds.
+    ORDERBOOK_PUBLISH_DEPTH = None  # Levels per side, None publishes the full book.
+    PUBLISH_INTERVAL = 0.05  # Seconds.
 
     def start(self):
         # Don't do any setup in here, because connect_to_websocket creates a new
@@ -24,14 +26,59 @@ class WebsocketOrderbookPoller(OrderbookPoller):
     def restart(self):
         yield self.onOpen()
 
-    @defer.inlineCallbacks
+    def get_orderbook_to_publish(self):
+        """
+        Subclasses maintain self.orderbook as a PriceLevelBook, which is already
+        aggregated and sorted, so this only has to format the top levels.
+        """
+        return self.orderbook.to_publish(self.ORDERBOOK_PUBLISH_DEPTH)
+
+    def reset_publishing(self):
+        """
+        Reset the publishing state. Called from onOpen whenever the poller (re)connects.
+        """
+        self.cancel_pending_publish()
+        self.last_amqp_push = 0
+        self.last_published_version = None
+
+    def cancel_pending_publish(self):
+        pending_publish = getattr(self, 'pending_publish', None)
+
+        if pending_publish and pending_publish.active():
+            pending_publish.cancel()
+
+        self.pending_publish = None
+
     def publish_orderbook(self):
+        """
+        Mark the orderbook as changed. Publishes are coalesced onto a timer so that a
+        burst of messages causes a single serialise/SET/AMQP push rather than one per
+        message.
+        """
+        if self.pending_publish is None:
+            self.pending_publish = reactor.callLater(
+                self.PUBLISH_INTERVAL,
+                self.flush_orderbook,
+            )
+
+    @defer.inlineCallbacks
+    def flush_orderbook(self):
+        self.pending_publish = None
+
         new_orderbook = self.get_orderbook_to_publish()
 
-        orderbook_has_changed = yield self.check_if_orderbook_has_changed(new_orderbook)
+        # Subclasses may replace self.orderbook with a new PriceLevelBook, whose
+        # version starts again from zero, so we keep track of which book it was too.
+        # A change below ORDERBOOK_PUBLISH_DEPTH counts as a change.
+        version = (self.orderbook, self.orderbook.version)
+
+        orderbook_has_changed = version != self.last_published_version
+        self.last_published_version = version
+
+        timestamp = Delorean().epoch
 
         new_orderbook_with_metadata = {
-            'timestamp': Delorean().epoch,
+            'timestamp': timestamp,
             self.exchange_name: new_orderbook,
         }
 
@@ -43,6 +90,10 @@ class WebsocketOrderbookPoller(OrderbookPoller):
         # so that the timestamp gets updated correctly
         logger.debug('Publishing orderbook to Redis')
         yield self.redis.set(self.orderbook_key, new_orderbook_string)
+        yield self.publish_packed_orderbook(new_orderbook, timestamp)
+
+        if orderbook_has_changed:
+            yield self.notify_orderbook_update(timestamp)
 
         seconds_since_last_amqp_push = Delorean().epoch - self.last_amqp_push
         if (self.producer and orderbook_has_changed and
@@ -52,17 +103,9 @@ class WebsocketOrderbookPoller(OrderbookPoller):
             self.last_amqp_push = Delorean().epoch
 
     @defer.inlineCallbacks
-    def check_if_orderbook_has_changed(self, new_orderbook):
-        orderbook_has_changed = True
-
-        old_orderbook_string = yield self.redis.get(self.orderbook_key)
-        if old_orderbook_string and old_orderbook_string != "None":
-            old_orderbook = json.loads(old_orderbook_string)
-
-            if old_orderbook[self.exchange_name] == new_orderbook:
-                orderbook_has_changed = False
-
-        defer.returnValue(orderbook_has_changed)
+    def clear_cached_orderbook(self):
+        yield self.redis.set(self.orderbook_key, None)
+        yield self.clear_packed_orderbook()
 
     @defer.inlineCallbacks
     def check_should_continue(self):
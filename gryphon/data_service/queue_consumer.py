@@ -1,9 +1,10 @@
 # -*- coding: utf-8 -*-
-import subprocess
 import time
 
 import pika
 
+from gryphon.data_service.heartbeat import DEFAULT_HEARTBEAT_INTERVAL
+from gryphon.data_service.heartbeat import HeartbeatTicker
 from gryphon.lib.logger import get_logger
 
 logger = get_logger('emerald-havoc-consumer')
@@ -26,12 +27,20 @@ class QueueConsumer(object):
     were issued and that should surface in the output as well.
     """
 
-    def __init__(self, amqp_url, consumer_func, consumer_func_args, exchange, exchange_type, binding_key, queue_name):
+    def __init__(self, amqp_url, consumer_func, consumer_func_args, exchange, exchange_type, binding_key, queue_name, batch_size=None, batch_interval=None, heartbeat_interval=DEFAULT_HEARTBEAT_INTERVAL):
         """
         Create a new instance of the consumer class, passing in the AMQP URL used to
         connect to RabbitMQ.
 
+        If batch_size is given the consumer runs in batching mode: messages are
+        buffered until batch_size have arrived or batch_interval seconds have passed
+        since the first one, consumer_func is called once with the list of message
+        bodies, and the whole batch is then acknowledged at once.
+
         :param str amqp_url: The AMQP url to connect with
+        :param int batch_size: The maximum number of messages per batch
+        :param float batch_interval: The maximum seconds a message waits in a batch
+        :param float heartbeat_interval: The minimum seconds between heartbeats
         """
 
         self._connection = None
@@ -48,6 +57,16 @@ class QueueConsumer(object):
         self.binding_key = binding_key
         self.queue_name = queue_name
 
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self._batch = []
+        self._batch_timeout = None
+
+        self.heartbeat = HeartbeatTicker(
+            'monit/heartbeat/%s_consumer_success_heartbeat.txt' % queue_name.lower(),
+            interval=heartbeat_interval,
+        )
+
     def connect(self):
         """
         This method connects to RabbitMQ, returning the connection handle.  When the
@@ -108,6 +127,7 @@ class QueueConsumer(object):
         logger.info('Adding connection close callback')
 
         self._connection.add_on_close_callback(self.on_connection_closed)
+        self._connection.add_timeout(self.heartbeat.interval, self.tick_heartbeat)
         self._connection.channel(on_open_callback=self.on_channel_open)
 
     def reconnect(self):
@@ -161,6 +181,11 @@ class QueueConsumer(object):
 
         self._channel = channel
 
+        # Delivery tags are per-channel, so anything left over from a previous channel
+        # can't be acked on this one. RabbitMQ will redeliver those messages.
+        self._batch = []
+        self._batch_timeout = None
+
         logger.info('Adding channel close callback')
 
         self._channel.add_on_close_callback(self.on_channel_closed)
@@ -229,15 +254,26 @@ class QueueConsumer(object):
         if self._channel:
             self._channel.close()
 
-    def acknowledge_message(self, delivery_tag):
+    def acknowledge_message(self, delivery_tag, multiple=False):
         """
         Acknowledge the message delivery from RabbitMQ by sending a Basic.Ack RPC
         method for the delivery tag.
 
         :param int delivery_tag: The delivery tag from the Basic.Deliver frame
+        :param bool multiple: Also acknowledge every earlier unacked delivery
         """
 
-        self._channel.basic_ack(delivery_tag)
+        self._channel.basic_ack(delivery_tag, multiple=multiple)
+
+    def tick_heartbeat(self):
+        """
+        Periodically flush the heartbeat so the counts from the end of a burst of
+        messages are written even if no more messages arrive.
+        """
+
+        self.heartbeat.tick()
+
+        self._connection.add_timeout(self.heartbeat.interval, self.tick_heartbeat)
 
     def on_message(self, unused_channel, basic_deliver, properties, body, attempt=1):
         """
@@ -256,20 +292,21 @@ class QueueConsumer(object):
         # https://www.rabbitmq.com/tutorials/tutorial-two-python.html
         # see Message Acknowledgement.
         # We now only heartbeat on a successful consumer_func call.
+        if self.batch_size:
+            self.add_to_batch(basic_deliver.delivery_tag, body)
+            return
+
         try:
             self.consumer_func(body, self.consumer_func_args)
 
-            heartbeat_key = self.queue_name.lower()
-
-            subprocess.call([
-                'touch',
-                'monit/heartbeat/%s_consumer_success_heartbeat.txt' % heartbeat_key,
-            ])
+            self.heartbeat.record()
 
             self.acknowledge_message(basic_deliver.delivery_tag)
         except:
             logger.exception('Attempt %s: FAILED MESSAGE: %s' % (attempt, body[:100]))
 
+            self.rollback()
+
             if attempt > 600:
                 raise QueueConsumerException(
                     'Queue: %s has had too many failures' % self.queue_name.lower(),
@@ -286,6 +323,82 @@ class QueueConsumer(object):
                 attempt=attempt + 1,
             )
 
+    def add_to_batch(self, delivery_tag, body):
+        """
+        Buffer a message for the next batch, flushing if the batch is full and
+        otherwise making sure a flush is scheduled for batch_interval from now.
+        """
+
+        self._batch.append((delivery_tag, body))
+
+        if len(self._batch) >= self.batch_size:
+            self.flush_batch()
+        elif self._batch_timeout is None and self.batch_interval is not None:
+            self._batch_timeout = self._connection.add_timeout(
+                self.batch_interval,
+                self.flush_batch,
+            )
+
+    def flush_batch(self, attempt=1):
+        """
+        Hand every buffered message to consumer_func in one call, then ack them all
+        with a single Basic.Ack on the last delivery tag. Failures are retried the same
+        way as in on_message.
+        """
+
+        if self._batch_timeout is not None:
+            self._connection.remove_timeout(self._batch_timeout)
+            self._batch_timeout = None
+
+        if not self._batch:
+            return
+
+        bodies = [body for delivery_tag, body in self._batch]
+        last_delivery_tag = self._batch[-1][0]
+
+        try:
+            self.consumer_func(bodies, self.consumer_func_args)
+
+            self.heartbeat.record(len(bodies))
+
+            self.acknowledge_message(last_delivery_tag, multiple=True)
+            self._batch = []
+        except:
+            logger.exception('Attempt %s: FAILED BATCH of %s messages, first: %s' % (
+                attempt,
+                len(bodies),
+                bodies[0][:100],
+            ))
+
+            self.rollback()
+
+            if attempt > 600:
+                raise QueueConsumerException(
+                    'Queue: %s has had too many failures' % self.queue_name.lower(),
+                )
+
+            # We are going to sleep for 1 second before retrying.
+            time.sleep(1)
+
+            self.flush_batch(attempt=attempt + 1)
+
+    def rollback(self):
+        """
+        The consumers pass their database session as consumer_func_args. A failed write
+        leaves that session in a failed transaction, and every retry would fail with it
+        until it's rolled back.
+        """
+
+        rollback = getattr(self.consumer_func_args, 'rollback', None)
+
+        if rollback is None:
+            return
+
+        try:
+            rollback()
+        except:
+            logger.exception('Could not roll back after a failed message')
+
     def on_cancelok(self, unused_frame):
         """
         This method is invoked by pika when RabbitMQ acknowledges the cancellation of
@@ -374,6 +487,10 @@ class QueueConsumer(object):
         logger.info('Stopping')
 
         self._closing = True
+
+        if self._channel:
+            self.flush_batch()
+
         self.stop_consuming()
         self._connection.ioloop.start()
 
@@ -1,8 +1,12 @@
 import csv
-from datetime import timedelta
-import gzip
-import StringIO
-
+from datetime import datetime, timedelta
+import itertools
+import json
+import os
+import uuid
+import zlib
+
+from cdecimal import Decimal
 from delorean import epoch
 import requests
 from sqlalchemy.sql import func
@@ -17,6 +21,11 @@ from gryphon.lib.time_parsing import parse
 
 historical_data_url = 'http://api.bitcoincharts.com/v1/csv/%s%s.csv.gz'
 
+CHUNK_SIZE = 10000  # Trades per insert/commit.
+READ_SIZE = 2 ** 16  # Bytes.
+CHECKPOINT_TIME_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+BACKFILL_SOURCE = u'BITCOINCHARTS'
+
 historically_available_exchanges = [
     ['BITSTAMP', 'bitstamp', 'USD', 'BTC'],
     ['BITFINEX', 'bitfinex', 'USD', 'BTC'],
@@ -47,66 +56,352 @@ bw_exchanges = [
 test_start_date = parse('2015-12-1').datetime
 test_end_date = parse('2015-12-15').datetime
 
-def backfill_trades(exchanges):
+def backfill_trades(exchanges, source_paths={}, checkpoint_dir=None):
+    """
+    Backfill our trade table from bitcoincharts' history for each of exchanges (rows of
+    historically_available_exchanges). source_paths optionally maps our exchange ids to
+    local copies of the .csv.gz files for offline runs. With a checkpoint_dir, an
+    interrupted backfill picks up where it left off when run again.
+    """
     for e in exchanges:
-        trades = get_trades_to_backfill(e[0], e[1], e[2], e[3])
-        write_trades_to_db(e[0], trades)
+        checkpoint_path = None
 
+        if checkpoint_dir:
+            checkpoint_path = os.path.join(
+                checkpoint_dir,
+                '%s_backfill_checkpoint.json' % e[0].lower(),
+            )
 
-def get_trades_to_backfill(our_exchange_id, exchange, price_currency, volume_currency):
-    our_trades = get_our_recorded_trades(our_exchange_id.upper())
-    oldest_trade_timestamp = our_trades[0][0]
-    historical_trades = get_historical_trades(exchange.lower(), price_currency, volume_currency)
-    trades_to_add = [t for t in historical_trades if t[0] < oldest_trade_timestamp]
+        backfill_exchange(
+            e[0],
+            e[1],
+            e[2],
+            e[3],
+            source_path=source_paths.get(e[0]),
+            checkpoint_path=checkpoint_path,
+        )
+
+
+def backfill_exchange(our_exchange_id, exchange, price_currency, volume_currency, source_path=None, checkpoint_path=None):
+    """
+    Stream one exchange's history into the trade table, a chunk at a time, so a
+    multi-year backfill never holds more than CHUNK_SIZE trades in memory.
+
+    We only add the historical trades from before the oldest trade we recorded
+    ourselves. That cutoff is saved in the checkpoint along with how many rows of the
+    source we've been through and the backfill progress at that point. Without a
+    checkpoint, a rerun skips the rows an earlier run already inserted by looking at
+    the newest backfilled trade in the table. With one, it only skips the rows
+    inserted after the checkpoint was saved, in case a run stopped between committing a
+    chunk and saving its checkpoint.
+    """
+    db = session.get_a_gds_db_mysql_session()
 
-    # sort the trades to add in adding the most recent one first.
-    sorted_trades = sorted(trades_to_add, key=lambda k: k[0], reverse=True)
+    try:
+        checkpoint = load_checkpoint(checkpoint_path)
+        progress = get_backfill_progress(db, our_exchange_id)
 
-    return sorted_trades
+        if checkpoint:
+            cutoff = checkpoint['cutoff']
+            rows_done = checkpoint['rows_done']
+            backfilled = progress_since_checkpoint(progress, checkpoint['backfilled'])
+        else:
+            cutoff, _ = get_recorded_time_range(db, our_exchange_id)
+            rows_done = 0
+            backfilled = progress
 
+        rows = iter_historical_rows(exchange, price_currency, source_path=source_path)
+        rows = itertools.islice(rows, rows_done, None)
 
-def write_trades_to_db(our_exchange_id, trades_list):
-    db = session.get_a_gds_db_mysql_session()
-    try:
-        for i in range(len(trades_list)):
-            trade = Trade(
-                trades_list[i][1],
-                trades_list[i][2],
+        for chunk in chunked(rows, CHUNK_SIZE):
+            rows_done += len(chunk)
+
+            if backfilled:
+                chunk, backfilled = skip_backfilled_rows(chunk, backfilled)
+
+            if cutoff:
+                chunk = [row for row in chunk if row[0] < cutoff]
+
+            insert_trades(
+                db,
                 our_exchange_id,
-                trades_list[i][0],
-                None,
-                source='BITCOINCHARTS'
+                chunk,
+                price_currency,
+                volume_currency,
             )
-            db.add(trade)
-            if i % 30 == 0:
-                session.commit_mysql_session(db)
 
-        session.commit_mysql_session(db)
+            session.commit_mysql_session(db)
 
+            progress = advance_backfill_progress(progress, chunk)
+            save_checkpoint(checkpoint_path, cutoff, rows_done, progress)
     finally:
         db.remove()
 
 
-def get_historical_trades(exchange, price_currency, volume_currency='BTC'):
-    r = requests.get(historical_data_url % (exchange, price_currency))
-    compressedFile = StringIO.StringIO()
-    compressedFile.write(r.content)
-    compressedFile.seek(0)
-    decompressedFile = gzip.GzipFile(fileobj=compressedFile, mode='rb')
+def get_recorded_time_range(db, exchange):
+    """
+    The timestamps of the oldest and newest trades we recorded ourselves for exchange,
+    or (None, None), in a single query. Backfilled trades don't count.
+    """
+    oldest, newest = db.query(func.min(Trade.timestamp), func.max(Trade.timestamp))\
+        .filter(Trade.exchange == exchange.upper())\
+        .filter(Trade.source != BACKFILL_SOURCE)\
+        .one()
+
+    return oldest, newest
+
+
+def get_backfill_progress(db, exchange):
+    """
+    The timestamp of the newest backfilled trade for exchange and how many backfilled
+    trades we have at that timestamp, or None if nothing has been backfilled.
+    """
+    newest = db.query(func.max(Trade.timestamp))\
+        .filter(Trade.exchange == exchange.upper())\
+        .filter(Trade.source == BACKFILL_SOURCE)\
+        .scalar()
+
+    if newest is None:
+        return None
+
+    count = db.query(func.count(Trade.trade_id))\
+        .filter(Trade.exchange == exchange.upper())\
+        .filter(Trade.source == BACKFILL_SOURCE)\
+        .filter(Trade.timestamp == newest)\
+        .scalar()
+
+    return newest, count
+
+
+def skip_backfilled_rows(rows, backfilled):
+    """
+    Drop the rows an earlier run already inserted: those before the newest backfilled
+    trade, and as many at its timestamp as we have. The source is in time order, so
+    once we're past them we're done. Returns the remaining rows and the progress left
+    to skip, or None.
+    """
+    newest, count = backfilled
+    remaining = []
+
+    for row in rows:
+        if row[0] < newest:
+            continue
+        elif row[0] == newest and count > 0:
+            count -= 1
+        else:
+            remaining.append(row)
+
+    if remaining:
+        return remaining, None
+    else:
+        return remaining, (newest, count)
+
+
+def advance_backfill_progress(backfilled, rows):
+    """
+    The backfill progress, as returned by get_backfill_progress, after inserting rows,
+    which are in time order.
+    """
+    if not rows:
+        return backfilled
+
+    newest = rows[-1][0]
+    count = len([row for row in rows if row[0] == newest])
+
+    if backfilled and backfilled[0] == newest:
+        count += backfilled[1]
+
+    return newest, count
+
+
+def progress_since_checkpoint(backfilled, checkpointed):
+    """
+    The rows for skip_backfilled_rows to skip when resuming from a checkpoint, given
+    the backfill progress now and when the checkpoint was saved: the ones an earlier
+    run inserted after its last checkpoint, or None.
+    """
+    if backfilled is None or backfilled == checkpointed:
+        return None
+
+    newest, count = backfilled
+
+    if checkpointed and checkpointed[0] == newest:
+        count -= checkpointed[1]
+
+    return newest, count
+
+
+def insert_trades(db, our_exchange_id, rows, price_currency, volume_currency='BTC'):
+    """
+    Bulk insert [timestamp, price, volume] rows with a single executemany, skipping the
+    ORM.
+    """
+    if not rows:
+        return
+
+    time_created = datetime.utcnow()
+
+    db.execute(Trade.__table__.insert(), [
+        {
+            'unique_id': unicode(uuid.uuid4().hex),
+            'exchange': our_exchange_id,
+            'timestamp': timestamp,
+            'time_created': time_created,
+            'exchange_trade_id': None,
+            'source': BACKFILL_SOURCE,
+            'price': price,
+            'price_currency': unicode(price_currency),
+            'volume': volume,
+            'volume_currency': unicode(volume_currency),
+        }
+        for timestamp, price, volume in rows
+    ])
+
+
+def load_checkpoint(checkpoint_path):
+    if not checkpoint_path or not os.path.exists(checkpoint_path):
+        return None
+
+    with open(checkpoint_path) as f:
+        checkpoint = json.load(f)
+
+    if checkpoint['cutoff']:
+        checkpoint['cutoff'] = datetime.strptime(
+            checkpoint['cutoff'],
+            CHECKPOINT_TIME_FORMAT,
+        )
+
+    if checkpoint['backfilled']:
+        newest, count = checkpoint['backfilled']
+        checkpoint['backfilled'] = (
+            datetime.strptime(newest, CHECKPOINT_TIME_FORMAT),
+            count,
+        )
+
+    return checkpoint
+
+
+def save_checkpoint(checkpoint_path, cutoff, rows_done, backfilled):
+    if not checkpoint_path:
+        return
+
+    checkpoint = {
+        'cutoff': cutoff.strftime(CHECKPOINT_TIME_FORMAT) if cutoff else None,
+        'rows_done': rows_done,
+        'backfilled': None,
+    }
 
-    try:
-        reader = csv.reader(decompressedFile)
-        trades = []
-        for row in reader:
-            timestamp = epoch(int(row[0])).datetime.replace(tzinfo=None)
-            price = Money(row[1], price_currency)
-            volume = Money(row[2], volume_currency)
-            trades.append([timestamp, price, volume])
+    if backfilled:
+        newest, count = backfilled
+        checkpoint['backfilled'] = [newest.strftime(CHECKPOINT_TIME_FORMAT), count]
+
+    # Write then rename, so an interrupted run never leaves a half-written checkpoint.
+    temp_path = checkpoint_path + '.tmp'
+
+    with open(temp_path, 'w') as f:
+        json.dump(checkpoint, f)
+
+    os.rename(temp_path, checkpoint_path)
 
-        return trades
 
+def get_historical_trades(exchange, price_currency, volume_currency='BTC', source_path=None):
+    """
+    The full history as a list of [datetime, Money, Money]. This holds the whole thing
+    in memory, so prefer iter_historical_rows for anything big.
+    """
+    return [
+        [timestamp, Money(price, price_currency), Money(volume, volume_currency)]
+        for timestamp, price, volume in iter_historical_rows(
+            exchange,
+            price_currency,
+            source_path=source_path,
+        )
+    ]
+
+
+def iter_historical_rows(exchange, price_currency, source_path=None):
+    """
+    Yields [datetime, Decimal price, Decimal volume] for every trade in bitcoincharts'
+    history for exchange, oldest first, decompressing and parsing the .csv.gz as it
+    streams in. source_path reads a local copy instead.
+    """
+    if source_path:
+        chunks = iter_file_chunks(source_path)
+    else:
+        chunks = iter_url_chunks(historical_data_url % (exchange, price_currency))
+
+    if not source_path or source_path.endswith('.gz'):
+        chunks = gunzip_chunks(chunks)
+
+    for row in csv.reader(iter_lines(chunks)):
+        timestamp = epoch(int(row[0])).datetime.replace(tzinfo=None)
+
+        yield [timestamp, Decimal(row[1]), Decimal(row[2])]
+
+
+def iter_url_chunks(url):
+    r = requests.get(url, stream=True)
+    r.raise_for_status()
+
+    try:
+        for chunk in r.iter_content(chunk_size=READ_SIZE):
+            yield chunk
     finally:
-        decompressedFile.close()
+        r.close()
+
+
+def iter_file_chunks(path):
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(READ_SIZE)
+
+            if not chunk:
+                break
+
+            yield chunk
+
+
+def gunzip_chunks(chunks):
+    # gzip.GzipFile needs a seekable file, so we use zlib directly. 16 + MAX_WBITS
+    # tells it to expect a gzip header.
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+    for chunk in chunks:
+        data = decompressor.decompress(chunk)
+
+        if data:
+            yield data
+
+    data = decompressor.flush()
+
+    if data:
+        yield data
+
+
+def iter_lines(chunks):
+    remainder = ''
+
+    for chunk in chunks:
+        lines = (remainder + chunk).split('\n')
+        remainder = lines.pop()
+
+        for line in lines:
+            yield line
+
+    if remainder:
+        yield remainder
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+
+        if not chunk:
+            break
+
+        yield chunk
 
 
 def get_our_recorded_trades(exchange):
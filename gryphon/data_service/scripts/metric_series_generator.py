@@ -0,0 +1,368 @@
+"""
+Generates the hourly atlaszero metric series from the GDS orderbook and trade tables.
+For each exchange in SERIES_EXCHANGES these are the bid, ask, midpoint and spread at
+each of DEPTHS, and the trade volume and vwap.
+
+Following the conventions in metric_types, a sampled series at 8:00 comes from the
+last orderbook in [7:00, 8:00), and an aggregate series at 8:00 covers the trades in
+[7:00, 8:00).
+
+Runs are incremental: each metric type picks up after the latest Metric we have for
+it, so a run only computes the hours since the last one, and re-running a period
+doesn't write duplicates. GDS data is read CHUNK_HOURS at a time and only the one
+orderbook sampled for each hour is loaded and parsed. Exchanges are processed in
+parallel, one per worker process.
+
+Usage:
+    generate_metrics(datetime(2018, 1, 1))
+"""
+
+from datetime import datetime, timedelta
+import json
+from multiprocessing import Pool
+
+from cdecimal import Decimal
+import numpy as np
+import pandas as pd
+from sqlalchemy import func
+from sqlalchemy.dialects import mysql
+
+from gryphon.lib import session
+from gryphon.lib.models.atlaszero.metric import Metric
+from gryphon.lib.models.atlaszero.metric_types import get_metric_type_ints
+from gryphon.lib.models.emeraldhavoc.orderbook import Orderbook
+from gryphon.lib.models.emeraldhavoc.trade import Trade
+
+
+# The exchange names in our series, and the GDS exchanges they're generated from.
+SERIES_EXCHANGES = {
+    'bitfinex': u'BITFINEX_BTC_USD',
+    'bitstamp': u'BITSTAMP_BTC_USD',
+    'coinbase': u'COINBASE_BTC_USD',
+    'gemini': u'GEMINI_BTC_USD',
+    'itbit': u'ITBIT_BTC_USD',
+    'kraken': u'KRAKEN_BTC_EUR',
+    'okcoin': u'OKCOIN_BTC_USD',
+}
+
+QUOTE_SERIES = ['bid', 'ask', 'midpoint', 'spread']
+TRADE_SERIES = ['volume', 'vwap']
+DEPTHS = ['0.00', '1.00', '5.00', '10.00', '20.00']  # BTC.
+
+CHUNK_HOURS = 24
+INSERT_CHUNK_SIZE = 1000  # Metrics.
+WORKERS = 4
+
+ONE_HOUR = timedelta(hours=1)
+
+
+def orderbook_metric_type(series, exchange, depth):
+    return '%s-%s-orderbook-1hr-%sbtc_depth' % (series, exchange, depth)
+
+
+def trade_metric_type(series, exchange):
+    return '%s-%s-trades-1hr' % (series, exchange)
+
+
+def exchange_metric_types(exchange):
+    metric_types = [
+        orderbook_metric_type(series, exchange, depth)
+        for series in QUOTE_SERIES
+        for depth in DEPTHS
+    ]
+
+    metric_types += [trade_metric_type(series, exchange) for series in TRADE_SERIES]
+
+    return metric_types
+
+
+def generate_metrics(start_time, end_time=None, exchanges=None, workers=WORKERS):
+    """
+    Fill in every series up to end_time, which defaults to now. Series we have no
+    Metrics for yet start from start_time. Times are naive UTC.
+
+    Returns a dict of how many Metrics were written for each exchange.
+    """
+    if end_time is None:
+        end_time = datetime.utcnow()
+
+    if exchanges is None:
+        exchanges = sorted(SERIES_EXCHANGES.keys())
+
+    jobs = [(exchange, start_time, end_time) for exchange in exchanges]
+
+    pool = Pool(min(workers, len(jobs)))
+
+    try:
+        counts = pool.map(_generate_exchange_metrics_worker, jobs)
+    finally:
+        pool.close()
+        pool.join()
+
+    return dict(zip(exchanges, counts))
+
+
+def _generate_exchange_metrics_worker(job):
+    # Connections can't be shared across processes, so each worker makes its own.
+    exchange, start_time, end_time = job
+
+    gds_db = session.get_a_gds_db_mysql_session()
+    atlas_zero_db = session.get_a_atlas_zero_db_mysql_session()
+
+    try:
+        return generate_exchange_metrics(
+            gds_db,
+            atlas_zero_db,
+            exchange,
+            start_time,
+            end_time,
+        )
+    finally:
+        gds_db.remove()
+        atlas_zero_db.remove()
+
+
+def generate_exchange_metrics(gds_db, atlas_zero_db, exchange, start_time, end_time):
+    """
+    Generate one exchange's series, committing after each chunk so an interrupted run
+    picks up where it left off. Returns the number of Metrics written.
+    """
+    names = exchange_metric_types(exchange)
+    metric_types = dict(zip(names, get_metric_type_ints(names)))
+
+    latest = latest_metric_timestamps(atlas_zero_db, metric_types.values())
+
+    start_time = floor_hour(start_time)
+    end_time = floor_hour(end_time)
+
+    # The last hour each metric type already has.
+    series_starts = {
+        name: max(latest.get(metric_type, start_time), start_time)
+        for name, metric_type in metric_types.iteritems()
+    }
+
+    metric_count = 0
+
+    for chunk_start, chunk_end in hour_chunks(min(series_starts.values()), end_time):
+        series = {}
+
+        series.update(orderbook_series(gds_db, exchange, chunk_start, chunk_end))
+        series.update(trade_series(gds_db, exchange, chunk_start, chunk_end))
+
+        rows = metric_rows(series, metric_types, series_starts)
+
+        insert_metrics(atlas_zero_db, rows)
+        session.commit_mysql_session(atlas_zero_db)
+
+        metric_count += len(rows)
+
+    return metric_count
+
+
+def latest_metric_timestamps(db, metric_types):
+    """The timestamp of the latest Metric for each of metric_types that has any."""
+    latest = db.query(
+            Metric.metric_type,
+            func.max(Metric.timestamp, type_=Metric.timestamp.type),
+        )\
+        .filter(Metric.metric_type.in_(metric_types))\
+        .group_by(Metric.metric_type)\
+        .all()
+
+    return dict(latest)
+
+
+def hour_chunks(start_time, end_time):
+    """
+    Split (start_time, end_time] into chunks of up to CHUNK_HOURS hours. A chunk covers
+    the hours after its start up to and including its end, which are computed from the
+    GDS data in [start, end).
+    """
+    chunk_start = start_time
+
+    while chunk_start < end_time:
+        chunk_end = min(chunk_start + CHUNK_HOURS * ONE_HOUR, end_time)
+
+        yield chunk_start, chunk_end
+
+        chunk_start = chunk_end
+
+
+def orderbook_series(gds_db, exchange, start_time, end_time):
+    """
+    The quote series for each hour in (start_time, end_time], from the last orderbook
+    in the hour before it.
+    """
+    samples = gds_db.query(Orderbook.orderbook_id, Orderbook.timestamp)\
+        .filter(Orderbook.exchange == SERIES_EXCHANGES[exchange])\
+        .filter(Orderbook.timestamp >= start_time)\
+        .filter(Orderbook.timestamp < end_time)\
+        .all()
+
+    if not samples:
+        return {}
+
+    samples = pd.DataFrame(samples, columns=['orderbook_id', 'timestamp'])
+    samples['hour'] = hour_buckets(samples['timestamp'])
+
+    sampled_ids = samples.sort_values('timestamp')\
+        .groupby('hour')['orderbook_id']\
+        .last()
+
+    books = gds_db.query(Orderbook.orderbook_id, Orderbook._bids, Orderbook._asks)\
+        .filter(Orderbook.orderbook_id.in_([int(i) for i in sampled_ids.values]))\
+        .all()
+
+    books = {orderbook_id: (bids, asks) for orderbook_id, bids, asks in books}
+
+    depths = np.array([float(depth) for depth in DEPTHS])
+    bid_quotes = []
+    ask_quotes = []
+
+    for orderbook_id in sampled_ids.values:
+        bids, asks = books[orderbook_id]
+
+        bid_prices, bid_volumes = levels_array(json.loads(bids), descending=True)
+        ask_prices, ask_volumes = levels_array(json.loads(asks), descending=False)
+
+        bid_quotes.append(depth_quotes(bid_prices, bid_volumes, depths))
+        ask_quotes.append(depth_quotes(ask_prices, ask_volumes, depths))
+
+    quotes = {
+        'bid': np.vstack(bid_quotes),
+        'ask': np.vstack(ask_quotes),
+    }
+
+    quotes['midpoint'] = (quotes['bid'] + quotes['ask']) / 2
+    quotes['spread'] = quotes['ask'] - quotes['bid']
+
+    series = {}
+
+    for name in QUOTE_SERIES:
+        for i, depth in enumerate(DEPTHS):
+            series[orderbook_metric_type(name, exchange, depth)] = pd.Series(
+                quotes[name][:, i],
+                index=sampled_ids.index,
+            )
+
+    return series
+
+
+def trade_series(gds_db, exchange, start_time, end_time):
+    """The volume and vwap for each hour in (start_time, end_time] that had trades."""
+    trades = gds_db.query(Trade.timestamp, Trade._price, Trade._volume)\
+        .filter(Trade.exchange == SERIES_EXCHANGES[exchange])\
+        .filter(Trade.timestamp >= start_time)\
+        .filter(Trade.timestamp < end_time)\
+        .all()
+
+    if not trades:
+        return {}
+
+    trades = pd.DataFrame(trades, columns=['timestamp', 'price', 'volume'])
+    trades['hour'] = hour_buckets(trades['timestamp'])
+    trades['volume'] = trades['volume'].astype(float)
+    trades['notional'] = trades['price'].astype(float) * trades['volume']
+
+    totals = trades.groupby('hour')[['volume', 'notional']].sum()
+
+    return {
+        trade_metric_type('volume', exchange): totals['volume'],
+        trade_metric_type('vwap', exchange): totals['notional'] / totals['volume'],
+    }
+
+
+def levels_array(levels, descending):
+    """
+    An orderbook side's [price, volume, ...] levels as arrays of prices and volumes,
+    best level first.
+    """
+    if not levels:
+        return np.empty(0), np.empty(0)
+
+    levels = np.array([[float(level[0]), float(level[1])] for level in levels])
+    prices = levels[:, 0]
+
+    order = np.argsort(-prices if descending else prices, kind='mergesort')
+
+    return prices[order], levels[order, 1]
+
+
+def depth_quotes(prices, volumes, depths):
+    """
+    The average price of a market order for each of depths against one side of a book,
+    with the best level first. A depth of zero is the best price. The quote is NaN where
+    the side isn't deep enough.
+    """
+    quotes = np.full(len(depths), np.nan)
+
+    if not len(prices):
+        return quotes
+
+    cumulative_volumes = np.cumsum(volumes)
+    cumulative_totals = np.cumsum(prices * volumes)
+
+    # The level each order would finish on.
+    levels = np.searchsorted(cumulative_volumes, depths, side='left')
+    deep_enough = levels < len(prices)
+
+    levels = levels[deep_enough]
+    filled_depths = depths[deep_enough]
+
+    previous_volumes = np.where(levels > 0, cumulative_volumes[levels - 1], 0)
+    previous_totals = np.where(levels > 0, cumulative_totals[levels - 1], 0)
+
+    totals = previous_totals + (filled_depths - previous_volumes) * prices[levels]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        quotes[deep_enough] = np.where(
+            filled_depths > 0,
+            totals / filled_depths,
+            prices[levels],
+        )
+
+    return quotes
+
+
+def hour_buckets(timestamps):
+    """The hour each timestamp is reported in: 7:30 and 7:00 both count towards 8:00."""
+    return pd.to_datetime(timestamps).dt.floor('H') + pd.Timedelta(hours=1)
+
+
+def floor_hour(timestamp):
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+
+def metric_rows(series, metric_types, series_starts):
+    """
+    Rows for a bulk insert into the metric table for every finite value in series
+    after the hour its metric type starts from.
+    """
+    time_created = datetime.utcnow()
+    rows = []
+
+    for name, values in series.iteritems():
+        values = values[values.index > series_starts[name]]
+        values = values[np.isfinite(values.values)]
+
+        for timestamp, value in values.iteritems():
+            rows.append({
+                'timestamp': timestamp.to_pydatetime(),
+                'time_created': time_created,
+                'metric_type': metric_types[name],
+                'value': Decimal('%.10f' % value),
+            })
+
+    return rows
+
+
+def insert_metrics(db, rows):
+    """
+    Runs that overlap can both generate the same metrics, so a metric that's already in
+    the table is updated in place instead of being written twice.
+    """
+    insert = mysql.insert(Metric.__table__)
+    insert = insert.on_duplicate_key_update(value=insert.inserted.value)
+
+    for i in range(0, len(rows), INSERT_CHUNK_SIZE):
+        db.execute(insert, rows[i:i + INSERT_CHUNK_SIZE])
@@ -1,14 +1,17 @@
 import pyximport; pyximport.install()
 
+from datetime import datetime
 import json
 import os
-import subprocess
+import uuid
 
 from delorean import epoch
 from raven import Client
 from sqlalchemy import exc
+from sqlalchemy.dialects import mysql
 
 from gryphon.data_service.consts import *
+from gryphon.data_service.heartbeat import HeartbeatTicker
 from gryphon.data_service.queue_consumer import QueueConsumer
 from gryphon.lib import session
 from gryphon.lib.models.emeraldhavoc.trade import Trade
@@ -16,10 +19,13 @@ from gryphon.lib.money import Money
 
 s = Client(dsn=os.environ.get('SENTRY_DSN'))
 
+heartbeat = HeartbeatTicker('monit/heartbeat/trades_consumer.txt')
+
 
 def trades_consumer_function(message, db):
-    subprocess.call(['touch', 'monit/heartbeat/trades_consumer.txt'])
     trade_json = json.loads(message)
+    heartbeat.record(timestamp=float(trade_json['timestamp']))
+
     timestamp = epoch(trade_json['timestamp']).datetime
     price_currency = trade_json.get('price_currency', 'USD')
     volume_currency = trade_json.get('volume_currency', 'BTC')
@@ -48,18 +54,63 @@ def trades_consumer_function(message, db):
             raise e
 
 
+def trade_row(trade_json):
+    """Builds a row for a bulk insert into the trade table from a decoded message."""
+    price = Money(trade_json['price'], trade_json.get('price_currency', 'USD'))
+    volume = Money(trade_json['volume'], trade_json.get('volume_currency', 'BTC'))
+
+    return {
+        'unique_id': unicode(uuid.uuid4().hex),
+        'time_created': datetime.utcnow(),
+        'timestamp': epoch(trade_json['timestamp']).datetime,
+        'exchange': unicode(trade_json['exchange']),
+        'exchange_trade_id': unicode(trade_json['trade_id']),
+        'source': u'EXCHANGE',
+        'price': price.amount,
+        'price_currency': unicode(price.currency),
+        'volume': volume.amount,
+        'volume_currency': unicode(volume.currency),
+    }
+
+
+def trades_batch_consumer_function(messages, db):
+    """
+    Writes a batch of trades with a single multi-row insert. As in
+    trades_consumer_function, trades we already have (same exchange and
+    exchange_trade_id) are not an error, they're just left as they are.
+    """
+    trade_jsons = [json.loads(message) for message in messages]
+
+    heartbeat.record(
+        len(trade_jsons),
+        timestamp=max(float(t['timestamp']) for t in trade_jsons),
+    )
+
+    rows = [trade_row(trade_json) for trade_json in trade_jsons]
+
+    insert = mysql.insert(Trade.__table__).values(rows)
+    insert = insert.on_duplicate_key_update(
+        exchange_trade_id=insert.inserted.exchange_trade_id,
+    )
+
+    db.execute(insert)
+    session.commit_mysql_session(db)
+
+
 def main():
     db = session.get_a_gds_db_mysql_session()
 
     try:
         trades_consumer = QueueConsumer(
             os.environ.get('AMPQ_ADDRESS'),
-            trades_consumer_function,
+            trades_batch_consumer_function,
             db,
             EXCHANGE,
             EXCHANGE_TYPE,
             TRADES_BINDING_KEY,
             TRADES_QUEUE,
+            batch_size=CONSUMER_BATCH_SIZE,
+            batch_interval=CONSUMER_BATCH_INTERVAL,
         )
 
         trades_consumer.run()
@@ -9,6 +9,7 @@ from gryphon.execution.bots import shoebox
 from gryphon.lib import session
 from gryphon.lib.exchange import exchange_factory
 from gryphon.lib.logger import get_logger
+from gryphon.lib.models.datum import DatumRecorder
 from gryphon.lib.models.transaction import Transaction
 from gryphon.lib.scrapers.base import Scraper
 from gryphon.lib.scrapers.bmo import BMOScraper
@@ -27,6 +28,9 @@ BANK_AUDIT_HEARTBEAT_KEY = 'BANK_AUDIT_%s'
 def run():
     db = session.get_a_trading_db_mysql_session()
 
+    # Matching deposits records how long it took.
+    DatumRecorder().create(db=db)
+
     try:
         logger.info('Reporting for duty.')
 
@@ -26,7 +26,7 @@ from gryphon.lib.exchange import exceptions
 from gryphon.lib.exchange import order_types
 from gryphon.lib.exchange.consts import Consts
 from gryphon.lib.exchange.exchange_api_wrapper import ExchangeAPIWrapper
-from gryphon.lib.exchange.retry import exchange_retry
+from gryphon.lib.exchange.retry import exchange_retry, retry_if_exchange_exception
 from gryphon.lib.models.datum import Datum
 from gryphon.lib.models.event import EventRecorder
 from gryphon.lib.models.order import Order
@@ -78,6 +78,66 @@ class ExchangeCoordinator(object):
 
         return current_orders
 
+    ## Split versions of consolidate_ledger, for Harness.consolidate_ledgers_in_parallel.
+    # These let the harness fire every active exchange's requests before blocking on
+    # any of them. If a response fails we fall back on the serial, retrying call.
+
+    def open_orders_req(self):
+        return self.exchange_wrapper.get_open_orders_req()
+
+    def open_orders_resp(self, req):
+        try:
+            return self.exchange_wrapper.get_open_orders_resp(req)
+        except Exception as e:
+            if not retry_if_exchange_exception(e):
+                raise
+
+            return self.get_open_orders()
+
+    def prepare_accounting(self, open_orders):
+        """
+        Does the db side of consolidate_ledger up to the point where we need order
+        details from the exchange. Returns the eaten order ids, current orders and
+        their db orders for run_accounting, and the ids of the orders we need details
+        for.
+        """
+        eaten_order_ids, current_orders = self._get_current_orders(open_orders)
+        current_db_orders = self._get_current_db_orders(current_orders)
+
+        detail_order_ids = list(eaten_order_ids)
+
+        for current_order_from_exchange in current_orders:
+            current_order_from_db = current_db_orders[current_order_from_exchange['id']]
+
+            if (current_order_from_exchange['volume_remaining']
+                    < current_order_from_db.volume_remaining):
+                detail_order_ids.append(current_order_from_exchange['id'])
+
+        return eaten_order_ids, current_orders, current_db_orders, detail_order_ids
+
+    def order_details_req(self, order_ids):
+        return self.exchange_wrapper.get_multi_order_details_req_for_ids(order_ids)
+
+    def order_details_resp(self, req, order_ids):
+        try:
+            return self.exchange_wrapper.get_multi_order_details_resp_for_ids(
+                req,
+                order_ids,
+            )
+        except Exception as e:
+            if not retry_if_exchange_exception(e):
+                raise
+
+            return self.get_multi_order_details(order_ids)
+
+    def run_accounting(self, eaten_order_ids, current_orders, current_db_orders, order_details=None):
+        self._run_accounting(
+            eaten_order_ids,
+            current_orders,
+            order_details,
+            current_db_orders,
+        )
+
     @tick_profile
     def _get_current_orders(self, exchange_open_orders):
         db_open_orders = self._get_db_open_orders()
@@ -100,7 +160,18 @@ class ExchangeCoordinator(object):
 
         return eaten_order_ids, current_orders
 
-    def _run_accounting(self, eaten_order_ids, current_orders):
+    def _get_current_db_orders(self, current_orders):
+        """
+        The db orders for current_orders, keyed by exchange order id, in one query.
+        """
+        if not current_orders:
+            return {}
+
+        orders = self._get_orders_by_order_ids([o['id'] for o in current_orders])
+
+        return {o.exchange_order_id: o for o in orders}
+
+    def _run_accounting(self, eaten_order_ids, current_orders, order_details=None, current_db_orders=None):
         """
         This function runs before each tick and guarantees that our ledger is consistent
         with the exchange's state as we enter the tick body.
@@ -119,10 +190,14 @@ class ExchangeCoordinator(object):
 
         The only difference is for current orders we only do the last step if their
         volume_remaining has changed.
+
+        order_details optionally holds order details that have already been fetched
+        from the exchange, keyed by exchange order id, and current_db_orders the db
+        orders for current_orders, as returned by _get_current_db_orders.
         """
 
         if eaten_order_ids:
-            eaten_order_details = self.get_multi_order_details(eaten_order_ids)
+            eaten_order_details = self._get_order_details(eaten_order_ids, order_details)
             order_ids = eaten_order_details.keys()
             orders = self._get_orders_by_order_ids(order_ids)
 
@@ -131,24 +206,30 @@ class ExchangeCoordinator(object):
 
                 position_change, position_change_no_fees = order.was_eaten(order_data)
                 self._save_order(order)
-                self.update_position(position_change, position_change_no_fees)
+                self.update_position(
+                    position_change,
+                    position_change_no_fees,
+                    actor=order.actor,
+                )
 
                 self.harness.log_trade(
                     position_change_no_fees[self.exchange_wrapper.currency],
                     position_change_no_fees[self.exchange_wrapper.volume_currency],
                 )
 
+        if current_db_orders is None:
+            current_db_orders = self._get_current_db_orders(current_orders)
+
         for current_order_from_exchange in current_orders:
-            current_order_from_db = self._get_orders_by_order_ids(
-                [current_order_from_exchange['id']],
-            )[0]
+            current_order_from_db = current_db_orders[current_order_from_exchange['id']]
 
             # Partially filled.
             if (current_order_from_exchange['volume_remaining'] 
                     < current_order_from_db.volume_remaining):
 
-                details_result = self.get_multi_order_details(
+                details_result = self._get_order_details(
                     [current_order_from_exchange['id']],
+                    order_details,
                 )
 
                 current_order_details = details_result[current_order_from_exchange['id']]
@@ -156,13 +237,23 @@ class ExchangeCoordinator(object):
                 position_change, position_change_no_fees = current_order_from_db.was_partially_eaten(current_order_details)
 
                 self._save_order(current_order_from_db)
-                self.update_position(position_change, position_change_no_fees)
+                self.update_position(
+                    position_change,
+                    position_change_no_fees,
+                    actor=current_order_from_db.actor,
+                )
 
                 self.harness.log_trade(
                     position_change_no_fees[self.exchange_wrapper.currency],
                     position_change_no_fees[self.exchange_wrapper.volume_currency],
                 )
 
+    def _get_order_details(self, order_ids, order_details=None):
+        if order_details is not None and all(o in order_details for o in order_ids):
+            return {o: order_details[o] for o in order_ids}
+
+        return self.get_multi_order_details(order_ids)
+
     def handle_unexpected_orders(self, unexpected_order_ids):
         """
         Any orders that we find are open on the exchange account, but according to
@@ -222,9 +313,10 @@ class ExchangeCoordinator(object):
             .options(joinedload('datums'))\
             .all()
 
-    def update_position(self, position_change, position_change_no_fees):
+    def update_position(self, position_change, position_change_no_fees, actor=None):
         """
-        Formerly harness:update_position.
+        Formerly harness:update_position. If the change came from one of the strategy's
+        orders (actor), the strategy's position tracker is updated too.
         """ 
         for currency_code, position in position_change.iteritems():
             self.exchange_account.position[currency_code] += position
@@ -233,6 +325,19 @@ class ExchangeCoordinator(object):
         self.db.add(self.exchange_account)
         commit_mysql_session(self.db)
 
+        position_tracker = self._strategy_position_tracker()
+
+        if actor and position_tracker:
+            position_tracker.apply(actor, position_change_no_fees)
+
+    def _strategy_position_tracker(self):
+        strategy = getattr(self.harness, 'strategy', None)
+
+        if strategy is None:
+            return None
+
+        return strategy.position_tracker
+
     ## Trading interface functions. ##
 
     def limit_order(self, mode, volume, price, extra_data=[]):
@@ -420,23 +525,34 @@ class ExchangeCoordinator(object):
             ))
 
     # Audits. #
-    def audit(self, audit_types):
-        self.exchange_wrapper.pre_audit(exchange_data=self.exchange_account)
+    def audit(self, audit_types, audit_data=None):
+        """
+        audit_data is an optional auditing.AuditData with the exchange's side of the
+        audits already fetched (see Harness.full_audit), in which case the caller is
+        responsible for having called pre_audit before fetching it.
+        """
+        if audit_data is None:
+            self.exchange_wrapper.pre_audit(exchange_data=self.exchange_account)
+            audit_data = auditing.AuditData()
+
         volume_tolerance = self.exchange_wrapper.volume_balance_tolerance
         fiat_tolerance = self.exchange_wrapper.fiat_balance_tolerance
 
         event_data = {}
 
         if auditing.ORDER_AUDIT in audit_types:
-            order_audit_data = self.order_audit()
+            order_audit_data = self.order_audit(audit_data.order_audit_data)
 
             if order_audit_data:
                 event_data['order_data'] = order_audit_data
 
-        balance_audit_data = None
+        balance_audit_data = audit_data.exchange_balance
 
         if auditing.VOLUME_BALANCE_AUDIT in audit_types:
-            balance_audit_data = self.volume_balance_audit(volume_tolerance)
+            balance_audit_data = self.volume_balance_audit(
+                volume_tolerance,
+                exchange_balance=balance_audit_data,
+            )
 
             if balance_audit_data:
                 event_data['balance_data'] = balance_audit_data
@@ -491,11 +607,15 @@ class ExchangeCoordinator(object):
         )
 
     @exchange_retry()
-    def order_audit(self):
+    def order_audit(self, prefetched_order_audit_data=None):
         self.harness.log('order_audit()', log_level='debug')
 
         try:
-            order_audit_data = auditing.order_audit(self.db, self.exchange_wrapper)
+            order_audit_data = auditing.order_audit(
+                self.db,
+                self.exchange_wrapper,
+                audit_data=prefetched_order_audit_data,
+            )
         except auditing.OrderAuditException as e:
             # These are all the orders which failed the order audit.
             failed_order_ids = [d[0] for d in e.failed_order_data]
@@ -11,22 +11,27 @@ backtesting. For this, you can write another harness (so long as it conforms to
 interface), and reimplement the interface functions in a different way.
 """
 
+from collections import OrderedDict
 from sets import Set
 import termcolor as tc
 import time
 
 from cdecimal import ROUND_UP, ROUND_DOWN
+from concurrent.futures import ThreadPoolExecutor
 from delorean import Delorean
 from sqlalchemy.orm import joinedload
 
 from gryphon.execution.lib import auditing
+from gryphon.execution.lib.tick_scheduler import TickScheduler
 from gryphon.execution.harness.exchange_coordinator import ExchangeCoordinator
 from gryphon.lib import configuration as config_lib
 from gryphon.lib.configurable_object import ConfigurableObject
 from gryphon.lib.exchange import exchange_factory
+from gryphon.lib.exchange import session_pool
 from gryphon.lib.exchange.retry import exchange_retry
 from gryphon.lib.exchange.consts import Consts
 from gryphon.lib.exchange.exceptions import CancelOrderNotFoundError
+from gryphon.lib.forex import FXSnapshot
 from gryphon.lib.logger import get_logger
 from gryphon.lib.models.datum import DatumRecorder
 from gryphon.lib.models.order import Order
@@ -38,20 +43,39 @@ from gryphon.lib.util.profile import tick_profile
 logger = get_logger(__name__)
 
 ORDERBOOK_DELAY_SAMPLE_SIZE = 10
+AUDIT_WORKERS = 10
+
+_EXCHANGE_KEYS = frozenset(k.lower() for k in exchange_factory.ALL_EXCHANGE_KEYS)
 
 
 class Harness(ConfigurableObject):
     def __init__(self, db, configuration):
         self.db = db
+        self.configuration = configuration
 
         self.strategy = None
 
+        # The exchange rates for the current tick, and optionally a snapshot that
+        # overrides them on every tick (e.g. historical rates in a backtest).
+        self._fx_snapshot = None
+        self.pinned_fx_snapshot = None
+
+        # Threads for fetching audit data, kept around between audits.
+        self._audit_executor = None
+
+        self._tick_scheduler = None
+
         # Configurables.
         self.execute = False
         self.emerald = False
         self.audit = False
         self.audit_tick = 100
         self.audit_types = []
+        self.parallel_consolidation = False
+        self.parallel_audits = False
+        self.tick_on_orderbook_updates = False
+        self.http_max_workers = None
+        self.http_connections_per_host = None
 
         if configuration:
             self.configure(configuration)
@@ -64,6 +88,16 @@ class Harness(ConfigurableObject):
         self.init_configurable('audit', configuration['platform'])
         self.init_configurable('audit_tick', configuration['platform'])
         self.init_configurable('audit_types', configuration['platform'])
+        self.init_configurable('parallel_consolidation', configuration['platform'])
+        self.init_configurable('parallel_audits', configuration['platform'])
+        self.init_configurable('tick_on_orderbook_updates', configuration['platform'])
+        self.init_configurable('http_max_workers', configuration['platform'])
+        self.init_configurable('http_connections_per_host', configuration['platform'])
+
+        session_pool.configure(
+            max_workers=self.http_max_workers,
+            connections_per_host=self.http_connections_per_host,
+        )
 
         if type(self.audit_types) is str:
             if self.audit_types.lower() == 'all':
@@ -79,35 +113,66 @@ class Harness(ConfigurableObject):
         Only those exchanges which have an initialized ledger and proper credentials
         will be 'tradable', or able to access authenticated endpoints. You can tell
         which exchanges are tradable by looking at harness.tradable_exchanges.
+
+        Each coordinator brings its own requests session, worker threads and ledger
+        lookups, and most strategies only use a couple of exchanges, so coordinators
+        are created the first time they are asked for, either through
+        exchange_from_key or as an attribute, e.g. harness.bitstamp_btc_usd.
+        harness.exchanges and the properties built on it only cover the coordinators
+        that have been created so far, which includes every exchange we have traded on.
         """
 
-        self.exchanges = []
+        self._coordinators = OrderedDict()
 
-        for exchange_name in exchange_factory.ALL_EXCHANGE_KEYS:
-            api_wrapper_class = exchange_factory.get_api_wrapper_class_by_name(
-                exchange_name,
-            )
+    def exchange_from_key(self, exchange_name):
+        exchange_name = exchange_name.lower()
 
-            exchange_coordinator = ExchangeCoordinator(
-                api_wrapper_class(configuration=configuration),
-                self.db,
-                self,
-            )
+        if exchange_name not in self._coordinators:
+            self._coordinators[exchange_name] = self._create_coordinator(exchange_name)
 
-            setattr(self, exchange_name.lower(), exchange_coordinator)
+        return self._coordinators[exchange_name]
+
+    def _create_coordinator(self, exchange_name):
+        if exchange_name not in _EXCHANGE_KEYS:
+            raise KeyError(exchange_name)
+
+        api_wrapper_class = exchange_factory.get_api_wrapper_class_by_name(
+            exchange_name,
+        )
 
-            self.exchanges.append(exchange_coordinator)
+        exchange_coordinator = ExchangeCoordinator(
+            api_wrapper_class(configuration=self.configuration),
+            self.db,
+            self,
+        )
 
-        self.log('The following exchanges will be tradable: %s' % (
-            [e.name for e in self.tradable_exchanges],
+        self.log('Loaded %s (%s)' % (
+            exchange_coordinator.name,
+            'tradable' if exchange_coordinator.is_tradable else 'not tradable',
         ))
 
-    def exchange_from_key(self, exchange_name):
-        return self._exchange_dict[exchange_name.lower()]
+        # Get the connection to the exchange going before the first tick needs it.
+        exchange_coordinator.exchange_wrapper.prewarm_session()
+
+        return exchange_coordinator
+
+    def __getattr__(self, name):
+        """
+        Coordinators are available as attributes named after their exchange key, e.g.
+        harness.bitstamp_btc_usd, and are created on first access.
+        """
+        if name in _EXCHANGE_KEYS:
+            return self.exchange_from_key(name)
+
+        raise AttributeError(
+            '\'%s\' object has no attribute \'%s\'' % (
+            self.__class__.__name__,
+            name,
+        ))
 
     @property
-    def _exchange_dict(self):
-        return {e.name.lower(): e for e in self.exchanges}
+    def exchanges(self):
+        return self._coordinators.values()
 
     @property
     def tradable_exchanges(self):
@@ -140,6 +205,13 @@ class Harness(ConfigurableObject):
         had trading activity on them or because the strategy listed them in
         target_exchanges. Only tradable exchanges are auditable.
         """
+
+        # Make sure we have coordinators for all of the targets, even if the strategy
+        # hasn't used them yet.
+        for exchange_name in self.strategy.target_exchanges:
+            if isinstance(exchange_name, basestring):
+                self.exchange_from_key(exchange_name)
+
         return [
             e for e in self.tradable_exchanges
             if e.is_active or e.name in self.strategy.target_exchanges
@@ -152,6 +224,8 @@ class Harness(ConfigurableObject):
         Consolidate the ledgers and the tick the strategy.
         """
 
+        self.discard_fx_snapshot()
+
         self.pre_tick_algo()
 
         current_orders = self.consolidate_ledgers()
@@ -160,6 +234,41 @@ class Harness(ConfigurableObject):
 
         self.tick_algo(current_orders)
 
+    @property
+    def fx_snapshot(self):
+        """
+        A snapshot of the exchange rates, taken the first time it's asked for in a tick
+        and reused for the rest of it. Pass it to Money.to() in code that converts a lot
+        of prices.
+        """
+        if self.pinned_fx_snapshot is not None:
+            return self.pinned_fx_snapshot
+
+        if self._fx_snapshot is not None and self._fx_snapshot.is_stale():
+            DatumRecorder().record(
+                'FX_SNAPSHOT_STALE_AGE',
+                numeric_value=self._fx_snapshot.age,
+            )
+
+            self.discard_fx_snapshot()
+
+        if self._fx_snapshot is None:
+            self._fx_snapshot = FXSnapshot.current()
+
+        return self._fx_snapshot
+
+    def discard_fx_snapshot(self):
+        """
+        Record how many rates the snapshot was missing before we let it go.
+        """
+        if self._fx_snapshot is not None and self._fx_snapshot.miss_count:
+            DatumRecorder().record(
+                'FX_SNAPSHOT_MISSES',
+                numeric_value=self._fx_snapshot.miss_count,
+            )
+
+        self._fx_snapshot = None
+
     @tick_profile
     def pre_tick_algo(self):
         self.strategy.pre_tick()
@@ -176,6 +285,41 @@ class Harness(ConfigurableObject):
         # It can be a property of the strategy and still a built-in argument.
         return self.strategy.tick_sleep
 
+    @property
+    def tick_scheduler(self):
+        """
+        With tick_on_orderbook_updates, we tick when one of the strategy's target
+        exchanges' orderbooks changes, but no more often than the slowest of their
+        max_tick_speeds, and no less often than tick_sleep. target_exchanges can hold
+        exchange names or the coordinators themselves.
+        """
+        if self._tick_scheduler is None:
+            exchange_names = [
+                getattr(exchange, 'name', exchange)
+                for exchange in self.strategy.target_exchanges
+            ]
+
+            if not exchange_names:
+                self.log(
+                    'The strategy has no target_exchanges, so it will only tick every '
+                    'tick_sleep seconds',
+                    color='yellow',
+                    log_level='warning',
+                )
+
+            tick_speeds = [
+                self.exchange_from_key(name).exchange_wrapper.max_tick_speed
+                for name in exchange_names
+            ]
+
+            self._tick_scheduler = TickScheduler(
+                exchange_names,
+                min_interval=max(tick_speeds or [0]),
+                max_interval=self.sleep_time_to_next_tick(),
+            )
+
+        return self._tick_scheduler
+
     def pre_tick_logging(self, current_orders):
         self.log_position()
         self.log_balances()
@@ -187,6 +331,9 @@ class Harness(ConfigurableObject):
         that we've been making trades on.
         """
 
+        if self.parallel_consolidation:
+            return self.consolidate_ledgers_in_parallel()
+
         current_orders = {}
 
         for exchange in self.active_exchanges:
@@ -195,6 +342,57 @@ class Harness(ConfigurableObject):
 
         return current_orders
 
+    def consolidate_ledgers_in_parallel(self):
+        """
+        The same as the serial path through consolidate_ledgers, but we send every
+        active exchange's open orders request before waiting on any of them, and then
+        do the same for their order details requests, so a tick waits on the slowest
+        exchange instead of the sum of them. The db work is still done one exchange at
+        a time.
+        """
+
+        exchanges = self.active_exchanges
+
+        open_orders_reqs = [e.open_orders_req() for e in exchanges]
+
+        open_orders = [
+            e.open_orders_resp(req) for e, req in zip(exchanges, open_orders_reqs)
+        ]
+
+        accounting_data = [
+            e.prepare_accounting(o) for e, o in zip(exchanges, open_orders)
+        ]
+
+        order_details_reqs = []
+
+        for exchange, (_, _, _, detail_order_ids) in zip(exchanges, accounting_data):
+            if detail_order_ids:
+                order_details_reqs.append(exchange.order_details_req(detail_order_ids))
+            else:
+                order_details_reqs.append(None)
+
+        current_orders = {}
+
+        for exchange, data, req in zip(exchanges, accounting_data, order_details_reqs):
+            (eaten_order_ids, exchange_current_orders, current_db_orders,
+                detail_order_ids) = data
+
+            order_details = None
+
+            if req is not None:
+                order_details = exchange.order_details_resp(req, detail_order_ids)
+
+            exchange.run_accounting(
+                eaten_order_ids,
+                exchange_current_orders,
+                current_db_orders,
+                order_details,
+            )
+
+            current_orders[exchange.name] = exchange_current_orders
+
+        return current_orders
+
     ## Harness Interface Functions. ##
 
     def strategy_complete(self):
@@ -245,6 +443,8 @@ class Harness(ConfigurableObject):
             logger.info(result_string)
         elif log_level == 'debug':
             logger.debug(result_string)
+        elif log_level == 'warning':
+            logger.warning(result_string)
         elif log_level == 'error':
             logger.error(result_string)
         elif log_level == 'critical':
@@ -342,6 +542,81 @@ class Harness(ConfigurableObject):
         if wind_down:
             self.wind_down()
 
-        for exchange in self.auditable_exchanges:
-            exchange.audit(self.audit_types)
+        exchanges = self.auditable_exchanges
+        audit_data = {}
+
+        if self.parallel_audits:
+            audit_data = self.fetch_audit_data(exchanges)
+
+        for exchange in exchanges:
+            start_time = time.time()
+            exchange_audit_data = audit_data.get(exchange.name)
+
+            exchange.audit(self.audit_types, audit_data=exchange_audit_data)
+
+            self.record_audit_time(
+                exchange,
+                time.time() - start_time,
+                exchange_audit_data,
+            )
+
+        # The strategy's position spans all of its exchanges, so its tracker is
+        # reconciled once per audit rather than in every exchange's position audit.
+        if auditing.POSITION_CACHE_AUDIT in self.audit_types and self.strategy:
+            self.strategy.position_tracker.reconcile()
+
+    def fetch_audit_data(self, exchanges):
+        """
+        Fetch the exchange side of every exchange's audits (balances and order audit
+        data) at the same time on the audit worker threads, so that an audit waits on
+        the slowest exchange instead of the sum of them. The db work is still done one
+        exchange at a time in full_audit.
+
+        pre_audit can move funds around, so it runs for every exchange before we fetch
+        anything. If an exchange's fetch fails, its audit fetches the data itself with
+        the usual retries.
+        """
+        for exchange in exchanges:
+            exchange.exchange_wrapper.pre_audit(exchange_data=exchange.exchange_account)
+
+        futures = [
+            self.audit_executor.submit(
+                auditing.fetch_audit_data,
+                exchange.exchange_wrapper,
+                self.audit_types,
+            )
+            for exchange in exchanges
+        ]
+
+        audit_data = {}
+
+        for exchange, future in zip(exchanges, futures):
+            try:
+                audit_data[exchange.name] = future.result()
+            except Exception as e:
+                self.log(
+                    'Could not fetch audit data for %s: %s',
+                    (exchange.name, e),
+                    'red',
+                )
+
+                audit_data[exchange.name] = auditing.AuditData()
+
+        return audit_data
+
+    @property
+    def audit_executor(self):
+        if self._audit_executor is None:
+            self._audit_executor = ThreadPoolExecutor(max_workers=AUDIT_WORKERS)
+
+        return self._audit_executor
+
+    def record_audit_time(self, exchange, audit_time, audit_data=None):
+        fetch_time = audit_data.fetch_time if audit_data else 0
+
+        DatumRecorder().record(
+            'AUDIT_TIME_%s' % exchange.name.upper(),
+            numeric_value=fetch_time + audit_time,
+            meta_data={'fetch_time': fetch_time, 'reconcile_time': audit_time},
+        )
 
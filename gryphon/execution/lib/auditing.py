@@ -3,6 +3,8 @@ Functions that run checks on an exchange account to verify that our ledger is co
 with the exchange state.
 """
 
+import time
+
 from cdecimal import Decimal
 import termcolor as tc
 
@@ -48,6 +50,38 @@ class OrderAuditException(AuditException):
         self.message = message
 
 
+class AuditData(object):
+    """
+    The parts of an exchange's audits that come from the exchange API, fetched ahead of
+    time so that several exchanges' can be fetched at once. Anything that's None will
+    be fetched by the audit itself.
+    """
+
+    def __init__(self, order_audit_data=None, exchange_balance=None, fetch_time=0):
+        self.order_audit_data = order_audit_data
+        self.exchange_balance = exchange_balance
+        self.fetch_time = fetch_time
+
+
+def fetch_audit_data(exchange, audit_types):
+    """
+    Does the network requests for exchange's audits and nothing else, so it is safe to
+    call from a worker thread.
+    """
+    start_time = time.time()
+    audit_data = AuditData()
+
+    if ORDER_AUDIT in audit_types:
+        audit_data.order_audit_data = exchange.get_order_audit_data()
+
+    if VOLUME_BALANCE_AUDIT in audit_types or FIAT_BALANCE_AUDIT in audit_types:
+        audit_data.exchange_balance = exchange.get_balance()
+
+    audit_data.fetch_time = time.time() - start_time
+
+    return audit_data
+
+
 def audit(exchange_key):
     db = session.get_a_trading_db_mysql_session()
 
@@ -130,8 +164,10 @@ def close_enough(a, b, tolerance):
     return abs(a - b) <= tolerance
 
 
-def order_audit(db, exchange, skip_recent=0, tolerance=Decimal('0')):
-    audit_data = exchange.get_order_audit_data(skip_recent=skip_recent)
+def order_audit(db, exchange, skip_recent=0, tolerance=Decimal('0'), audit_data=None):
+    if audit_data is None:
+        audit_data = exchange.get_order_audit_data(skip_recent=skip_recent)
+
     exchange_order_ids = audit_data.keys()
 
     if not exchange_order_ids:  # No point hitting the database to check for no trades.
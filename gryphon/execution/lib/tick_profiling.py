@@ -4,12 +4,18 @@ Functions we use to record tick time performance stats.
 
 from delorean import Delorean
 
+from gryphon.lib.exchange import endpoint_metrics
 from gryphon.lib.models.datum import Datum, DatumRecorder
 from gryphon.lib.util.profile import tick_profile, tick_profile_data
 
 
 TICK_SAMPLE_SIZE = 10
 TICK_BLOCK_SAMPLE_SIZE = 100
+ENDPOINT_LATENCY_SAMPLE_SIZE = 100
+
+# Latency histograms waiting to be recorded, by datum name. Like record_mean, we
+# accumulate ENDPOINT_LATENCY_SAMPLE_SIZE timed calls before writing a datum.
+endpoint_histograms = {}
 
 
 def record_tick_data(tick_start, strategy_name):
@@ -20,6 +26,26 @@ def record_tick_data(tick_start, strategy_name):
     DatumRecorder().record_mean(datum_name, tick_length, TICK_SAMPLE_SIZE)
 
 
+def record_datum_queue_data(strategy_name):
+    """
+    Record how often the datum queue filled up mid-tick, and how many datums were lost
+    to failed flushes, since the last time we checked.
+    """
+    backpressure_count, dropped_count = DatumRecorder().drain_counts()
+
+    if backpressure_count:
+        DatumRecorder().record(
+            '%s_DATUM_BACKPRESSURE' % strategy_name.upper(),
+            numeric_value=backpressure_count,
+        )
+
+    if dropped_count:
+        DatumRecorder().record(
+            '%s_DATUMS_DROPPED' % strategy_name.upper(),
+            numeric_value=dropped_count,
+        )
+
+
 def record_tick_block_data(algo, tick_count, strategy_name):
     for function_name, profile_times in tick_profile_data.iteritems():
         datum_name = datum_name_for_function_block(strategy_name, function_name)
@@ -30,6 +56,83 @@ def record_tick_block_data(algo, tick_count, strategy_name):
         tick_profile_data[function_name] = []
 
 
+def record_endpoint_data(strategy_name):
+    """
+    Record the mean latency of each exchange endpoint we called this tick, how many of
+    those calls failed, and the latency histogram. The histogram datum's meta_data has
+    the bucket upper bounds (the last bucket is unbounded) and the count in each.
+    """
+    stats = endpoint_metrics.drain_endpoint_stats()
+
+    for (exchange_name, endpoint), endpoint_stats in stats.iteritems():
+        latency_datum_name = datum_name_for_endpoint(
+            strategy_name,
+            'API_LATENCY',
+            exchange_name,
+            endpoint,
+        )
+
+        if endpoint_stats.mean_latency is not None:
+            DatumRecorder().record_mean(
+                latency_datum_name,
+                endpoint_stats.mean_latency,
+                ENDPOINT_LATENCY_SAMPLE_SIZE,
+            )
+
+            histogram_datum_name = datum_name_for_endpoint(
+                strategy_name,
+                'API_LATENCY_HISTOGRAM',
+                exchange_name,
+                endpoint,
+            )
+
+            record_endpoint_histogram(histogram_datum_name, endpoint_stats)
+
+        if endpoint_stats.error_count:
+            error_datum_name = datum_name_for_endpoint(
+                strategy_name,
+                'API_ERRORS',
+                exchange_name,
+                endpoint,
+            )
+
+            DatumRecorder().record(
+                error_datum_name,
+                numeric_value=endpoint_stats.error_count,
+            )
+
+
+def record_endpoint_histogram(datum_name, endpoint_stats):
+    if datum_name not in endpoint_histograms:
+        endpoint_histograms[datum_name] = endpoint_metrics.EndpointStats()
+
+    histogram = endpoint_histograms[datum_name]
+    histogram.merge(endpoint_stats)
+
+    if histogram.timed_count >= ENDPOINT_LATENCY_SAMPLE_SIZE:
+        DatumRecorder().record(
+            datum_name,
+            numeric_value=histogram.max_latency,
+            meta_data={
+                'bucket_bounds': list(endpoint_metrics.LATENCY_BUCKETS),
+                'bucket_counts': histogram.histogram,
+            },
+        )
+
+        del endpoint_histograms[datum_name]
+
+
+def datum_name_for_endpoint(strategy_name, stat_name, exchange_name, endpoint):
+    datum_name = '%s_%s_%s_%s' % (
+        strategy_name.upper(),
+        stat_name,
+        exchange_name.upper(),
+        endpoint.upper(),
+    )
+
+    return datum_name
+
+
 def datum_name_for_function_block(strategy_name, function_name):
     datum_name = '%s_TICK_BLOCK_TIME_%s' % (
         strategy_name.upper(),
@@ -0,0 +1,125 @@
+"""
+Decides when a bot's next tick should start.
+
+By default live_runner sleeps for the strategy's tick_sleep between ticks, which means
+reacting to orderbook changes up to tick_sleep seconds late, and ticking when nothing
+has changed. The data service's orderbook pollers publish to a redis channel for their
+exchange whenever they write a new orderbook. With a TickScheduler the bot instead
+subscribes to those channels for its target exchanges and starts the next tick as soon
+as one of their books changes, but:
+
+  - never sooner than min_interval after the last tick started, which should be the
+    slowest max_tick_speed of the exchanges involved.
+  - never later than max_interval after it, so a bot still ticks on a timer when the
+    books are quiet or redis is unavailable.
+"""
+
+import time
+
+from gryphon.lib import packed_orderbook
+from gryphon.lib.logger import get_logger
+from gryphon.lib.session import get_a_redis_connection
+
+logger = get_logger(__name__)
+
+# How often we check whether we've been asked to shut down while waiting.
+POLL_INTERVAL = 0.1  # Seconds.
+
+
+class TickScheduler(object):
+    def __init__(self, exchange_names, min_interval, max_interval, redis_client=None):
+        self.channels = [
+            packed_orderbook.orderbook_updates_channel(name) for name in exchange_names
+        ]
+
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+
+        self.redis_client = redis_client
+        self.pubsub = None
+
+        # How many ticks were started by an orderbook update vs. by the timer.
+        self.update_count = 0
+        self.timer_count = 0
+
+    def wait_for_next_tick(self, last_tick_start, should_stop=None):
+        """
+        Block until it's time for the next tick. last_tick_start is an epoch timestamp.
+        Returns True if we were woken by an orderbook update, and False if we fell back
+        on the timer or should_stop() became true.
+        """
+        self.subscribe()
+
+        earliest_tick = last_tick_start + self.min_interval
+        latest_tick = last_tick_start + self.max_interval
+
+        updated = False
+
+        while True:
+            if should_stop and should_stop():
+                return False
+
+            now = time.time()
+
+            if now >= latest_tick:
+                self.timer_count += 1
+                return False
+
+            if updated and now >= earliest_tick:
+                self.update_count += 1
+                return True
+
+            timeout = min(POLL_INTERVAL, latest_tick - now)
+
+            if updated:
+                timeout = min(timeout, earliest_tick - now)
+
+            if updated or self.pubsub is None:
+                time.sleep(timeout)
+            else:
+                updated = self.wait_for_update(timeout)
+
+    def wait_for_update(self, timeout):
+        try:
+            message = self.pubsub.get_message(timeout=timeout)
+
+            if message is None:
+                return False
+
+            # Several updates may have queued up during the last tick. They're all
+            # covered by the tick we're about to start.
+            while self.pubsub.get_message() is not None:
+                pass
+
+            return True
+        except Exception as e:
+            logger.info('Lost orderbook update subscription: %s' % e)
+            self.unsubscribe()
+
+            return False
+
+    def subscribe(self):
+        if self.pubsub is not None or not self.channels:
+            return
+
+        try:
+            if self.redis_client is None:
+                self.redis_client = get_a_redis_connection()
+
+            pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(*self.channels)
+
+            self.pubsub = pubsub
+        except Exception as e:
+            logger.info(
+                'Could not subscribe to orderbook updates, ticking on a timer: %s' % e,
+            )
+
+    def unsubscribe(self):
+        pubsub = self.pubsub
+        self.pubsub = None
+
+        try:
+            pubsub.close()
+        except Exception:
+            pass
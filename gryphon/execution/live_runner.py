@@ -75,6 +75,22 @@ def warm_shutdown(harness, db, sentry, execute):
         ))
 
 
+def flush_datums(sentry):
+    """
+    Write out the datums buffered during the tick. A failure here shouldn't take down
+    the tick loop, so we just report it.
+    """
+    try:
+        DatumRecorder().flush()
+    except Exception as e:
+        sentry.captureException()
+
+        logger.exception(tc.colored(
+            '[%s] %s' % (e.__class__.__name__, e.message),
+            'red',
+        ))
+
+
 def restart():
     """
     execv replaces the current process with a new one which will reload the entire
@@ -239,7 +255,7 @@ def live_run(configuration):
 
     if execute:
         EventRecorder().create(db=db)
-        DatumRecorder().create(db=db)
+        DatumRecorder().create(db=db, buffered=True)
     else:
         EventRecorder().create()
         DatumRecorder().create()
@@ -283,12 +299,15 @@ def live_run(configuration):
                     harness.post_tick(tick_count)
 
                 tick_profiling.record_tick_data(tick_start, strategy.name)
+                tick_profiling.record_datum_queue_data(strategy.name)
                 tick_profiling.record_tick_block_data(
                     strategy,
                     tick_count,
                     strategy.name,
                 )
 
+                tick_profiling.record_endpoint_data(strategy.name)
+
                 heartbeat.heartbeat(strategy.name)
 
             except Exception as e:
@@ -301,15 +320,22 @@ def live_run(configuration):
 
                 exception_retry_loop(harness, sentry, db)
             finally:
+                flush_datums(sentry)
                 session.commit_mysql_session(db)
                 tick_count += 1
 
             if harness.strategy_complete() is True:
                 break
+            elif harness.tick_on_orderbook_updates is True:
+                harness.tick_scheduler.wait_for_next_tick(
+                    tick_start,
+                    should_stop=lambda: warm_shutdown_flag,
+                )
             else:
                 gentle_sleep(harness.sleep_time_to_next_tick())
     finally:
         warm_shutdown(harness, db, sentry, execute)
+        flush_datums(sentry)
         session.commit_mysql_session(db)
         db.remove()
 
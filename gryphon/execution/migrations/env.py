@@ -35,6 +35,7 @@ from gryphon.lib.models.event import Event
 from gryphon.lib.models.transaction import Transaction
 from gryphon.lib.models.datum import Datum
 from gryphon.lib.models.liability import Liability
+from gryphon.lib.models.ledger_checkpoint import LedgerCheckpoint
 
 from gryphon.execution.models.backtesting.result_trade import ResultTrade
 from gryphon.execution.models.backtesting.result import Result
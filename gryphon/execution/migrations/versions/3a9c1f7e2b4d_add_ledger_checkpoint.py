@@ -0,0 +1,43 @@
+"""Add ledger_checkpoint
+
+Revision ID: 3a9c1f7e2b4d
+Revises: 4ee15d6375e
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '3a9c1f7e2b4d'
+down_revision = '4ee15d6375e'
+
+from alembic import op
+import sqlalchemy as sa
+
+from gryphon.lib.models.exchange import JSONEncodedMoneyDict
+sa.JSONEncodedMoneyDict = JSONEncodedMoneyDict
+
+def upgrade():
+    op.create_table('ledger_checkpoint',
+    sa.Column('ledger_checkpoint_id', sa.Integer(), nullable=False),
+    sa.Column('unique_id', sa.Unicode(length=64), nullable=False),
+    sa.Column('time_created', sa.DateTime(), nullable=False),
+    sa.Column('exchange_name', sa.Unicode(length=64), nullable=False),
+    sa.Column('checkpoint_time', sa.DateTime(), nullable=False),
+    sa.Column('include_pending', sa.Boolean(), nullable=False),
+    sa.Column('balance', sa.JSONEncodedMoneyDict(), nullable=True),
+    sa.PrimaryKeyConstraint('ledger_checkpoint_id')
+    )
+    op.create_index(
+        op.f('ix_ledger_checkpoint_checkpoint_time'),
+        'ledger_checkpoint',
+        ['checkpoint_time'],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index(
+        op.f('ix_ledger_checkpoint_checkpoint_time'),
+        table_name='ledger_checkpoint',
+    )
+    op.drop_table('ledger_checkpoint')
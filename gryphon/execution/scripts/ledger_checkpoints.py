@@ -0,0 +1,62 @@
+"""
+Writes a LedgerCheckpoint at every midnight (UTC) for each initialized ledger, so that
+assets.ledger_balance(..., use_checkpoints=True), which the dashboards use, only has to
+aggregate the ledger entries since the last one.
+
+A day is only checkpointed once it's settled, SETTLEMENT_PERIOD after it ends, since
+trades and transactions can show up in the ledger late. Run this once a day, e.g. from
+cron:
+
+Usage:
+    gryphon-exec script ledger_checkpoints [--execute]
+"""
+
+import pyximport; pyximport.install()
+
+from datetime import timedelta
+
+from delorean import Delorean
+
+from gryphon.lib import assets
+from gryphon.lib import session
+from gryphon.lib.exchange import exchange_factory
+from gryphon.lib.logger import get_logger
+
+logger = get_logger(__name__)
+
+SETTLEMENT_PERIOD = timedelta(days=1)
+
+
+def create_checkpoints(db, settled_time):
+    checkpoints = []
+
+    for exchange_name in exchange_factory.initialized_ledgers(db):
+        for include_pending in [False, True]:
+            checkpoints += assets.create_daily_ledger_checkpoints(
+                db,
+                exchange_name,
+                settled_time,
+                include_pending=include_pending,
+            )
+
+    return checkpoints
+
+
+def main(script_arguments, execute):
+    db = session.get_a_trading_db_mysql_session()
+
+    try:
+        settled_time = Delorean().truncate('day').datetime - SETTLEMENT_PERIOD
+
+        checkpoints = create_checkpoints(db, settled_time)
+
+        for checkpoint in checkpoints:
+            logger.info('Checkpoint: %s' % checkpoint)
+
+        if execute is True:
+            session.commit_mysql_session(db)
+            logger.info('Committed %s checkpoints' % len(checkpoints))
+        else:
+            logger.info('Not committing because execute=False')
+    finally:
+        db.remove()
@@ -30,6 +30,7 @@ class Strategy(ConfigurableObject):
         self.harness = harness
 
         self._position = None
+        self._position_tracker = None
         self.order_class = Order
 
         # Configurable properties with defaults only below this line.
@@ -100,19 +101,39 @@ class Strategy(ConfigurableObject):
         """
         return self.__class__.__name__
    
+    @property
+    def fx_snapshot(self):
+        """
+        The harness's exchange rate snapshot for this tick. Pass it to Money.to() and the
+        pricing functions in gryphon.lib so they all convert at the same rates.
+        """
+        if self.harness is None:
+            return None
+
+        return self.harness.fx_snapshot
+
+    @property
+    def position_tracker(self):
+        """
+        The tracker that keeps this strategy's position up to date as the exchange
+        coordinators account for its trades, so reading the position doesn't require a
+        query over the strategy's whole trade history every tick.
+        """
+        if self._position_tracker is None:
+            self._position_tracker = positions.PositionTracker(
+                self.db,
+                self.actor,
+                volume_currency=self.volume_currency,
+            )
+
+        return self._position_tracker
+
     @property 
     def position(self):
         if self._position is not None:
             return self._position
 
-        # Currently we just default to assuming the class's actor is it's classname,
-        # but we'll improve this shortly.
-
-        self._position = positions.fast_position(
-            self.db,
-            volume_currency=self.volume_currency,
-            actor=self.actor,
-        )
+        self._position = self.position_tracker.position
 
         return self._position
 
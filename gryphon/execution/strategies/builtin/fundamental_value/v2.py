@@ -8,13 +8,18 @@ from gryphon.execution.lib import conf
 
 
 @exchange_retry()
-def calculate(algo, fundamental_value_balance_map):
+def calculate(algo, fundamental_value_balance_map, fx_snapshot=None):
     """
     Weighted fundamental value including only exchanges that can both buy and sell.
     """
     # TODO - store the buffer value in a config or some other thoughtout way.
     buffer_value = algo.config['volume_currency_buffer_value']
 
+    if fx_snapshot is None:
+        fx_snapshot = getattr(algo, 'fx_snapshot', None)
+
+    buffer_value_usd = buffer_value.to('USD', fx_snapshot=fx_snapshot)
+
     weighted_fundamental_value = 0
     weight_sum = 0
 
@@ -24,14 +29,14 @@ def calculate(algo, fundamental_value_balance_map):
         # If you have bitcoin and are below your maximum fiat, you can sell.
         can_sell = (
             exchange[algo.volume_currency.lower()] > buffer_value and
-            exchange['fiat'] < exchange['maximum'] - buffer_value.to('USD') and
+            exchange['fiat'] < exchange['maximum'] - buffer_value_usd and
             'bid_quote' in exchange and
             exchange['bid_quote']
         )
 
         # If you have enough fiat you can buy.
         can_buy = (
-            exchange['fiat'] > buffer_value.to('USD') and
+            exchange['fiat'] > buffer_value_usd and
             'ask_quote' in exchange and
             exchange['ask_quote']
         )
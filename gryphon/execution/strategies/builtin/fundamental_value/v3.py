@@ -15,11 +15,16 @@ from gryphon.execution.lib import conf
 
 
 @exchange_retry()
-def calculate(algo, fundamental_value_balance_map):
+def calculate(algo, fundamental_value_balance_map, fx_snapshot=None):
     buffer_value = algo.config['volume_currency_buffer_value']
 
+    if fx_snapshot is None:
+        fx_snapshot = getattr(algo, 'fx_snapshot', None)
+
+    buffer_value_usd = buffer_value.to('USD', fx_snapshot=fx_snapshot)
+
     algo.log(
-        'buffer_value:%s USD:%s' % (buffer_value, buffer_value.to('USD')),
+        'buffer_value:%s USD:%s' % (buffer_value, buffer_value_usd),
         log_level='debug',
     )
 
@@ -40,7 +45,7 @@ def calculate(algo, fundamental_value_balance_map):
         exchange_weight = conf.fv_v3_weights[algo.volume_currency][exchange_name]
 
         if (exchange[algo.volume_currency.lower()] > buffer_value and
-                exchange['fiat'] + buffer_value.to('USD') < exchange['maximum'] and
+                exchange['fiat'] + buffer_value_usd < exchange['maximum'] and
                 'bid_quote' in exchange and
                 exchange['bid_quote']):
             ask_participating_exchanges.append(exchange_name)
@@ -52,7 +57,7 @@ def calculate(algo, fundamental_value_balance_map):
             )
 
         # You may buy if you have enough fiat.
-        if (exchange['fiat'] > buffer_value.to('USD') and
+        if (exchange['fiat'] > buffer_value_usd and
                 'ask_quote' in exchange and
                  exchange['ask_quote']):
             bid_participating_exchanges.append(exchange_name)
@@ -41,6 +41,7 @@ class SimpleArb(Strategy):
         cross = arb.detect_directional_cross(
             self.buy_ex.get_orderbook(),
             self.sell_ex.get_orderbook(),
+            fx_snapshot=self.fx_snapshot,
         )
 
         executable_volume = arb.get_executable_volume(
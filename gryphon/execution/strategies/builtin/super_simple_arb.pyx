@@ -16,6 +16,7 @@ class SuperSimpleArb(Strategy):
         cross = arb.detect_directional_cross(
             self.harness.gemini_btc_usd.get_orderbook(),
             self.harness.coinbase_btc_usd.get_orderbook(),
+            fx_snapshot=self.fx_snapshot,
         )
 
         executable_volume = arb.get_executable_volume(
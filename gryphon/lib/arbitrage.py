@@ -11,11 +11,12 @@ IMPORTANT:
     order model.
 """
 
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 import itertools
 
 from cdecimal import Decimal
 
+from gryphon.lib.forex import FXSnapshot
 from gryphon.lib.logger import get_logger
 from gryphon.lib.models.emeraldhavoc.orderbook import Orderbook
 from gryphon.lib.money import Money
@@ -68,22 +69,22 @@ class Cross(object):
         return bool(self.volume)
 
 
-def detect_cross(ob1, ob2, ignore_unprofitable=True):
+def detect_cross(ob1, ob2, ignore_unprofitable=True, fx_snapshot=None):
     """
     Look for orderbook overlap between two exchanges that could be arbitraged in either
     direction.
 
     Returns a Cross or None if no overlap found.
     """
-    cross = detect_directional_cross(ob1, ob2, ignore_unprofitable)
+    cross = detect_directional_cross(ob1, ob2, ignore_unprofitable, fx_snapshot)
 
     if cross is None:
-        cross = detect_directional_cross(ob2, ob1, ignore_unprofitable)
+        cross = detect_directional_cross(ob2, ob1, ignore_unprofitable, fx_snapshot)
 
     return cross
 
 
-def detect_directional_cross(buy_ob, sell_ob, ignore_unprofitable=True):
+def detect_directional_cross(buy_ob, sell_ob, ignore_unprofitable=True, fx_snapshot=None):
     """
     Calculates the volume by which buy_ob's asks cut into sell_ob's bids, and the
     profit that could be gleaned if one could take the arbitrage. By default will not
@@ -104,6 +105,8 @@ def detect_directional_cross(buy_ob, sell_ob, ignore_unprofitable=True):
         other cryptocurrency), the speed at which exchange rates are updated in the
         builtin exchange rate service--OpenExchangeRates--may not be fast enough. It's
         strongly recommended that users do their own research on this.
+      - Price conversions use fx_snapshot if one is given. Otherwise, if the price
+        currencies differ, a snapshot of the current rates is taken for this call.
       - It's important that the market order fees for the exchanges you use have be
         accurately configured.
       - In this usage 'volume' refers to the area of the overlap, which is one-half the
@@ -129,6 +132,9 @@ def detect_directional_cross(buy_ob, sell_ob, ignore_unprofitable=True):
     # We use the buy exchange's price currency as our ground.
     base_price_currency = buy_ex.currency
 
+    if fx_snapshot is None and sell_ex.currency != base_price_currency:
+        fx_snapshot = FXSnapshot.current()
+
     # Initialize the variables we use in the iteration phase.
     total_volume = Money('0', volume_currency)
     total_revenue = Money('0', base_price_currency)
@@ -145,13 +151,13 @@ def detect_directional_cross(buy_ob, sell_ob, ignore_unprofitable=True):
         if ask_remaining_volume == Money('0', volume_currency):
             ask_index += 1
             ask = buy_ob['asks'][ask_index]
-            ask_price = ask.price.to(base_price_currency)
+            ask_price = ask.price.to(base_price_currency, fx_snapshot=fx_snapshot)
             ask_remaining_volume = ask.volume
 
         if bid_remaining_volume == Money('0', volume_currency):
             bid_index += 1
             bid = sell_ob['bids'][bid_index]
-            bid_price = bid.price.to(base_price_currency)
+            bid_price = bid.price.to(base_price_currency, fx_snapshot=fx_snapshot)
             bid_remaining_volume = bid.volume
 
         if bid_price > ask_price:  # Found a cross
@@ -209,23 +215,152 @@ def get_executable_volume(cross, buy_ex_balance, sell_ex_balance):
     return min(buy_max, sell_max)
 
 
-def detect_crosses_between_many_orderbooks(orderbooks, ignore_unprofitable=True):
+def detect_crosses_between_many_orderbooks(orderbooks, ignore_unprofitable=True, fx_snapshot=None):
     """
     Takes in a list of orderbooks and returns a list of crosses between those
     orderbooks sorted by profitability.
     """
+    scanner = CrossScanner(ignore_unprofitable, fx_snapshot)
+
+    for i, orderbook in enumerate(orderbooks):
+        scanner.update_orderbook(i, orderbook)
+
+    return scanner.crosses()
+
+
+class CrossScanner(object):
+    """
+    Finds the crosses between many orderbooks at once.
+
+    Rather than walking every pair of orderbooks in both directions, we first compare
+    each book's best ask against every other book's best bid, and only walk the pairs
+    (in the one direction) where those overlap. detect_directional_cross then stops at
+    the first level that doesn't cross, so only the overlapping levels are walked.
+
+    The scanner remembers the crosses it found, so when only some of the books change
+    between ticks, update_orderbook() those and only the pairs involving them are
+    re-evaluated.
+
+    Books are identified by a key of the caller's choosing, e.g. the exchange name.
+    """
+
+    def __init__(self, ignore_unprofitable=True, fx_snapshot=None):
+        self.ignore_unprofitable = ignore_unprofitable
+        self.fx_snapshot = fx_snapshot
 
-    crosses = []
+        self.orderbooks = OrderedDict()
 
-    for pair in itertools.combinations(orderbooks, 2):
-        cross = detect_cross(pair[0], pair[1], ignore_unprofitable)
+        # Best bid and ask of each book, converted to base_price_currency.
+        self.tops = {}
+        self.base_price_currency = None
+        self.volume_currency = None
+
+        # The crosses found, keyed on (buy key, sell key).
+        self._crosses = {}
+
+    def update_orderbook(self, key, orderbook):
+        self._check_volume_currency(orderbook)
+
+        if key in self.orderbooks:
+            self.remove_orderbook(key)
+
+        self.orderbooks[key] = orderbook
+        self.tops[key] = self._top_of_book(orderbook)
+
+        for other_key in self.orderbooks:
+            if other_key == key:
+                continue
+
+            self._evaluate(key, other_key)
+            self._evaluate(other_key, key)
+
+    def remove_orderbook(self, key):
+        del self.orderbooks[key]
+        del self.tops[key]
+
+        for pair in [p for p in self._crosses if key in p]:
+            del self._crosses[pair]
+
+    def crosses(self):
+        """
+        All the current crosses, sorted by profitability.
+        """
+        positions = {key: i for i, key in enumerate(self.orderbooks)}
+
+        def pair_position(pair):
+            return sorted([positions[pair[0]], positions[pair[1]]])
+
+        # Sort by the order the books were added in first, so that ties in profit come
+        # out in a stable order.
+        pairs = sorted(self._crosses, key=pair_position)
+
+        crosses = [self._crosses[pair] for pair in pairs]
+
+        return sorted(crosses, key=lambda c: c.profit, reverse=True)
+
+    def _evaluate(self, buy_key, sell_key):
+        self._crosses.pop((buy_key, sell_key), None)
+
+        if not self._might_cross(buy_key, sell_key):
+            return
+
+        cross = detect_directional_cross(
+            self.orderbooks[buy_key],
+            self.orderbooks[sell_key],
+            self.ignore_unprofitable,
+            self.fx_snapshot,
+        )
 
         if cross is not None:
-            crosses.append(cross)
+            self._crosses[(buy_key, sell_key)] = cross
+
+    def _might_cross(self, buy_key, sell_key):
+        """
+        The cheap check: can the sell book's best bid reach the buy book's best ask?
+        This is inclusive, so that rounding in the currency conversion can't prune a
+        real cross.
+        """
+        _, best_ask = self.tops[buy_key]
+        best_bid, _ = self.tops[sell_key]
+
+        if best_ask is None or best_bid is None:
+            return False
+
+        return best_bid >= best_ask
+
+    def _top_of_book(self, orderbook):
+        best_bid = None
+        best_ask = None
+
+        if orderbook['bids']:
+            best_bid = self._to_base_currency(orderbook['bids'][0].price)
+
+        if orderbook['asks']:
+            best_ask = self._to_base_currency(orderbook['asks'][0].price)
+
+        return best_bid, best_ask
+
+    def _to_base_currency(self, price):
+        if self.base_price_currency is None:
+            self.base_price_currency = price.currency
+
+        if price.currency != self.base_price_currency and self.fx_snapshot is None:
+            self.fx_snapshot = FXSnapshot.current()
+
+        return price.to(self.base_price_currency, fx_snapshot=self.fx_snapshot)
+
+    def _check_volume_currency(self, orderbook):
+        orders = orderbook['bids'] or orderbook['asks']
+
+        if not orders:
+            return
 
-    crosses = sorted(crosses, key=lambda c: c.profit, reverse=True)
+        volume_currency = orders[0].exchange.volume_currency
 
-    return crosses
+        if self.volume_currency is None:
+            self.volume_currency = volume_currency
+        elif volume_currency != self.volume_currency:
+            raise MismatchedVolumeCurrenciesError(self.volume_currency, volume_currency)
 
 
 def max_buy_volume(balance, buy_orderbook):
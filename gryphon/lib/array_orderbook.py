@@ -0,0 +1,146 @@
+"""
+An orderbook that keeps each side's prices and volumes in flat, sorted arrays of
+Decimals next to the usual lists of exchange Orders, along with running totals of
+volume and of price * volume.
+
+With those prefix sums the metrics in gryphon.lib.metrics can answer questions like
+"what would a market order for 10 BTC cost" or "how much volume is there above $600"
+with a binary search, instead of walking the book level by level with Money arithmetic.
+
+ArrayOrderbook is a dict with 'bids' and 'asks' keys like every other orderbook, so
+code that doesn't know about it keeps working. The arrays are rebuilt whenever a side
+is assigned (e.g. by remove_orders_from_orderbook), but not if the Orders or lists are
+mutated in place, so treat the sides as immutable and assign a new list instead.
+"""
+
+from bisect import bisect_left, bisect_right
+from itertools import izip
+
+from cdecimal import Decimal
+
+from gryphon.lib.exchange.consts import Consts
+
+
+class OrderbookSide(object):
+    """
+    One side of an orderbook, best level first: asks ascending, bids descending.
+    """
+
+    def __init__(self, prices, volumes, descending=False):
+        self.prices = prices
+        self.volumes = volumes
+        self.descending = descending
+
+        # bisect only works on ascending lists, so we search the bids by their negated
+        # prices.
+        if descending:
+            self._search_prices = [-price for price in prices]
+        else:
+            self._search_prices = prices
+
+        self.cumulative_volumes = []
+        self.cumulative_totals = []
+
+        volume_sum = Decimal('0')
+        total_sum = Decimal('0')
+
+        for price, volume in izip(prices, volumes):
+            volume_sum += volume
+            total_sum += price * volume
+
+            self.cumulative_volumes.append(volume_sum)
+            self.cumulative_totals.append(total_sum)
+
+    @classmethod
+    def from_orders(cls, orders, descending=False):
+        prices = [o.price.amount for o in orders]
+        volumes = [o.volume.amount for o in orders]
+
+        return cls(prices, volumes, descending)
+
+    def __len__(self):
+        return len(self.prices)
+
+    @property
+    def total_volume(self):
+        if not self.cumulative_volumes:
+            return Decimal('0')
+
+        return self.cumulative_volumes[-1]
+
+    def price_quote(self, volume):
+        """
+        Returns a tuple of the total price of a market order for volume against this
+        side and the price of the last level it would reach, or None if there isn't
+        enough volume on this side.
+        """
+        index = bisect_left(self.cumulative_volumes, volume)
+
+        if index == len(self.prices):
+            return None
+
+        total = Decimal('0')
+        volume_remaining = volume
+
+        if index > 0:
+            total = self.cumulative_totals[index - 1]
+            volume_remaining -= self.cumulative_volumes[index - 1]
+
+        total += volume_remaining * self.prices[index]
+
+        return total, self.prices[index]
+
+    def volume_at_price(self, price):
+        """
+        The volume on this side at price or better: at or below it for asks, at or
+        above it for bids.
+        """
+        if self.descending:
+            level_count = bisect_right(self._search_prices, -price)
+        else:
+            level_count = bisect_right(self._search_prices, price)
+
+        if level_count == 0:
+            return Decimal('0')
+
+        return self.cumulative_volumes[level_count - 1]
+
+
+class ArrayOrderbook(dict):
+    def __init__(self, bids=None, asks=None, bid_side=None, ask_side=None):
+        super(ArrayOrderbook, self).__init__()
+
+        bids = bids if bids is not None else []
+        asks = asks if asks is not None else []
+
+        dict.__setitem__(self, 'bids', bids)
+        dict.__setitem__(self, 'asks', asks)
+
+        if bid_side is None:
+            bid_side = OrderbookSide.from_orders(bids, descending=True)
+
+        if ask_side is None:
+            ask_side = OrderbookSide.from_orders(asks)
+
+        self.bid_side = bid_side
+        self.ask_side = ask_side
+
+    def __setitem__(self, key, value):
+        dict.__setitem__(self, key, value)
+
+        if key == 'bids':
+            self.bid_side = OrderbookSide.from_orders(value, descending=True)
+        elif key == 'asks':
+            self.ask_side = OrderbookSide.from_orders(value)
+
+    def side_for_mode(self, mode):
+        """
+        Uses bid/ask to represent intention like the metrics do: a BID takes from the
+        asks and an ASK takes from the bids.
+        """
+        if mode == Consts.BID:
+            return self.ask_side
+        elif mode == Consts.ASK:
+            return self.bid_side
+        else:
+            raise ValueError('mode must be one of ask/bid')
@@ -1,14 +1,16 @@
 from collections import namedtuple
+from datetime import timedelta
 
 from cdecimal import Decimal
 from delorean import Delorean
-from sqlalchemy import func, or_, and_
+from sqlalchemy import and_, case, func, or_, union_all
 
 from gryphon.lib.exchange import exchange_factory
 from gryphon.lib.gryphonfury import positions
 from gryphon.lib.logger import get_logger
 from gryphon.lib.models.exchange import Exchange as ExchangeData
 from gryphon.lib.models.exchange import Position
+from gryphon.lib.models.ledger_checkpoint import LedgerCheckpoint
 from gryphon.lib.models.liability import Liability
 from gryphon.lib.models.order import Order
 from gryphon.lib.models.trade import Trade
@@ -147,7 +149,7 @@ def calculate_btc_net_assets(db):
     return net_assets
 
 
-def ledger_balance(db, start_time=None, end_time=None, include_pending=False, exchange_names=[]):
+def ledger_balance(db, start_time=None, end_time=None, include_pending=False, exchange_names=[], use_checkpoints=False):
     """
     Returns the exchange's balance as calculated from its ledger of trades and
     transactions.
@@ -157,6 +159,9 @@ def ledger_balance(db, start_time=None, end_time=None, include_pending=False, ex
     With start_time specified we return a balance diff which can be useful for
     performance (if you know the balance on one day, you can get the next day's balance
     by only looking at that next days ledgers instead of from the beginning).
+
+    With use_checkpoints and no start_time, each of exchange_names starts from its
+    latest LedgerCheckpoint before end_time instead of from the beginning of the ledger.
     """
 
     if start_time and start_time < EARLIEST_CORRECT_LEDGER_DATE:
@@ -169,6 +174,14 @@ def ledger_balance(db, start_time=None, end_time=None, include_pending=False, ex
             'end_time must be later than %s' % EARLIEST_CORRECT_LEDGER_DATE,
         )
 
+    if use_checkpoints and not start_time and exchange_names:
+        return ledger_balance_from_checkpoints(
+            db,
+            end_time=end_time,
+            include_pending=include_pending,
+            exchange_names=exchange_names,
+        )
+
     exchange_ids = []
 
     for exchange_name in exchange_names:
@@ -176,115 +189,223 @@ def ledger_balance(db, start_time=None, end_time=None, include_pending=False, ex
         exchange_id = exchange_data.exchange_id
         exchange_ids.append(exchange_id)
 
-    # Trades
-    bid_prices = trade_position_query(
+    return ledger_balance_query(
         db,
-        Trade._price,
-        Trade._price_currency,
-        Trade.BID,
         start_time=start_time,
         end_time=end_time,
+        include_pending=include_pending,
         exchange_names=exchange_names,
+        exchange_ids=exchange_ids,
     )
 
-    bid_volumes = trade_position_query(
-        db,
-        Trade._volume,
-        Trade._volume_currency,
-        Trade.BID,
-        start_time=start_time,
-        end_time=end_time,
-        exchange_names=exchange_names,
-    )
 
-    ask_prices = trade_position_query(
-        db,
-        Trade._price,
-        Trade._price_currency,
-        Trade.ASK,
-        start_time=start_time,
-        end_time=end_time,
-        exchange_names=exchange_names,
-    )
+def ledger_balance_query(db, start_time=None, end_time=None, include_pending=False, exchange_names=[], exchange_ids=[]):
+    """
+    Sums up the whole ledger in a single query.
+
+    Every trade and transaction contributes a few signed entries in different
+    currencies: a bid adds its volume and takes away its price, an ask the opposite,
+    a deposit adds its amount, a withdrawal takes it away, and all fees are taken away.
+    We UNION ALL those entries together and group them by currency, which gives the
+    same result as summing each of them in its own grouped query and adding up the
+    Positions.
+    """
+    bid = Trade.trade_type == Trade.BID
+    ask = Trade.trade_type == Trade.ASK
+    deposit = Transaction.transaction_type == Transaction.DEPOSIT
+    withdrawal = Transaction.transaction_type == Transaction.WITHDRAWL
+
+    trade_entries = [
+        (Trade._price_currency, case([(ask, Trade._price), (bid, -Trade._price)])),
+        (Trade._volume_currency, case([(bid, Trade._volume), (ask, -Trade._volume)])),
+        (Trade._fee_currency, -Trade._fee),
+    ]
 
-    ask_volumes = trade_position_query(
-        db,
-        Trade._volume,
-        Trade._volume_currency,
-        Trade.ASK,
-        start_time=start_time,
-        end_time=end_time,
-        exchange_names=exchange_names,
-    )
+    transaction_entries = [
+        (
+            Transaction._amount_currency,
+            case([(deposit, Transaction._amount), (withdrawal, -Transaction._amount)]),
+        ),
+        (Transaction._fee_currency, -Transaction._fee),
+    ]
 
-    trade_fees = trade_position_query(
-        db,
-        Trade._fee,
-        Trade._fee_currency,
-        start_time=start_time,
-        end_time=end_time,
-        exchange_names=exchange_names,
-    )
+    queries = []
+
+    for currency_field, amount in trade_entries:
+        query = db.query(currency_field.label('currency'), amount.label('amount'))\
+            .join(Order)
+
+        query = filter_trades(query, start_time, end_time, exchange_names)
+        queries.append(query.statement)
+
+    for currency_field, amount in transaction_entries:
+        query = db.query(currency_field.label('currency'), amount.label('amount'))
+
+        query = filter_transactions(
+            query,
+            start_time,
+            end_time,
+            include_pending,
+            exchange_ids,
+        )
+
+        queries.append(query.statement)
+
+    entries = union_all(*queries).alias('ledger_entries')
+
+    # The separate queries only returned a currency if one of its sums wasn't zero, and
+    # callers can tell the difference (e.g. Balance.fiat), so we count the non-zero
+    # entries to keep currencies which net out to zero.
+    result = db.query(
+        entries.c.currency,
+        func.sum(entries.c.amount, type_=Trade._price.type),
+        func.sum(case([(entries.c.amount != 0, 1)], else_=0)),
+    ).group_by(entries.c.currency).all()
+
+    position = Position()
+
+    for currency, amount, nonzero_entries in result:
+        if nonzero_entries:
+            position[currency] = Money(amount, currency)
+
+    logger.debug('Ledger Balance: %s' % position)
+
+    return position
+
+
+def ledger_balance_from_checkpoints(db, end_time=None, include_pending=False, exchange_names=[]):
+    """
+    The ledger balance of exchange_names at end_time, starting each exchange from its
+    latest LedgerCheckpoint. Exchanges without a checkpoint are summed up from the
+    beginning of the ledger.
+    """
+    balance = Position()
+    uncheckpointed_exchange_names = []
+
+    for exchange_name in exchange_names:
+        checkpoint = LedgerCheckpoint.nearest(
+            db,
+            exchange_name,
+            end_time=end_time,
+            include_pending=include_pending,
+        )
+
+        if not checkpoint:
+            uncheckpointed_exchange_names.append(exchange_name)
+            continue
+
+        exchange_data = exchange_factory.make_exchange_data_from_key(exchange_name, db)
+
+        # checkpoint_time comes back from the database without a timezone, so we skip
+        # ledger_balance's date checks, which it would fail.
+        balance += checkpoint.balance
+        balance += ledger_balance_query(
+            db,
+            start_time=checkpoint.checkpoint_time,
+            end_time=end_time,
+            include_pending=include_pending,
+            exchange_names=[exchange_name],
+            exchange_ids=[exchange_data.exchange_id],
+        )
+
+    if uncheckpointed_exchange_names:
+        balance += ledger_balance(
+            db,
+            end_time=end_time,
+            include_pending=include_pending,
+            exchange_names=uncheckpointed_exchange_names,
+        )
+
+    return balance
+
+
+def create_ledger_checkpoint(db, exchange_name, checkpoint_time, include_pending=False):
+    """
+    Materialise exchange_name's ledger balance at checkpoint_time. This builds on the
+    previous checkpoint, so creating one every day only aggregates a day of ledger
+    entries each time. The caller is responsible for committing the session.
+
+    An include_pending balance counts IN_TRANSIT transactions, which can still be
+    cancelled and drop out of the ledger, so we return None instead of checkpointing
+    while any from before checkpoint_time are unresolved.
+    """
+    if include_pending:
+        exchange_data = exchange_factory.make_exchange_data_from_key(exchange_name, db)
+
+        pending_transaction = db.query(Transaction.transaction_id)\
+            .filter(Transaction.exchange_id == exchange_data.exchange_id)\
+            .filter(Transaction.transaction_status == Transaction.IN_TRANSIT)\
+            .filter(Transaction.time_created <= checkpoint_time)\
+            .first()
+
+        if pending_transaction:
+            return None
 
-    # Transactions
-    deposits = transaction_position_query(
+    balance = ledger_balance(
         db,
-        Transaction._amount,
-        Transaction._amount_currency,
-        transaction_type=Transaction.DEPOSIT,
-        start_time=start_time,
-        end_time=end_time,
+        end_time=checkpoint_time,
         include_pending=include_pending,
-        exchange_ids=exchange_ids,
+        exchange_names=[exchange_name],
+        use_checkpoints=True,
     )
 
-    withdrawals = transaction_position_query(
-        db,
-        Transaction._amount,
-        Transaction._amount_currency,
-        transaction_type=Transaction.WITHDRAWL,
-        start_time=start_time,
-        end_time=end_time,
+    checkpoint = LedgerCheckpoint(
+        exchange_name,
+        checkpoint_time,
+        balance,
         include_pending=include_pending,
-        exchange_ids=exchange_ids,
     )
 
-    transaction_fees = transaction_position_query(
+    db.add(checkpoint)
+
+    return checkpoint
+
+
+def create_daily_ledger_checkpoints(db, exchange_name, settled_time, include_pending=False):
+    """
+    Checkpoint exchange_name's ledger at every midnight (UTC) after its latest
+    checkpoint, up to settled_time, before which we don't expect any more ledger
+    entries. Stops early at a day that can't be checkpointed yet. Returns the new
+    checkpoints, the caller is responsible for committing the session.
+    """
+    latest_checkpoint = LedgerCheckpoint.nearest(
         db,
-        Transaction._fee,
-        Transaction._fee_currency,
-        start_time=start_time,
-        end_time=end_time,
+        exchange_name,
         include_pending=include_pending,
-        exchange_ids=exchange_ids,
     )
 
-    logger.debug('Bid Prices: %s' % bid_prices)
-    logger.debug('Bid Volumes: %s' % bid_volumes)
-    logger.debug('Ask Prices: %s' % ask_prices)
-    logger.debug('Ask Volumes: %s' % ask_volumes)
-    logger.debug('Trade Fees: %s' % trade_fees)
+    if latest_checkpoint:
+        start_time = latest_checkpoint.checkpoint_time
+    else:
+        exchange_data = exchange_factory.make_exchange_data_from_key(exchange_name, db)
+
+        start_time = db.query(func.min(Transaction.time_created))\
+            .filter(Transaction.exchange_id == exchange_data.exchange_id)\
+            .scalar()
+
+        if not start_time:
+            return []
+
+    checkpoint_time = Delorean(start_time, 'UTC').truncate('day').datetime
+    checkpoint_time += timedelta(days=1)
 
-    logger.debug('Deposits: %s' % deposits)
-    logger.debug('Withdrawals: %s' % withdrawals)
-    logger.debug('Transaction Fees: %s' % transaction_fees)
+    checkpoints = []
+
+    while checkpoint_time <= settled_time:
+        checkpoint = create_ledger_checkpoint(
+            db,
+            exchange_name,
+            checkpoint_time,
+            include_pending=include_pending,
+        )
 
-    positive_position = sum([
-        bid_volumes,
-        ask_prices,
-        deposits,
-    ], Position())
+        if not checkpoint:
+            break
 
-    negative_position = sum([
-        bid_prices,
-        ask_volumes,
-        trade_fees,
-        withdrawals,
-        transaction_fees,
-    ], Position())
+        checkpoints.append(checkpoint)
+        checkpoint_time += timedelta(days=1)
 
-    total_position = positive_position - negative_position
-    return total_position
+    return checkpoints
 
 
 def trade_position_query(db, amount_field, currency_field, trade_type=None, start_time=None, end_time=None, exchange_names=[]):
@@ -307,15 +428,7 @@ def trade_position_query(db, amount_field, currency_field, trade_type=None, star
     if trade_type:
         query = query.filter(Trade.trade_type == trade_type)
 
-    if start_time:
-        query = query.filter(Trade.time_created > start_time)
-
-    if end_time:
-        query = query.filter(Trade.time_created <= end_time)
-
-    if exchange_names:
-        # maybe join here?
-        query = query.filter(Order._exchange_name.in_(exchange_names))
+    query = filter_trades(query, start_time, end_time, exchange_names)
 
     result = query.all()
 
@@ -333,6 +446,47 @@ def transaction_position_query(db, amount_field, currency_field, transaction_typ
     # See comment on trade_position_query above
     query = db.query(currency_field, func.sum(amount_field))
 
+    if transaction_type:
+        query = query.filter(Transaction.transaction_type == transaction_type)
+
+    query = filter_transactions(
+        query,
+        start_time,
+        end_time,
+        include_pending,
+        exchange_ids,
+    )
+
+    query = query.group_by(currency_field)
+
+    result = query.all()
+
+    return query_result_to_position(result)
+
+
+def filter_trades(query, start_time=None, end_time=None, exchange_names=[]):
+    """
+    Restrict a query joining Trade and Order to the trades that are in the ledger
+    between start_time and end_time.
+    """
+    if start_time:
+        query = query.filter(Trade.time_created > start_time)
+
+    if end_time:
+        query = query.filter(Trade.time_created <= end_time)
+
+    if exchange_names:
+        # maybe join here?
+        query = query.filter(Order._exchange_name.in_(exchange_names))
+
+    return query
+
+
+def filter_transactions(query, start_time=None, end_time=None, include_pending=False, exchange_ids=[]):
+    """
+    Restrict a query on Transaction to the transactions that are in the ledger between
+    start_time and end_time.
+    """
     if include_pending:
         query = query.filter(or_(
             Transaction.transaction_status == Transaction.COMPLETED,
@@ -341,9 +495,6 @@ def transaction_position_query(db, amount_field, currency_field, transaction_typ
     else:
         query = query.filter(Transaction.transaction_status == Transaction.COMPLETED)
 
-    if transaction_type:
-        query = query.filter(Transaction.transaction_type == transaction_type)
-
     if start_time:
         # when include_pending is True we treat all transactions as being completed
         # on their creation time (i.e. instantly)
@@ -383,11 +534,7 @@ def transaction_position_query(db, amount_field, currency_field, transaction_typ
     if exchange_ids:
         query = query.filter(Transaction.exchange_id.in_(exchange_ids))
 
-    query = query.group_by(currency_field)
-
-    result = query.all()
-
-    return query_result_to_position(result)
+    return query
 
 
 def query_result_to_position(db_query_result):
@@ -0,0 +1,162 @@
+"""
+Find which of a set of in-transit deposits add up to a change in an exchange balance.
+
+Exchange.deposit_landed used to try every combination of pending deposits, smallest
+combinations first, and take the first one whose total (net of fees) was within
+tolerance of the balance change. That's exponential in the number of deposits, and it
+runs inside the balance audits.
+
+find_matching_subset returns the same combination the exhaustive search would, but
+gets there with a depth-first branch-and-bound search over fixed-point integer amounts:
+for each combination size, a branch is abandoned as soon as the smallest and largest
+totals it could still reach both fall outside the tolerance window. The search also
+has a time budget, after which it gives up as if nothing had matched.
+"""
+
+import time
+
+from cdecimal import Decimal
+
+from gryphon.lib.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_TIME_BUDGET = 1.0  # Seconds.
+
+
+class SubsetMatchStats(object):
+    def __init__(self):
+        self.nodes = 0
+        self.elapsed = 0
+        self.budget_exceeded = False
+
+    def __repr__(self):
+        return '<SubsetMatchStats nodes=%s elapsed=%.4fs budget_exceeded=%s>' % (
+            self.nodes,
+            self.elapsed,
+            self.budget_exceeded,
+        )
+
+
+class _BudgetExceeded(Exception):
+    pass
+
+
+def find_matching_subset(amounts, target, tolerance=0, time_budget=DEFAULT_TIME_BUDGET):
+    """
+    amounts, target and tolerance are Decimals (or ints). Returns a tuple of the indices
+    into amounts of the first subset, in order of size and then of index, whose sum is
+    within tolerance of target, or None. Also returns a SubsetMatchStats.
+    """
+    stats = SubsetMatchStats()
+    start_time = time.time()
+    deadline = start_time + time_budget
+
+    scale = _common_scale(list(amounts) + [target, tolerance])
+
+    values = [_fixed_point(a, scale) for a in amounts]
+    low = _fixed_point(target, scale) - _fixed_point(tolerance, scale)
+    high = _fixed_point(target, scale) + _fixed_point(tolerance, scale)
+
+    bounds = _SuffixBounds(values)
+
+    try:
+        for size in range(1, len(values) + 1):
+            match = _search(values, bounds, size, low, high, deadline, stats)
+
+            if match is not None:
+                return match, stats
+    except _BudgetExceeded:
+        stats.budget_exceeded = True
+    finally:
+        stats.elapsed = time.time() - start_time
+
+    return None, stats
+
+
+def _search(values, bounds, size, low, high, deadline, stats):
+    chosen = []
+
+    def visit(start, partial_sum):
+        stats.nodes += 1
+
+        if time.time() > deadline:
+            raise _BudgetExceeded()
+
+        picks_left = size - len(chosen)
+
+        if picks_left == 0:
+            return low <= partial_sum <= high
+
+        for i in range(start, len(values) - picks_left + 1):
+            # The totals reachable by taking values[i] and then picks_left - 1 more
+            # from after it all lie between these two.
+            smallest = partial_sum + values[i] + bounds.smallest(i + 1, picks_left - 1)
+            largest = partial_sum + values[i] + bounds.largest(i + 1, picks_left - 1)
+
+            if largest < low or smallest > high:
+                continue
+
+            chosen.append(i)
+
+            if visit(i + 1, partial_sum + values[i]):
+                return True
+
+            chosen.pop()
+
+        return False
+
+    if visit(0, 0):
+        return tuple(chosen)
+
+    return None
+
+
+class _SuffixBounds(object):
+    """
+    For every suffix values[i:], the sums of its j smallest and j largest values.
+    """
+
+    def __init__(self, values):
+        self._smallest = []
+        self._largest = []
+
+        for i in range(len(values) + 1):
+            suffix = sorted(values[i:])
+
+            self._smallest.append(_prefix_sums(suffix))
+            self._largest.append(_prefix_sums(list(reversed(suffix))))
+
+    def smallest(self, start, count):
+        return self._smallest[start][count]
+
+    def largest(self, start, count):
+        return self._largest[start][count]
+
+
+def _prefix_sums(values):
+    sums = [0]
+
+    for value in values:
+        sums.append(sums[-1] + value)
+
+    return sums
+
+
+def _common_scale(values):
+    """
+    The smallest power of ten that makes every value an integer.
+    """
+    scale = 0
+
+    for value in values:
+        exponent = Decimal(value).as_tuple().exponent
+
+        if exponent < 0:
+            scale = max(scale, -exponent)
+
+    return scale
+
+
+def _fixed_point(value, scale):
+    return int(Decimal(value).scaleb(scale))
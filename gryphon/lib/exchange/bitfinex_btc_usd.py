@@ -77,7 +77,7 @@ class BitfinexBTCUSDExchange(ExchangeAPIWrapper):
         if until:
             payload['until'] = str(until)
 
-        return self.req('post', '/mytrades', data=payload)
+        return self.req('post', '/mytrades', data=payload, endpoint='all_trades')
 
     def all_trades_resp(self, req):
         return self.resp(req)
@@ -148,7 +148,7 @@ class BitfinexBTCUSDExchange(ExchangeAPIWrapper):
         headers['X-BFX-SIGNATURE'] = sig
 
     def balance_req(self):
-        return self.req('get', '/balances')
+        return self.req('get', '/balances', endpoint='balance')
 
     def balance_resp(self, req):
         raw_balances = self.resp(req)
@@ -175,7 +175,13 @@ class BitfinexBTCUSDExchange(ExchangeAPIWrapper):
         return balance
 
     def ticker_req(self, verify=True):
-        return self.req('get', '/pubticker/btcusd', no_auth=True, verify=verify)
+        return self.req(
+            'get',
+            '/pubticker/btcusd',
+            no_auth=True,
+            verify=verify,
+            endpoint='ticker',
+        )
 
     def ticker_resp(self, req):
         response = self.resp(req)
@@ -187,7 +193,13 @@ class BitfinexBTCUSDExchange(ExchangeAPIWrapper):
         }
 
     def _get_order_book_req(self, verify=True):
-        return self.req('get', '/book/btcusd', no_auth=True, verify=verify)
+        return self.req(
+            'get',
+            '/book/btcusd',
+            no_auth=True,
+            verify=verify,
+            endpoint='get_order_book',
+        )
 
     @property
     def _orderbook_sort_key(self):
@@ -221,7 +233,7 @@ class BitfinexBTCUSDExchange(ExchangeAPIWrapper):
         if is_market_order == False:
             payload['is_postonly'] = True
 
-        return self.req('post', '/order/new', data=payload)
+        return self.req('post', '/order/new', data=payload, endpoint='create_trade')
 
     def create_trade_resp(self, req):
         response = self.resp(req)
@@ -235,7 +247,7 @@ class BitfinexBTCUSDExchange(ExchangeAPIWrapper):
             )
 
     def open_orders_req(self):
-        return self.req('post', '/orders')
+        return self.req('post', '/orders', endpoint='open_orders')
 
     def open_orders_resp(self, req):
         raw_open_orders = self.resp(req)
@@ -319,7 +331,7 @@ class BitfinexBTCUSDExchange(ExchangeAPIWrapper):
         payload = {
             'order_id': int(order_id)
         }
-        return self.req('post', '/order/cancel', data=payload)
+        return self.req('post', '/order/cancel', data=payload, endpoint='cancel_order')
 
     def cancel_order_resp(self, req):
         response = self.resp(req)
@@ -341,7 +353,7 @@ class BitfinexBTCUSDExchange(ExchangeAPIWrapper):
             'address': address,
         }
 
-        return self.req('post', '/withdraw', data=payload)
+        return self.req('post', '/withdraw', data=payload, endpoint='withdraw_crypto')
 
     def withdraw_crypto_resp(self, req):
         response = self.resp(req)
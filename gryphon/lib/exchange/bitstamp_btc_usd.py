@@ -10,11 +10,11 @@ import time
 
 from cdecimal import *
 from delorean import Delorean, epoch
-from requests_futures.sessions import FuturesSession
 from requests_toolbelt.cookies.forgetful import ForgetfulCookieJar
 
 from gryphon.lib.exchange import exceptions
 from gryphon.lib.exchange import order_types
+from gryphon.lib.exchange import session_pool
 from gryphon.lib.exchange.consts import Consts
 from gryphon.lib.exchange.exchange_api_wrapper import ExchangeAPIWrapper
 from gryphon.lib.logger import get_logger
@@ -27,13 +27,6 @@ logger = get_logger(__name__)
 
 class BitstampBTCUSDExchange(ExchangeAPIWrapper):
     def __init__(self, session=None, configuration=None):
-        # 2018-4-4: This is a hack for an outstanding issue in our environment that
-        # causes bitstamp to reject all but the first requests made with a
-        # requests.Session() object. See trello for more information.
-        if not session:
-            session = FuturesSession(max_workers=10)
-            session.cookies = ForgetfulCookieJar()
-
         super(BitstampBTCUSDExchange, self).__init__(session)
 
         # Immutable properties.
@@ -73,6 +66,15 @@ class BitstampBTCUSDExchange(ExchangeAPIWrapper):
         self.withdrawl_requests_url = 'withdrawal_requests/'
         self.withdraw_url = 'https://priv-api.bitstamp.net/api/bitcoin_withdrawal/'
 
+    def get_shared_session(self):
+        # 2018-4-4: This is a hack for an outstanding issue in our environment that
+        # causes bitstamp to reject all but the first requests made with a
+        # requests.Session() object. See trello for more information.
+        return session_pool.get_session(
+            self.base_url,
+            cookie_jar_class=ForgetfulCookieJar,
+        )
+
     def resp(self, req):
         response = super(BitstampBTCUSDExchange, self).resp(req)
 
@@ -98,7 +100,13 @@ class BitstampBTCUSDExchange(ExchangeAPIWrapper):
         return response
 
     def get_ticker_req(self, verify=True):
-        return self.req('get', self.ticker_url, no_auth=True, verify=verify)
+        return self.req(
+            'get',
+            self.ticker_url,
+            no_auth=True,
+            verify=verify,
+            endpoint='get_ticker',
+        )
 
     def get_ticker_resp(self, req):
         response = self.resp(req)
@@ -128,7 +136,12 @@ class BitstampBTCUSDExchange(ExchangeAPIWrapper):
             'offset': offset,
         }
 
-        return self.req('post', self.trade_status_url, data=payload)
+        return self.req(
+            'post',
+            self.trade_status_url,
+            data=payload,
+            endpoint='all_transactions',
+        )
 
     def all_transactions_resp(self, req):
         return self.resp(req)
@@ -210,7 +223,7 @@ class BitstampBTCUSDExchange(ExchangeAPIWrapper):
         })
 
     def get_balance_req(self):
-        return self.req('post', self.balance_url)
+        return self.req('post', self.balance_url, endpoint='get_balance')
 
     def get_balance_resp(self, req):
         response = self.resp(req)
@@ -235,7 +248,13 @@ class BitstampBTCUSDExchange(ExchangeAPIWrapper):
         return balance
 
     def _get_orderbook_from_api_req(self, verify=True):
-        return self.req('get', self.orderbook_url, no_auth=True, verify=verify)
+        return self.req(
+            'get',
+            self.orderbook_url,
+            no_auth=True,
+            verify=verify,
+            endpoint='get_orderbook_from_api',
+        )
 
     def _get_orderbook_from_api_resp(self, req):
         order_book = self.resp(req)
@@ -283,7 +302,7 @@ class BitstampBTCUSDExchange(ExchangeAPIWrapper):
         except AttributeError:
             raise TypeError('volume and price must be Money objects')
 
-        return self.req('post', url, data=payload)
+        return self.req('post', url, data=payload, endpoint='place_order')
 
     def place_order_resp(self, req):
         response = self.resp(req)
@@ -297,7 +316,7 @@ class BitstampBTCUSDExchange(ExchangeAPIWrapper):
             )
 
     def get_open_orders_req(self):
-        return self.req('post', self.open_orders_url)
+        return self.req('post', self.open_orders_url, endpoint='get_open_orders')
 
     def get_open_orders_resp(self, req):
         raw_open_orders = self.resp(req)
@@ -398,12 +417,23 @@ class BitstampBTCUSDExchange(ExchangeAPIWrapper):
 
         return data
 
+    def get_multi_order_details_req_for_ids(self, order_ids):
+        return self.get_multi_order_details_req()
+
+    def get_multi_order_details_resp_for_ids(self, req, order_ids):
+        return self.get_multi_order_details_resp(req, order_ids)
+
     def cancel_order_req(self, order_id):
         payload = {
             'id': order_id,
         }
 
-        return self.req('post', self.trade_cancel_url, data=payload)
+        return self.req(
+            'post',
+            self.trade_cancel_url,
+            data=payload,
+            endpoint='cancel_order',
+        )
 
     def cancel_order_resp(self, req):
         response = self.resp(req)
@@ -422,7 +452,12 @@ class BitstampBTCUSDExchange(ExchangeAPIWrapper):
             'address': address,
         }
 
-        return self.req('post', self.withdraw_url, data=payload)
+        return self.req(
+            'post',
+            self.withdraw_url,
+            data=payload,
+            endpoint='withdraw_crypto',
+        )
 
     def withdraw_crypto_resp(self, req):
         response = self.resp(req)
@@ -68,8 +68,11 @@ class CoinbaseBTCUSDExchange(ExchangeAPIWrapper):
         try:
             data = response.json(parse_float=Decimal)
         except ValueError:
+            self.record_endpoint_call(req, response, failed=True)
             raise exceptions.ExchangeAPIFailureException(self, response)
 
+        self.record_endpoint_call(req, response)
+
         headers = response.headers
 
         if response.status_code < 200 or response.status_code >= 300:
@@ -124,7 +127,7 @@ class CoinbaseBTCUSDExchange(ExchangeAPIWrapper):
         if params:
             endpoint += '?%s' % urllib.urlencode(params)
 
-        return self.req('get', endpoint)
+        return self.req('get', endpoint, endpoint='ledger')
 
     def ledger_resp(self, req, return_pagination=False):
         response, headers = self.resp(req)
@@ -151,7 +154,7 @@ class CoinbaseBTCUSDExchange(ExchangeAPIWrapper):
 
         endpoint = '/fills?%s' % urllib.urlencode(params)
 
-        return self.req('get', endpoint)
+        return self.req('get', endpoint, endpoint='get_recent_trades')
 
     def _get_recent_trades_resp(self, req, return_pagination=False):
         response, headers = self.resp(req)
@@ -196,7 +199,7 @@ class CoinbaseBTCUSDExchange(ExchangeAPIWrapper):
             'coinbase_account_id': coinbase_account_id
         }
 
-        return self.req('post', '/transfers', data=payload)
+        return self.req('post', '/transfers', data=payload, endpoint='transfer')
 
     def transfer_resp(self, req):
         response, headers = self.resp(req)
@@ -322,7 +325,7 @@ class CoinbaseBTCUSDExchange(ExchangeAPIWrapper):
         })
 
     def get_balance_req(self):
-        return self.req('get', '/accounts')
+        return self.req('get', '/accounts', endpoint='get_balance')
 
     def get_balance_resp(self, req):
         response, headers = self.resp(req)
@@ -346,6 +349,7 @@ class CoinbaseBTCUSDExchange(ExchangeAPIWrapper):
             '/products/%s/stats' % self.product_id,
             no_auth=True,
             verify=verify,
+            endpoint='get_ticker',
         )
 
     def get_ticker_resp(self, req):
@@ -360,7 +364,13 @@ class CoinbaseBTCUSDExchange(ExchangeAPIWrapper):
 
     def _get_orderbook_from_api_req(self, verify=True):
         orderbook_url = '/products/%s/book?level=3' % self.product_id
-        return self.req('get', orderbook_url, no_auth=True, verify=verify)
+        return self.req(
+            'get',
+            orderbook_url,
+            no_auth=True,
+            verify=verify,
+            endpoint='get_orderbook_from_api',
+        )
 
     def _get_orderbook_from_api_resp(self, req):
         response, headers = self.resp(req)
@@ -387,7 +397,7 @@ class CoinbaseBTCUSDExchange(ExchangeAPIWrapper):
         if order_type == order_types.POST_ONLY:
             payload['post_only'] = True
 
-        return self.req('post', '/orders', data=payload)
+        return self.req('post', '/orders', data=payload, endpoint='place_order')
 
     def place_order_resp(self, req):
         response, headers = self.resp(req)
@@ -396,7 +406,7 @@ class CoinbaseBTCUSDExchange(ExchangeAPIWrapper):
         return {'success': True, 'order_id': order_id}
 
     def get_open_orders_req(self):
-        return self.req('get', '/orders')
+        return self.req('get', '/orders', endpoint='get_open_orders')
 
     def get_open_orders_resp(self, req):
         raw_open_orders, headers = self.resp(req)
@@ -426,7 +436,7 @@ class CoinbaseBTCUSDExchange(ExchangeAPIWrapper):
     def get_order_details_req(self, order_id):
         reqs = {}
         endpoint = '/orders/%s' % order_id
-        reqs['order'] = (self.req('get', endpoint))
+        reqs['order'] = (self.req('get', endpoint, endpoint='get_order_details'))
 
         # This kind of breaks the req/resp paradigm, but we need to get the results of
         # each batch before we know if we need to fetch another batch.
@@ -514,7 +524,7 @@ class CoinbaseBTCUSDExchange(ExchangeAPIWrapper):
 
     def cancel_order_req(self, order_id):
         endpoint = '/orders/%s' % order_id
-        return self.req('delete', endpoint)
+        return self.req('delete', endpoint, endpoint='cancel_order')
 
     def cancel_order_resp(self, req):
         # This is a weird one. It doesn't return JSON on success so we can't use
@@ -0,0 +1,78 @@
+"""
+Per-exchange, per-endpoint latency and error stats for exchange API calls.
+
+Every *_req method tags its request with an endpoint name and ExchangeAPIWrapper.resp
+records how long the exchange took to answer and whether the call failed. Stats are
+kept in memory here, in the same spirit as tick_profile_data, and drained by the live
+runner into DatumRecorder once per tick so we can see which exchange endpoint is
+slowing our ticks down.
+"""
+
+import bisect
+
+# Upper bounds of the latency histogram buckets, in seconds. Anything slower lands in
+# a final overflow bucket.
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+UNKNOWN_ENDPOINT = 'unknown'
+
+
+class EndpointStats(object):
+    def __init__(self):
+        self.count = 0
+        self.error_count = 0
+        self.total_latency = 0
+        self.max_latency = 0
+        self.histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def record(self, latency, error=False):
+        self.count += 1
+
+        if error:
+            self.error_count += 1
+
+        if latency is not None:
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+            self.histogram[bisect.bisect_left(LATENCY_BUCKETS, latency)] += 1
+
+    def merge(self, other):
+        self.count += other.count
+        self.error_count += other.error_count
+        self.total_latency += other.total_latency
+        self.max_latency = max(self.max_latency, other.max_latency)
+        self.histogram = [a + b for a, b in zip(self.histogram, other.histogram)]
+
+    @property
+    def timed_count(self):
+        return sum(self.histogram)
+
+    @property
+    def mean_latency(self):
+        if self.timed_count == 0:
+            return None
+
+        return self.total_latency / self.timed_count
+
+
+# Maps (exchange_name, endpoint) to EndpointStats.
+endpoint_stats = {}
+
+
+def record_endpoint_call(exchange_name, endpoint, latency, error=False):
+    key = (exchange_name, endpoint)
+
+    if key not in endpoint_stats:
+        endpoint_stats[key] = EndpointStats()
+
+    endpoint_stats[key].record(latency, error)
+
+
+def drain_endpoint_stats():
+    """
+    Returns the stats collected since the last drain and starts afresh.
+    """
+    stats = dict(endpoint_stats)
+    endpoint_stats.clear()
+
+    return stats
@@ -13,26 +13,30 @@ can safely use these when performance is not crucial.
 from collections import defaultdict
 import errno
 import functools
-import inspect
 import json
 import os
 from socket import error as SocketError
+import time
 
 from cdecimal import Decimal
 from delorean import Delorean, epoch
 import termcolor as tc
 import requests
-from requests_futures.sessions import FuturesSession
 
+from gryphon.lib.array_orderbook import ArrayOrderbook, OrderbookSide
 from gryphon.lib.configurable_object import ConfigurableObject
 from gryphon.lib.exchange import exceptions
 from gryphon.lib.exchange import exchange_factory
+from gryphon.lib.exchange import endpoint_metrics
 from gryphon.lib.exchange import order_types
+from gryphon.lib.exchange import session_pool
 from gryphon.lib.exchange.consts import Consts
 from gryphon.lib.exchange.exchange_order import Order
 from gryphon.lib.logger import get_logger
 from gryphon.lib.metrics import quote as quote_lib
 from gryphon.lib.money import Money
+from gryphon.lib.packed_orderbook import packed_orderbook_key, PackedOrderbook
+from gryphon.lib.packed_orderbook import VIEW_DEPTHS
 from gryphon.lib.session import get_a_redis_connection
 
 logger = get_logger(__name__)
@@ -43,10 +47,9 @@ class ExchangeAPIWrapper(ConfigurableObject):
     LOG_LINE_LIMIT = 100
 
     def __init__(self, session=None, configuration=None):
-        if session:
-            self.session = session
-        else:
-            self.session = FuturesSession(max_workers=10)
+        # If we aren't given a session we use the shared one for our host, but we
+        # don't know the host until the subclass has set base_url.
+        self._session = session
 
         self.withdrawal_fee = Money('0', 'BTC')
         self.btc_credit_limit = Money('0', 'BTC')
@@ -64,6 +67,31 @@ class ExchangeAPIWrapper(ConfigurableObject):
         self.max_tick_speed = 2
         self.use_cached_orderbook = False
 
+    @property
+    def session(self):
+        if self._session is None:
+            self._session = self.get_shared_session()
+
+        return self._session
+
+    @session.setter
+    def session(self, session):
+        self._session = session
+
+    def get_shared_session(self):
+        """
+        The session this wrapper uses if it wasn't given one. Subclasses that need
+        special session settings override this.
+        """
+        return session_pool.get_session(self.base_url)
+
+    def prewarm_session(self):
+        """
+        Open a connection to the exchange in the background, so that our first real
+        request doesn't pay for the handshakes.
+        """
+        return session_pool.prewarm(self.session, self.base_url)
+
     def configure(self, configuration):
         """
         Initialize fees, balance tolerances, and whether to use cached orderbooks.
@@ -194,6 +222,18 @@ class ExchangeAPIWrapper(ConfigurableObject):
 
     def get_multi_order_details_resp(self, req):
         raise NotImplementedError
+
+    def get_multi_order_details_req_for_ids(self, order_ids):
+        """
+        Exchanges disagree on whether get_multi_order_details_req or _resp takes the
+        order ids. This pair always takes them in both halves so that callers batching
+        requests across several exchanges can treat them all the same. Subclasses
+        that don't follow the base signatures override these too.
+        """
+        return self.get_multi_order_details_req(order_ids)
+
+    def get_multi_order_details_resp_for_ids(self, req, order_ids):
+        return self.get_multi_order_details_resp(req)
    
     def get_balance(self):
         """
@@ -241,12 +281,14 @@ class ExchangeAPIWrapper(ConfigurableObject):
     def get_ticker_resp(self, req):
         raise NotImplementedError
 
-    def get_orderbook(self, volume_limit=None, verify=True):
+    def get_orderbook(self, volume_limit=None, verify=True, depth=None):
         """
-        Get the current orderbook.
+        Get the current orderbook. If volume_limit or depth are given, each side is
+        cut off once it has volume_limit volume in it or depth levels, whichever
+        comes first.
         """
         req = self.get_orderbook_req(verify)
-        return self.get_orderbook_resp(req, volume_limit)
+        return self.get_orderbook_resp(req, volume_limit, depth)
 
     def get_orderbook_req(self, verify=True):
         if self.use_cached_orderbook:
@@ -254,13 +296,17 @@ class ExchangeAPIWrapper(ConfigurableObject):
 
         return self._get_orderbook_from_api_req(verify=verify)
 
-    def get_orderbook_resp(self, req, volume_limit=None):
+    def get_orderbook_resp(self, req, volume_limit=None, depth=None):
         if req == ExchangeAPIWrapper.CACHED_ORDERBOOK:
-            return self._get_orderbook_from_cache(volume_limit)
+            return self._get_orderbook_from_cache(volume_limit, depth)
         else:
             raw_orderbook = self._get_orderbook_from_api_resp(req)
 
-            parsed_orderbook = self.parse_orderbook(raw_orderbook, volume_limit)
+            parsed_orderbook = self.parse_orderbook(
+                raw_orderbook,
+                volume_limit,
+                depth=depth,
+            )
             parsed_orderbook['time_parsed'] = Delorean().epoch
 
             return parsed_orderbook
@@ -344,9 +390,10 @@ class ExchangeAPIWrapper(ConfigurableObject):
 
         return price, volume
 
-    def parse_orderbook(self, raw_orderbook, volume_limit=None, price_limit=None, cached_orders=False):
+    def parse_orderbook(self, raw_orderbook, volume_limit=None, price_limit=None, cached_orders=False, depth=None):
         """
-        Returns a dictionary containing a sorted list of asks and a sorted list of bids.
+        Returns an ArrayOrderbook containing a sorted list of asks and a sorted list of
+        bids, each with at most depth orders.
         """
 
         if cached_orders:
@@ -363,6 +410,10 @@ class ExchangeAPIWrapper(ConfigurableObject):
 
         bids = []
         asks = []
+        bid_prices = []
+        bid_volumes = []
+        ask_prices = []
+        ask_volumes = []
 
         total_volume = Money(0, self.volume_currency)
         top_bid_price, _ = self.parse_any_order(raw_bids[0], cached_orders)
@@ -377,12 +428,17 @@ class ExchangeAPIWrapper(ConfigurableObject):
                     break
 
             bids.append(Order(bid_price, bid_volume, self, Order.BID))
+            bid_prices.append(bid_price.amount)
+            bid_volumes.append(bid_volume.amount)
 
             total_volume += bid_volume
 
             if volume_limit and total_volume > volume_limit:
                 break
 
+            if depth and len(bids) >= depth:
+                break
+
         total_volume = Money('0', self.volume_currency)
         top_ask_price, __ = self.parse_any_order(raw_asks[0], cached_orders)
 
@@ -396,13 +452,23 @@ class ExchangeAPIWrapper(ConfigurableObject):
                     break
 
             asks.append(Order(ask_price, ask_volume, self, Order.ASK))
+            ask_prices.append(ask_price.amount)
+            ask_volumes.append(ask_volume.amount)
 
             total_volume += ask_volume
 
             if volume_limit and total_volume > volume_limit:
                 break
 
-        return {'bids': bids, 'asks': asks}
+            if depth and len(asks) >= depth:
+                break
+
+        return ArrayOrderbook(
+            bids,
+            asks,
+            bid_side=OrderbookSide(bid_prices, bid_volumes, descending=True),
+            ask_side=OrderbookSide(ask_prices, ask_volumes),
+        )
 
 
     # Request methods. All requests to exchange APIs are filtered through these
@@ -418,6 +484,9 @@ class ExchangeAPIWrapper(ConfigurableObject):
         This function handles the interface with the request-futures library as well as
         dispatches to the auth_request method if we're making an authenticated call like
         to place an order or get our balance.
+
+        Callers should pass endpoint='<name>' so that resp can log and time the
+        response without having to work out who called it.
         """
 
         # If the exchange has a base_url set for it's API we can send in only the
@@ -431,6 +500,12 @@ class ExchangeAPIWrapper(ConfigurableObject):
         except KeyError:
             no_auth = False
 
+        try:
+            endpoint = kwargs['endpoint']
+            del kwargs['endpoint']
+        except KeyError:
+            endpoint = endpoint_metrics.UNKNOWN_ENDPOINT
+
         if not no_auth:
             self.auth_request(req_method, url, kwargs)
 
@@ -445,26 +520,19 @@ class ExchangeAPIWrapper(ConfigurableObject):
         else:
             raise ValueError('%s method not supported' % req_method)
 
+        future.endpoint = endpoint
+        future.request_time = time.time()
+
         return future
 
     def resp(self, req):
         """
         Get the response from a requests-futures object.
         """
-
-        # Get the function name that called us.
-        try:
-            stack = inspect.stack()
-            api_method = stack[1][3]
-
-            if api_method == 'resp':
-                api_method = stack[2][3]
-
-            api_method = api_method.replace('_resp', '')
-        except IndexError:
-            api_method = 'unknown'
+        api_method = getattr(req, 'endpoint', endpoint_metrics.UNKNOWN_ENDPOINT)
 
         response = None
+        failed = True
 
         try:
             response = req.result()
@@ -481,6 +549,7 @@ class ExchangeAPIWrapper(ConfigurableObject):
             ))
 
             data = response.json(parse_float=Decimal)
+            failed = False
         except ValueError:  # This includes JSONDecodeError.
             raise exceptions.ExchangeAPIFailureException(self, response)
         except (requests.exceptions.ConnectionError,
@@ -491,9 +560,32 @@ class ExchangeAPIWrapper(ConfigurableObject):
                 raise exceptions.ExchangeAPIFailureException(self)
             else:
                 raise e
+        finally:
+            self.record_endpoint_call(req, response, failed)
 
         return data
 
+    def record_endpoint_call(self, req, response, failed=False):
+        """
+        Record the latency and outcome of an API call in endpoint_metrics. We use the
+        time requests measured between sending the request and parsing the response
+        headers where we have it, since the time until resp was called also includes
+        whatever the caller did in between.
+        """
+        if response is not None and getattr(response, 'elapsed', None) is not None:
+            latency = response.elapsed.total_seconds()
+        elif getattr(req, 'request_time', None) is not None:
+            latency = time.time() - req.request_time
+        else:
+            latency = None
+
+        endpoint_metrics.record_endpoint_call(
+            self.name,
+            getattr(req, 'endpoint', endpoint_metrics.UNKNOWN_ENDPOINT),
+            latency,
+            failed,
+        )
+
     def auth_request(req_method, url, request_args):
         """
         This function handles all calls to authenticated endpoints in the exchange API,
@@ -527,11 +619,39 @@ class ExchangeAPIWrapper(ConfigurableObject):
         """
         return raw_orderbook['asks']
 
-    def _get_orderbook_from_cache(self, volume_limit=None):
+    def _get_orderbook_from_cache(self, volume_limit=None, depth=None):
         """
-        Get the current orderbook for the exchange from our local cache.
+        Get the current orderbook for the exchange from our local cache. We prefer the
+        packed binary orderbook and fall back to the JSON one if the pollers for this
+        exchange don't publish it.
+
+        If the caller only wants the top of the book we try the pollers' depth-limited
+        packed views first, smallest first, and use the first one that satisfies
+        volume_limit and depth.
         """
 
+        for view_depth in self._packed_view_candidates(volume_limit, depth):
+            packed_key = packed_orderbook_key(self.name, view_depth)
+            raw_packed_result = self.redis.get(packed_key)
+
+            if not raw_packed_result or raw_packed_result == 'None':
+                continue
+
+            try:
+                packed_orderbook = PackedOrderbook(raw_packed_result)
+            except Exception:
+                raise exceptions.CachedOrderbookFailure(
+                    self,
+                    'Unable to parse cached orderbook',
+                )
+
+            if self._packed_view_suffices(packed_orderbook, view_depth, volume_limit, depth):
+                return self._get_orderbook_from_packed_cache(
+                    packed_orderbook,
+                    volume_limit,
+                    depth,
+                )
+
         key = '%s_orderbook' % self.name.lower()
         raw_redis_result = self.redis.get(key)
 
@@ -553,6 +673,7 @@ class ExchangeAPIWrapper(ConfigurableObject):
                 orderbook,
                 volume_limit,
                 cached_orders=True,
+                depth=depth,
             )
 
             parsed_orderbook['time_fetched'] = time_fetched
@@ -566,6 +687,116 @@ class ExchangeAPIWrapper(ConfigurableObject):
                 'Unable to parse cached orderbook',
             )
 
+    def _packed_view_candidates(self, volume_limit=None, depth=None):
+        """
+        The packed views worth trying for a request, smallest first, ending with the
+        full book (None).
+        """
+        if volume_limit is None and depth is None:
+            return [None]
+
+        return [d for d in VIEW_DEPTHS if depth is None or d >= depth] + [None]
+
+    def _packed_view_suffices(self, packed_orderbook, view_depth, volume_limit=None, depth=None):
+        """
+        Whether a depth-limited view has every level the request needs. A side that
+        wasn't truncated is always complete, otherwise it has to hold more than
+        volume_limit. The full book always suffices.
+        """
+        if view_depth is None:
+            return True
+
+        if volume_limit is None:
+            return True
+
+        bid_volume = Money(packed_orderbook.total_bid_volume(), self.volume_currency)
+        ask_volume = Money(packed_orderbook.total_ask_volume(), self.volume_currency)
+
+        bids_complete = (
+            packed_orderbook.bid_depth < view_depth
+            or bid_volume > volume_limit
+            or (depth and packed_orderbook.bid_depth >= depth)
+        )
+
+        asks_complete = (
+            packed_orderbook.ask_depth < view_depth
+            or ask_volume > volume_limit
+            or (depth and packed_orderbook.ask_depth >= depth)
+        )
+
+        return bool(bids_complete and asks_complete)
+
+    def _get_orderbook_from_packed_cache(self, packed_orderbook, volume_limit=None, depth=None):
+        try:
+            orderbook_age = Delorean().epoch - packed_orderbook.timestamp
+
+            if orderbook_age >= 10:
+                raise exceptions.CachedOrderbookFailure(
+                    self,
+                    'Cached orderbook more than 10 seconds old',
+                )
+
+            parsed_orderbook = self.parse_packed_orderbook(
+                packed_orderbook,
+                volume_limit,
+                depth,
+            )
+
+            parsed_orderbook['time_fetched'] = packed_orderbook.timestamp
+
+            return parsed_orderbook
+        except exceptions.CachedOrderbookFailure:
+            raise
+        except Exception as e:
+            raise exceptions.CachedOrderbookFailure(
+                self,
+                'Unable to parse cached orderbook',
+            )
+
+    def parse_packed_orderbook(self, packed_orderbook, volume_limit=None, depth=None):
+        """
+        Sibling to parse_orderbook for PackedOrderbooks. The levels are already sorted,
+        so we only decode and build Orders for as many as volume_limit and depth
+        require.
+        """
+        bids = self._orders_from_packed_levels(
+            packed_orderbook.bids(),
+            Order.BID,
+            volume_limit,
+            depth,
+        )
+
+        asks = self._orders_from_packed_levels(
+            packed_orderbook.asks(),
+            Order.ASK,
+            volume_limit,
+            depth,
+        )
+
+        if not bids or not asks:
+            raise exceptions.CachedOrderbookFailure(self, 'Cached orderbook is empty')
+
+        return ArrayOrderbook(bids, asks)
+
+    def _orders_from_packed_levels(self, levels, order_type, volume_limit=None, depth=None):
+        orders = []
+        total_volume = Money('0', self.volume_currency)
+
+        for price, volume in levels:
+            volume = Money(volume, self.volume_currency)
+
+            orders.append(Order(Money(price, self.currency), volume, self, order_type))
+
+            total_volume += volume
+
+            if volume_limit and total_volume > volume_limit:
+                break
+
+            if depth and len(orders) >= depth:
+                break
+
+        return orders
+
     def _load_env(self, key):
         return str(os.environ[key])
 
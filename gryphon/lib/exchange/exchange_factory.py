@@ -37,6 +37,9 @@ HISTORICAL_EXCHANGE_KEYS = [
 
 BANK_ACCOUNT_KEYS = ['BMO_USD', 'BMO_CAD', 'BMO_CAD_OPS', 'BOA_MAIN', 'BOA_INCOME']
 
+# The wrappers handed out by shared_exchange_from_key, by canonical key.
+_shared_exchanges = {}
+
 
 def all_exchanges():
     return [make_exchange_from_key(key) for key in ALL_EXCHANGE_KEYS]
@@ -97,6 +100,25 @@ def make_exchange_from_key(key):
     return api_wrapper_class()
 
 
+def shared_exchange_from_key(key):
+    """
+    Like make_exchange_from_key, but returns a single wrapper per exchange that is
+    shared by the whole process. This is for code that only needs an exchange's
+    metadata (name, currencies, fees, precision), like the ORM models and the
+    dashboards, which would otherwise build a wrapper for every object they load.
+
+    The shared wrapper doesn't open an HTTP session until it's used to make a request.
+    It must be treated as read-only: anyone who wants to configure a wrapper should
+    make their own with make_exchange_from_key.
+    """
+    key = canonical_key(key)
+
+    if key not in _shared_exchanges:
+        _shared_exchanges[key] = make_exchange_from_key(key)
+
+    return _shared_exchanges[key]
+
+
 def make_exchange_data_from_key(key, db):
     keys = [key]
     exchange_datas = make_exchange_datas_from_keys(keys, db)
@@ -68,7 +68,7 @@ class GeminiBTCUSDExchange(ExchangeAPIWrapper):
         }
 
     def get_balance_req(self):
-        return self.req('post', '/balances')
+        return self.req('post', '/balances', endpoint='get_balance')
 
     def get_balance_resp(self, req):
         raw_balances = self.resp(req)
@@ -106,6 +106,7 @@ class GeminiBTCUSDExchange(ExchangeAPIWrapper):
             '/book/%s?limit_bids=0&limit_asks=0' % self.gemini_pair_symbol,
             no_auth=True,
             verify=verify,
+            endpoint='get_orderbook_from_api',
         )
 
     @property
@@ -133,7 +134,7 @@ class GeminiBTCUSDExchange(ExchangeAPIWrapper):
         if until:
             payload['until'] = str(until)
 
-        return self.req('post', '/mytrades', data=payload)
+        return self.req('post', '/mytrades', data=payload, endpoint='all_trades')
 
     def all_trades_resp(self, req):
         return self.resp(req)
@@ -198,7 +199,7 @@ class GeminiBTCUSDExchange(ExchangeAPIWrapper):
             'type': 'exchange limit',
         }
 
-        return self.req('post', '/order/new', data=payload)
+        return self.req('post', '/order/new', data=payload, endpoint='place_order')
 
     def place_order_resp(self, req):
         response = self.resp(req)
@@ -214,7 +215,7 @@ class GeminiBTCUSDExchange(ExchangeAPIWrapper):
             )
 
     def get_open_orders_req(self):
-        return self.req('post', '/orders')
+        return self.req('post', '/orders', endpoint='get_open_orders')
 
     def get_open_orders_resp(self, req):
         raw_open_orders = self.resp(req)
@@ -317,6 +318,12 @@ class GeminiBTCUSDExchange(ExchangeAPIWrapper):
 
         return data
 
+    def get_multi_order_details_req_for_ids(self, order_ids):
+        return self.get_multi_order_details_req()
+
+    def get_multi_order_details_resp_for_ids(self, req, order_ids):
+        return self.get_multi_order_details_resp(req, order_ids)
+
     def cancel_all_open_orders(self):
         """
         Gemini has it's own cancel-all-orders endpoint that doesn't require us to
@@ -326,7 +333,7 @@ class GeminiBTCUSDExchange(ExchangeAPIWrapper):
         return self.cancel_all_open_orders_resp(req)
 
     def cancel_all_open_orders_req(self):
-        return self.req('post', '/order/cancel/all')
+        return self.req('post', '/order/cancel/all', endpoint='cancel_all_open_orders')
 
     def cancel_all_open_orders_resp(self, req):
         resp = self.resp(req)
@@ -341,7 +348,7 @@ class GeminiBTCUSDExchange(ExchangeAPIWrapper):
             'order_id': order_id,
         }
 
-        return self.req('post', '/order/cancel', data=payload)
+        return self.req('post', '/order/cancel', data=payload, endpoint='cancel_order')
 
     def cancel_order_resp(self, req):
         response = self.resp(req)
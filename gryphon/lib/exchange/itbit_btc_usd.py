@@ -112,6 +112,7 @@ class ItbitBTCUSDExchange(ExchangeAPIWrapper):
             'get',
             '/wallets/%s/trades' % self.wallet_id,
             params=params,
+            endpoint='all_trades',
         )
 
     def all_trades_resp(self, req):
@@ -155,6 +156,7 @@ class ItbitBTCUSDExchange(ExchangeAPIWrapper):
             'get',
             '/wallets/%s/orders' % self.wallet_id,
             params=params,
+            endpoint='all_orders',
         )
 
     def all_orders_resp(self, req):
@@ -242,7 +244,7 @@ class ItbitBTCUSDExchange(ExchangeAPIWrapper):
         except AttributeError:
             self.user_id = self._load_env('ITBIT_BTC_USD_USER_ID')
 
-        return self.req('get', '/wallets/%s' % self.wallet_id)
+        return self.req('get', '/wallets/%s' % self.wallet_id, endpoint='get_balance')
 
     def get_balance_resp(self, req):
         response = self.resp(req)
@@ -275,6 +277,7 @@ class ItbitBTCUSDExchange(ExchangeAPIWrapper):
             '/markets/XBTUSD/ticker',
             no_auth=True,
             verify=verify,
+            endpoint='get_ticker',
         )
 
     def get_ticker_resp(self, req):
@@ -293,6 +296,7 @@ class ItbitBTCUSDExchange(ExchangeAPIWrapper):
             '/markets/XBTUSD/order_book',
             no_auth=True,
             verify=verify,
+            endpoint='get_orderbook_from_api',
         )
 
     def place_order_req(self, mode, volume, price=None, order_type=order_types.LIMIT_ORDER):
@@ -323,6 +327,7 @@ class ItbitBTCUSDExchange(ExchangeAPIWrapper):
             'post',
             '/wallets/%s/orders/' % self.wallet_id,
             data=payload,
+            endpoint='place_order',
         )
 
     def place_order_resp(self, req):
@@ -425,10 +430,17 @@ class ItbitBTCUSDExchange(ExchangeAPIWrapper):
 
         return data
 
+    def get_multi_order_details_req_for_ids(self, order_ids):
+        return self.get_multi_order_details_req()
+
+    def get_multi_order_details_resp_for_ids(self, req, order_ids):
+        return self.get_multi_order_details_resp(req, order_ids)
+
     def cancel_order_req(self, order_id):
         return self.req(
             'delete',
             '/wallets/%s/orders/%s' % (self.wallet_id, order_id),
+            endpoint='cancel_order',
         )
 
     def cancel_order_resp(self, req):
@@ -456,6 +468,7 @@ class ItbitBTCUSDExchange(ExchangeAPIWrapper):
             'post',
             '/wallets/%s/cryptocurrency_withdrawals' % self.wallet_id,
             data=payload,
+            endpoint='withdraw_crypto',
         )
 
     def withdraw_crypto_resp(self, req):
@@ -103,7 +103,12 @@ class KrakenBTCEURExchange(ExchangeAPIWrapper):
                 'txid': ','.join(trade_ids_chunk),
             }
 
-            req = self.req('post', '/private/QueryTrades', data=payload)
+            req = self.req(
+                'post',
+                '/private/QueryTrades',
+                data=payload,
+                endpoint='get_trades_info',
+            )
             reqs.append(req)
 
         return reqs
@@ -193,7 +198,12 @@ class KrakenBTCEURExchange(ExchangeAPIWrapper):
             'id': ledger_id,
         }
 
-        return self.req('post', '/private/QueryLedgers', data=payload)
+        return self.req(
+            'post',
+            '/private/QueryLedgers',
+            data=payload,
+            endpoint='ledger_entry',
+        )
 
     def ledger_entry_resp(self, req):
         return self.resp(req)
@@ -227,7 +237,12 @@ class KrakenBTCEURExchange(ExchangeAPIWrapper):
         if end:
             payload['end'] = '%.3f' % end
 
-        return self.req('post', '/private/Ledgers', data=payload)
+        return self.req(
+            'post',
+            '/private/Ledgers',
+            data=payload,
+            endpoint='get_ledger_entries',
+        )
 
     def get_ledger_entries_resp(self, req):
         response = self.resp(req)
@@ -256,7 +271,12 @@ class KrakenBTCEURExchange(ExchangeAPIWrapper):
         if offset:
             payload['ofs'] = str(offset)
 
-        return self.req('post', '/private/ClosedOrders', data=payload)
+        return self.req(
+            'post',
+            '/private/ClosedOrders',
+            data=payload,
+            endpoint='closed_orders',
+        )
 
     def closed_orders_resp(self, req):
         response = self.resp(req)
@@ -314,7 +334,7 @@ class KrakenBTCEURExchange(ExchangeAPIWrapper):
         })
 
     def get_balance_req(self):
-        return self.req('post', '/private/BalanceEx')
+        return self.req('post', '/private/BalanceEx', endpoint='get_balance')
 
     def get_balance_resp(self, req):
         response = self.resp(req)
@@ -343,7 +363,7 @@ class KrakenBTCEURExchange(ExchangeAPIWrapper):
 
     def get_ticker_req(self, verify=True):
         url = '/public/Ticker?pair=%s' % self.pair
-        return self.req('get', url, no_auth=True, verify=verify)
+        return self.req('get', url, no_auth=True, verify=verify, endpoint='get_ticker')
 
     def get_ticker_resp(self, req):
         response = self.resp(req)
@@ -358,7 +378,13 @@ class KrakenBTCEURExchange(ExchangeAPIWrapper):
 
     def _get_orderbook_from_api_req(self, verify=True):
         url = '/public/Depth?pair=%s&count=%s' % (self.pair, self.orderbook_depth)
-        return self.req('get', url, no_auth=True, verify=verify)
+        return self.req(
+            'get',
+            url,
+            no_auth=True,
+            verify=verify,
+            endpoint='get_orderbook_from_api',
+        )
 
     def _get_raw_bids(self, raw_orderbook):
         return raw_orderbook[self.pair]['bids']
@@ -381,7 +407,12 @@ class KrakenBTCEURExchange(ExchangeAPIWrapper):
         except AttributeError:
             raise TypeError('volume and price must be Money objects')
 
-        return self.req('post', '/private/AddOrder', data=payload)
+        return self.req(
+            'post',
+            '/private/AddOrder',
+            data=payload,
+            endpoint='place_order',
+        )
 
     def place_order_resp(self, req):
         response = self.resp(req)
@@ -396,7 +427,12 @@ class KrakenBTCEURExchange(ExchangeAPIWrapper):
 
     def get_open_orders_req(self):
         payload = {}
-        return self.req('post', '/private/OpenOrders', data=payload)
+        return self.req(
+            'post',
+            '/private/OpenOrders',
+            data=payload,
+            endpoint='get_open_orders',
+        )
 
     def get_open_orders_resp(self, req):
         response = self.resp(req)
@@ -450,7 +486,12 @@ class KrakenBTCEURExchange(ExchangeAPIWrapper):
             'txid': ','.join(order_ids),
         }
 
-        return self.req('post', '/private/QueryOrders', data=payload)
+        return self.req(
+            'post',
+            '/private/QueryOrders',
+            data=payload,
+            endpoint='get_multi_order_details',
+        )
 
     def get_multi_order_details_resp(self, req, order_ids):
         multi_trades = self.resp(req)
@@ -520,12 +561,23 @@ class KrakenBTCEURExchange(ExchangeAPIWrapper):
 
         return data
 
+    def get_multi_order_details_req_for_ids(self, order_ids):
+        return self.get_multi_order_details_req(order_ids)
+
+    def get_multi_order_details_resp_for_ids(self, req, order_ids):
+        return self.get_multi_order_details_resp(req, order_ids)
+
     def cancel_order_req(self, order_id):
         payload = {
             'txid': unicode(order_id),
         }
 
-        return self.req('post', '/private/CancelOrder', data=payload)
+        return self.req(
+            'post',
+            '/private/CancelOrder',
+            data=payload,
+            endpoint='cancel_order',
+        )
 
     def cancel_order_resp(self, req):
         response = self.resp(req)
@@ -578,7 +630,12 @@ class KrakenBTCEURExchange(ExchangeAPIWrapper):
             'amount': volume.amount,
         }
 
-        return self.req('post', '/private/Withdraw', data=payload)
+        return self.req(
+            'post',
+            '/private/Withdraw',
+            data=payload,
+            endpoint='withdraw_crypto',
+        )
 
     def withdraw_crypto_resp(self, req):
         response = self.resp(req)
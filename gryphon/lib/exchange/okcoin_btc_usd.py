@@ -118,7 +118,13 @@ class OKCoinBTCUSDExchange(ExchangeAPIWrapper):
             )
 
     def ticker_req(self, verify=True):
-        return self.req('get', '/ticker.do', no_auth=True, verify=verify)
+        return self.req(
+            'get',
+            '/ticker.do',
+            no_auth=True,
+            verify=verify,
+            endpoint='ticker',
+        )
 
 
     def ticker_resp(self, req):
@@ -159,7 +165,12 @@ class OKCoinBTCUSDExchange(ExchangeAPIWrapper):
             'page_length': 200,
         }
 
-        return self.req('post', '/order_history.do', data=payload)
+        return self.req(
+            'post',
+            '/order_history.do',
+            data=payload,
+            endpoint='all_transactions',
+        )
 
     def all_transactions_resp(self, req):
         return self.resp(req)
@@ -207,7 +218,7 @@ class OKCoinBTCUSDExchange(ExchangeAPIWrapper):
 
 
     def balance_req(self):
-        return self.req('post', '/userinfo.do')
+        return self.req('post', '/userinfo.do', endpoint='balance')
 
 
     def balance_resp(self, req):
@@ -231,7 +242,13 @@ class OKCoinBTCUSDExchange(ExchangeAPIWrapper):
         return balance
 
     def _get_order_book_req(self, verify=True):
-        return self.req('get', '/depth.do', no_auth=True, verify=verify)
+        return self.req(
+            'get',
+            '/depth.do',
+            no_auth=True,
+            verify=verify,
+            endpoint='get_order_book',
+        )
             
     def create_trade_req(self, mode, volume, price, is_market_order=False):
         volume = self.round(volume)
@@ -250,7 +267,7 @@ class OKCoinBTCUSDExchange(ExchangeAPIWrapper):
         except AttributeError:
             raise TypeError('volume and price must be Money objects')
 
-        return self.req('post', '/trade.do', data=payload)
+        return self.req('post', '/trade.do', data=payload, endpoint='create_trade')
 
     def create_trade_resp(self, req):
         response = self.resp(req)
@@ -278,7 +295,7 @@ class OKCoinBTCUSDExchange(ExchangeAPIWrapper):
             'symbol': 'btc_usd',
         }
 
-        return self.req('post', '/order_fee.do', data=payload)
+        return self.req('post', '/order_fee.do', data=payload, endpoint='order_fee')
 
     def order_fee_resp(self, req):
         try:
@@ -344,7 +361,12 @@ class OKCoinBTCUSDExchange(ExchangeAPIWrapper):
         }
 
         reqs = {
-            'details': self.req('post', '/order_info.do', data=payload),
+            'details': self.req(
+                'post',
+                '/order_info.do',
+                data=payload,
+                endpoint='order_details',
+            ),
             'fee': self.order_fee_req(order_id),
         }
 
@@ -384,7 +406,12 @@ class OKCoinBTCUSDExchange(ExchangeAPIWrapper):
             'order_id': order_ids_string,
         }
 
-        details_reqs.append(self.req('post', '/orders_info.do', data=filled_payload))
+        details_reqs.append(self.req(
+            'post',
+            '/orders_info.do',
+            data=filled_payload,
+            endpoint='multi_order_details',
+        ))
 
         unfilled_payload = {
             'symbol': 'btc_usd',
@@ -395,7 +422,12 @@ class OKCoinBTCUSDExchange(ExchangeAPIWrapper):
             'order_id': order_ids_string,
         }
 
-        details_reqs.append(self.req('post', '/orders_info.do', data=unfilled_payload))
+        details_reqs.append(self.req(
+            'post',
+            '/orders_info.do',
+            data=unfilled_payload,
+            endpoint='multi_order_details',
+        ))
 
         for order_id in order_ids:
             fee_reqs[order_id] = self.order_fee_req(order_id)
@@ -473,7 +505,12 @@ class OKCoinBTCUSDExchange(ExchangeAPIWrapper):
             'order_id': order_id,
         }
 
-        return self.req('post', '/cancel_order.do', data=payload)
+        return self.req(
+            'post',
+            '/cancel_order.do',
+            data=payload,
+            endpoint='cancel_order',
+        )
 
     def cancel_order_resp(self, req):
         response = self.resp(req)
@@ -496,7 +533,12 @@ class OKCoinBTCUSDExchange(ExchangeAPIWrapper):
             'withdraw_amount': str(volume.amount),
         }
 
-        return self.req('post', '/withdraw.do', data=payload)
+        return self.req(
+            'post',
+            '/withdraw.do',
+            data=payload,
+            endpoint='withdraw_crypto',
+        )
 
     def withdraw_crypto_resp(self, req):
         response = self.resp(req)
@@ -84,7 +84,12 @@ class QuadrigaBTCCADExchange(ExchangeAPIWrapper):
             'limit': 100,
         }
 
-        return self.req('post', '/user_transactions', data=payload)
+        return self.req(
+            'post',
+            '/user_transactions',
+            data=payload,
+            endpoint='transactions',
+        )
     
     def transactions_resp(self, req):
         return self.resp(req)
@@ -193,7 +198,7 @@ class QuadrigaBTCCADExchange(ExchangeAPIWrapper):
         })
         
     def get_balance_req(self):
-        return self.req('post', '/balance')
+        return self.req('post', '/balance', endpoint='get_balance')
 
     def get_balance_resp(self, req):
         response = self.resp(req)
@@ -211,7 +216,13 @@ class QuadrigaBTCCADExchange(ExchangeAPIWrapper):
         return data
         
     def _get_orderbook_from_api_req(self, verify=True):
-        return self.req('get', '/order_book', no_auth=True, verify=verify)
+        return self.req(
+            'get',
+            '/order_book',
+            no_auth=True,
+            verify=verify,
+            endpoint='get_orderbook_from_api',
+        )
     
     def place_order_req(self, mode, volume, price, order_type=order_types.LIMIT_ORDER):
         payload = {
@@ -220,9 +231,9 @@ class QuadrigaBTCCADExchange(ExchangeAPIWrapper):
         }
 
         if mode == Consts.BID:
-            return self.req('post', '/buy', data=payload)
+            return self.req('post', '/buy', data=payload, endpoint='place_order')
         elif mode == Consts.ASK:
-            return self.req('post', '/sell', data=payload)
+            return self.req('post', '/sell', data=payload, endpoint='place_order')
         else:
             raise ValueError('Mode must be either bid_string or the ask_string.')
 
@@ -238,7 +249,7 @@ class QuadrigaBTCCADExchange(ExchangeAPIWrapper):
             )
     
     def get_open_orders_req(self):
-        return self.req('post', '/open_orders')
+        return self.req('post', '/open_orders', endpoint='get_open_orders')
         
     def get_open_orders_resp(self, req):
         raw_open_orders = self.resp(req)
@@ -268,7 +279,12 @@ class QuadrigaBTCCADExchange(ExchangeAPIWrapper):
             'id': unicode(order_id),
         }
 
-        return self.req('post', '/lookup_order', data=payload)
+        return self.req(
+            'post',
+            '/lookup_order',
+            data=payload,
+            endpoint='get_order_details',
+        )
     
     def get_order_details_resp(self, req):
         order = self.resp(req)
@@ -309,7 +325,13 @@ class QuadrigaBTCCADExchange(ExchangeAPIWrapper):
         return data
 
     def get_ticker_req(self, verify=True):
-        return self.req('get', '/ticker', no_auth=True, verify=verify)
+        return self.req(
+            'get',
+            '/ticker',
+            no_auth=True,
+            verify=verify,
+            endpoint='get_ticker',
+        )
     
     def get_ticker_resp(self, req):
         response = self.resp(req)
@@ -326,7 +348,7 @@ class QuadrigaBTCCADExchange(ExchangeAPIWrapper):
             'id': order_id,
         }
 
-        return self.req('post', '/cancel_order', data=payload)
+        return self.req('post', '/cancel_order', data=payload, endpoint='cancel_order')
     
     def cancel_order_resp(self, req):
         response = self.resp(req)
@@ -344,7 +366,12 @@ class QuadrigaBTCCADExchange(ExchangeAPIWrapper):
             'address': address,
         }
 
-        return self.req('post', '/bitcoin_withdrawal', data=payload)
+        return self.req(
+            'post',
+            '/bitcoin_withdrawal',
+            data=payload,
+            endpoint='withdraw_crypto',
+        )
 
     def withdraw_crypto_resp(self, req):
         response = self.resp(req)
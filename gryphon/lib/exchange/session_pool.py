@@ -0,0 +1,135 @@
+"""
+A process-wide pool of HTTP sessions for the exchange API wrappers.
+
+Each ExchangeAPIWrapper used to create its own FuturesSession, which meant a thread pool
+and a set of urllib3 connection pools per wrapper, and a fresh TLS handshake for every
+wrapper's first request even when several wrappers talk to the same host (e.g. all the
+Bitstamp pairs). Instead, wrappers get their session from here:
+
+  - There is one session per exchange host, so connections are kept alive and reused
+    by every wrapper talking to that host.
+  - All sessions submit their requests to one shared thread pool of max_workers
+    threads.
+  - Each host's connection pool is capped at connections_per_host. Requests beyond
+    that wait for a free connection rather than opening more.
+
+Call configure() before the first session is created to change the defaults, and
+prewarm() to open a connection to a host ahead of its first real request.
+"""
+
+import threading
+import urlparse
+
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from requests_futures.sessions import FuturesSession
+
+from gryphon.lib.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_MAX_WORKERS = 20
+DEFAULT_CONNECTIONS_PER_HOST = 10
+
+_settings = {
+    'max_workers': DEFAULT_MAX_WORKERS,
+    'connections_per_host': DEFAULT_CONNECTIONS_PER_HOST,
+}
+
+_lock = threading.Lock()
+_executor = None
+_sessions = {}
+
+
+class SessionPoolException(Exception):
+    pass
+
+
+def configure(max_workers=None, connections_per_host=None):
+    """
+    Change the pool settings. This has to happen before any sessions are created.
+    Arguments left as None keep their current setting, so calling this without any
+    changes is always safe.
+    """
+    settings = dict(_settings)
+
+    if max_workers is not None:
+        settings['max_workers'] = int(max_workers)
+
+    if connections_per_host is not None:
+        settings['connections_per_host'] = int(connections_per_host)
+
+    with _lock:
+        if settings == _settings:
+            return
+
+        if _executor is not None:
+            raise SessionPoolException(
+                'The session pool must be configured before it is used',
+            )
+
+        _settings.update(settings)
+
+
+def get_session(url, cookie_jar_class=None):
+    """
+    Returns the shared FuturesSession for url's host. Wrappers that need a particular
+    cookie jar class (e.g. Bitstamp's ForgetfulCookieJar) get a session of their own
+    with that jar, which is still shared between wrappers asking for the same one.
+    """
+    global _executor
+
+    key = (_host(url), cookie_jar_class)
+
+    with _lock:
+        if key not in _sessions:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=_settings['max_workers'])
+
+            _sessions[key] = _create_session(cookie_jar_class)
+
+        return _sessions[key]
+
+
+def prewarm(session, url):
+    """
+    Open a connection to url's host on session in the background, so that the first
+    real request doesn't pay for the TCP and TLS handshakes. Returns the request
+    future, which nobody needs to wait on.
+    """
+    future = session.head(url, timeout=10, allow_redirects=False)
+    future.add_done_callback(_log_prewarm_failure)
+
+    return future
+
+
+def _create_session(cookie_jar_class):
+    session = FuturesSession(executor=_executor)
+
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=_settings['connections_per_host'],
+        pool_block=True,
+    )
+
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+    if cookie_jar_class is not None:
+        session.cookies = cookie_jar_class()
+
+    return session
+
+
+def _host(url):
+    parsed_url = urlparse.urlparse(url)
+
+    return '%s://%s' % (parsed_url.scheme, parsed_url.netloc)
+
+
+def _log_prewarm_failure(future):
+    exception = future.exception()
+
+    if exception is not None:
+        logger.info('Could not prewarm connection: %s' % exception)
+
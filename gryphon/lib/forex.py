@@ -100,3 +100,109 @@ class USDCurrencyConverter(object):
 
         return rate
 
+
+
+class FXSnapshot(object):
+    """
+    A frozen copy of the USD exchange rates, for code that converts a lot of Money in
+    one pass (e.g. walking orderbooks in different price currencies). Looking a rate up
+    here is a dictionary read, where USDCurrencyConverter.rate goes through cache_me on
+    every call.
+
+    Take a new snapshot every tick or pricing pass with FXSnapshot.current(), and pass
+    it to Money.to(). Backtests can pin the rates of a given day with
+    FXSnapshot.historical(), or pass in their own rates.
+
+    A snapshot made without rates fetches the current ones the first time a rate is
+    needed, so passing one around to code that turns out not to convert anything (e.g.
+    two orderbooks in the same currency) costs nothing.
+    """
+
+    # The same lifetime as USDCurrencyConverter's rate cache.
+    DEFAULT_MAX_AGE = 60
+
+    def __init__(self, rates=None, timestamp=None, pinned=False):
+        self._rates = None
+        self.timestamp = timestamp
+        self.pinned = pinned
+
+        if rates is not None:
+            self._rates = dict(rates)
+
+            if timestamp is None:
+                self.timestamp = Delorean().epoch
+
+        self.miss_count = 0
+        self._cross_rates = {}
+
+    @classmethod
+    def current(cls):
+        return cls()
+
+    @classmethod
+    def historical(cls, date):
+        rates = USDCurrencyConverter._historical_rates(date.year, date.month, date.day)
+
+        return cls(rates, pinned=True)
+
+    @property
+    def rates(self):
+        if self._rates is None:
+            self._rates = dict(USDCurrencyConverter._all_rates())
+            self.timestamp = Delorean().epoch
+
+        return self._rates
+
+    @property
+    def is_loaded(self):
+        return self._rates is not None
+
+    @property
+    def age(self):
+        if self.timestamp is None:
+            return 0
+
+        return Delorean().epoch - self.timestamp
+
+    def is_stale(self, max_age=DEFAULT_MAX_AGE):
+        """
+        Pinned snapshots are never stale, since they are supposed to stay the same, and
+        neither are snapshots that haven't fetched their rates yet.
+        """
+        if self.pinned or not self.is_loaded:
+            return False
+
+        stale = self.age > max_age
+
+        if stale:
+            logger.info('FX snapshot is stale (%.1fs old)' % self.age)
+
+        return stale
+
+    def rate(self, currency_code):
+        try:
+            return self.rates[currency_code]
+        except KeyError:
+            self.miss_count += 1
+
+            logger.info('FX snapshot has no rate for %s' % currency_code)
+
+            # A pinned snapshot shouldn't quietly pick up today's rates.
+            if self.pinned:
+                raise
+
+            rate = USDCurrencyConverter.rate(currency_code)
+            self.rates[currency_code] = rate
+
+            return rate
+
+    def cross_rate(self, from_currency, to_currency):
+        """
+        The number of to_currency units one from_currency unit is worth.
+        """
+        key = (from_currency, to_currency)
+
+        if key not in self._cross_rates:
+            self._cross_rates[key] = self.rate(to_currency) / self.rate(from_currency)
+
+        return self._cross_rates[key]
@@ -3,22 +3,27 @@ A small library that helps us calculate various positions. Of a trades list, of
 algorithm, of an exchange ledger. Lots of definitions of position around here.
 """
 
+import json
+
 from sqlalchemy import func
 
 from gryphon.lib.exchange.consts import Consts
 from gryphon.lib.logger import get_logger
+from gryphon.lib.models.datum import Datum
 from gryphon.lib.models.exchange import Exchange as ExchangeData
 from gryphon.lib.models.order import Order
 from gryphon.lib.models.trade import Trade
 from gryphon.lib.money import Money
+from gryphon.lib.session import commit_mysql_session
 
 logger = get_logger(__name__)
 
 
-def fast_position(db, start_time=None, end_time=None, exchange_name=None, volume_currency='BTC', actor='Multi'):
+def fast_position(db, start_time=None, end_time=None, exchange_name=None, volume_currency='BTC', actor='Multi', after_trade_id=None):
     """
     Get the position of an exchange or strategy quickly using sql summing instead of
-    loading every trade and doing it in python.
+    loading every trade and doing it in python. With after_trade_id, only the trades
+    written after that one are summed.
 
     TODO: We should extend this to not require an actor or volume currency.
     """
@@ -30,6 +35,9 @@ def fast_position(db, start_time=None, end_time=None, exchange_name=None, volume
     if end_time:
         query = query.filter(Trade.time_created < end_time)
 
+    if after_trade_id is not None:
+        query = query.filter(Trade.trade_id > after_trade_id)
+
     if exchange_name:
         query = query.filter(Order._exchange_name == exchange_name)
 
@@ -51,6 +59,138 @@ def fast_position(db, start_time=None, end_time=None, exchange_name=None, volume
     return position
 
 
+class PositionTracker(object):
+    """
+    Keeps a strategy's position in memory so that reading it doesn't cost a
+    fast_position query every tick.
+
+    The position is seeded from the database the first time it's read: from the
+    newest checkpoint datum plus the trades written after it if there is one, otherwise
+    from the strategy's whole trade history. After that it's only updated
+    incrementally, by apply(), as the exchange coordinators account for fills.
+    reconcile() compares the tracked position to the full SQL aggregate, corrects any
+    drift, and writes a new checkpoint.
+
+    A checkpoint records the last trade_id it includes, rather than relying on its
+    timestamp, since trades are timestamped with their execution time and a fill
+    accounted for after the checkpoint can have executed before it.
+    """
+
+    def __init__(self, db, actor, volume_currency='BTC'):
+        self.db = db
+        self.actor = actor
+        self.volume_currency = volume_currency
+
+        self._position = None
+
+    @property
+    def checkpoint_datum_type(self):
+        return 'POSITION_CHECKPOINT_%s_%s' % (self.actor, self.volume_currency)
+
+    @property
+    def is_seeded(self):
+        return self._position is not None
+
+    @property
+    def position(self):
+        if self._position is None:
+            self.seed()
+
+        return self._position
+
+    def seed(self):
+        checkpoint = self.latest_checkpoint()
+        checkpoint_trade_id = None
+
+        if checkpoint:
+            checkpoint_trade_id = json.loads(checkpoint.meta_data).get('trade_id')
+
+        # Checkpoints from before any trades, or without a trade_id, can't be built on.
+        if checkpoint_trade_id is not None:
+            self._position = Money(checkpoint.numeric_value, self.volume_currency)
+            self._position += fast_position(
+                self.db,
+                volume_currency=self.volume_currency,
+                actor=self.actor,
+                after_trade_id=checkpoint_trade_id,
+            )
+        else:
+            self._position = fast_position(
+                self.db,
+                volume_currency=self.volume_currency,
+                actor=self.actor,
+            )
+
+    def apply(self, actor, position_change):
+        """
+        Add the volume currency component of an order's position change, as returned by
+        Order.was_eaten or Order.was_partially_eaten, if the order is the tracker's.
+        Nothing needs to be done until the tracker is seeded, since seeding reads the
+        trades from the database.
+        """
+        if actor != self.actor or self._position is None:
+            return
+
+        self._position += position_change[self.volume_currency]
+
+    def reconcile(self):
+        """
+        Compare the tracked position against fast_position and reset it if they differ.
+        Returns the drift (database position minus tracked position).
+        """
+        trade_id = self.last_trade_id()
+
+        db_position = fast_position(
+            self.db,
+            volume_currency=self.volume_currency,
+            actor=self.actor,
+        )
+
+        zero = Money('0', self.volume_currency)
+        drift = zero
+
+        if self._position is not None:
+            drift = db_position - self._position
+
+        if drift != zero:
+            logger.info('Tracked position for %s was off by %s, resetting to %s' % (
+                self.actor,
+                drift,
+                db_position,
+            ))
+
+        self._position = db_position
+        self.checkpoint(trade_id)
+
+        return drift
+
+    def latest_checkpoint(self):
+        return self.db.query(Datum)\
+            .filter(Datum.datum_type == self.checkpoint_datum_type)\
+            .order_by(Datum.time_created.desc())\
+            .first()
+
+    def last_trade_id(self):
+        return self.db.query(func.max(Trade.trade_id))\
+            .join(Order)\
+            .filter(Order.actor == self.actor)\
+            .scalar()
+
+    def checkpoint(self, trade_id):
+        """
+        Record the tracked position as of trade_id, the last of the strategy's trades
+        it includes.
+        """
+        datum = Datum(
+            self.checkpoint_datum_type,
+            numeric_value=self._position.amount,
+            meta_data={'trade_id': trade_id},
+        )
+
+        self.db.add(datum)
+        commit_mysql_session(self.db)
+
+
 def cached_multi_position(db):
     """
     Get the multi strategy's position quickly by summing the cached multi position of
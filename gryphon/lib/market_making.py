@@ -41,10 +41,13 @@ def simple_position_responsive_sizing(max_position, current_position):
     return bid_volume, ask_volume
 
 
-def fuzzy_difference(self, old, new, diff=Money('0.01', 'USD')):
+def fuzzy_difference(self, old, new, diff=Money('0.01', 'USD'), fx_snapshot=None):
     assert(old.currency == new.currency)
 
-    diff = diff.to(old.currency)
+    if fx_snapshot is None:
+        fx_snapshot = getattr(self, 'fx_snapshot', None)
+
+    diff = diff.to(old.currency, fx_snapshot=fx_snapshot)
 
     return diff < abs(old - new)
 
@@ -4,11 +4,15 @@ useful in a variety of ways and places.
 """
 
 
+from gryphon.lib.array_orderbook import ArrayOrderbook
 from gryphon.lib.money import Money
 from gryphon.lib.exchange.consts import Consts
 
 
 def price_quote_from_orderbook(order_book, mode, volume):
+    if isinstance(order_book, ArrayOrderbook):
+        return _price_quote_from_array_orderbook(order_book, mode, volume)
+
     if mode == Consts.BID:
         orders = order_book.get('asks', [])
     elif mode == Consts.ASK:
@@ -55,3 +59,38 @@ def price_quote_from_orderbook(order_book, mode, volume):
 
     return response
 
+
+def _price_quote_from_array_orderbook(order_book, mode, volume):
+    """
+    The same quote as above, using the orderbook's cumulative volume and price arrays
+    to find the last level the order reaches with a binary search.
+    """
+    side = order_book.side_for_mode(mode)
+    orders = order_book['asks'] if mode == Consts.BID else order_book['bids']
+
+    if not isinstance(volume, Money):
+        raise ValueError('Volume must be a Money() object')
+
+    if not orders:
+        raise Exception('no orders on one side of the book.')
+
+    if volume.currency != orders[0].volume.currency:
+        raise ValueError('Volume currency does not match orderbook currency! %s != %s' % (
+            volume.currency,
+            orders[0].volume.currency,
+        ))
+
+    quote = side.price_quote(volume.amount)
+
+    if quote is None:
+        raise Exception('not enough liquidity for a %s %s' % (volume, mode))
+
+    total_price, last_price = quote
+    price_currency = orders[0].price.currency
+
+    response = {
+        'total_price': Money(total_price, price_currency),
+        'price_for_order': Money(last_price, price_currency),
+    }
+
+    return response
@@ -3,6 +3,7 @@ These function calculate the volume available to buy/sell at a given price point
 orderbook. Another phrase for this would be "orderbook levels".
 """
 
+from gryphon.lib.array_orderbook import ArrayOrderbook
 from gryphon.lib.money import Money
 from gryphon.lib.exchange.consts import Consts
 
@@ -23,6 +24,11 @@ def volume_available_at_price(mode, price, orderbook):
     if not orders:
         raise Exception('no orders on one side of the book.')
 
+    if isinstance(orderbook, ArrayOrderbook):
+        side = orderbook.side_for_mode(mode)
+
+        return Money(side.volume_at_price(price.amount), orders[0].volume.currency)
+
     volume_available = Money('0', 'BTC')
 
     for order in orders:
@@ -60,6 +66,17 @@ def volume_available_at_prices(mode, prices, orderbook):
     if not orders:
         raise Exception('no orders on one side of the book.')
 
+    # Each price is a binary search on an ArrayOrderbook, so there's no need for the
+    # merge below.
+    if isinstance(orderbook, ArrayOrderbook):
+        side = orderbook.side_for_mode(mode)
+        volume_currency = orders[0].volume.currency
+
+        return {
+            price.amount: Money(side.volume_at_price(price.amount), volume_currency)
+            for price in prices
+        }
+
     volume_available = Money('0', 'BTC')
     levels = {}
     i = 0
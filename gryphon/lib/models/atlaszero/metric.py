@@ -1,16 +1,23 @@
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
+import os
 
 import numpy as np
 import pandas as pd
 from sqlalchemy.dialects.mysql import DATETIME
-from sqlalchemy import Column, Integer, Numeric, Index, DateTime
+from sqlalchemy import Column, Integer, Numeric, Index, DateTime, select
 
-from metric_types import get_metric_type_int
+from metric_types import get_metric_type_int, get_metric_type_ints
 from base import AtlasZeroBase
 
 metadata = AtlasZeroBase.metadata
 
+FETCH_SIZE = 10000  # Rows.
+
+# Metrics can still be written for recent times (e.g. the series generator catching up
+# after an outage), so the on-disk cache never covers anything newer than this.
+CACHE_SETTLE_TIME = timedelta(days=1)
+
 
 class MetricException(Exception):
     pass
@@ -18,7 +25,9 @@ class MetricException(Exception):
 
 class Metric(AtlasZeroBase):
     __tablename__ = 'metric'
-    __table_args__ = (Index('idx_metric_type_timestamp', 'metric_type', 'timestamp'), )
+    __table_args__ = (
+        Index('idx_metric_type_timestamp', 'metric_type', 'timestamp', unique=True),
+    )
 
     metric_id = Column(Integer, primary_key=True)
     timestamp = Column(DATETIME(fsp=6), nullable=False)
@@ -47,12 +56,55 @@ class Metric(AtlasZeroBase):
         return json.dumps(d, ensure_ascii=False)
 
     @classmethod
-    def get_as_pandas_by_series_id(cls, db, series_id):
-        raw_series = db.query(Metric).filter(Metric.metric_type == series_id).all()
+    def get_as_pandas_by_series_id(cls, db, series_id, start_time=None, end_time=None):
+        """
+        One series as a pd.Series of floats indexed by timestamp, optionally limited to
+        [start_time, end_time).
+        """
+        metric_type = get_metric_type_int(series_id)
 
-        pd_series = cls.convert_metric_series_to_pandas(raw_series)
+        arrays = read_metric_arrays(db, [metric_type], start_time, end_time)
+        timestamps, values = arrays[metric_type]
 
-        return pd_series
+        return pd.Series(values, index=pd.DatetimeIndex(timestamps))
+
+    @classmethod
+    def get_as_pandas(cls, db, metric_types, start_time=None, end_time=None, cache_dir=None):
+        """
+        Several series as a DataFrame indexed by timestamp, with a column of floats for
+        each of metric_types (names or ints, which are used as the column labels),
+        optionally limited to [start_time, end_time).
+
+        With a cache_dir, each series is kept on disk along with the range we've
+        fetched for it, and later calls only query the database for the parts of their
+        range that aren't cached yet. The last CACHE_SETTLE_TIME is never cached, but
+        older metrics are assumed not to change.
+        """
+        metric_type_ints = get_metric_type_ints(metric_types)
+
+        if cache_dir:
+            arrays = {
+                metric_type: cached_metric_arrays(
+                    db,
+                    metric_type,
+                    start_time,
+                    end_time,
+                    cache_dir,
+                )
+                for metric_type in metric_type_ints
+            }
+        else:
+            arrays = read_metric_arrays(db, metric_type_ints, start_time, end_time)
+
+        columns = {}
+
+        for label, metric_type in zip(metric_types, metric_type_ints):
+            timestamps, values = arrays[metric_type]
+            series = pd.Series(values, index=pd.DatetimeIndex(timestamps))
+
+            columns[label] = series[~series.index.duplicated(keep='last')]
+
+        return pd.DataFrame(columns, columns=metric_types)
 
     @classmethod
     def convert_metric_series_to_pandas(cls, metric_series):
@@ -62,3 +114,161 @@ class Metric(AtlasZeroBase):
         values = [float(m.value) if m.value is not None else np.nan for m in metric_series]
 
         return pd.Series(values, index=index)
+
+
+def read_metric_arrays(db, metric_types, start_time=None, end_time=None):
+    """
+    Reads the metrics for the metric_type ints in [start_time, end_time) with one query
+    along idx_metric_type_timestamp, fetching FETCH_SIZE rows at a time.
+
+    Returns a dict of metric_type -> (timestamps, values) arrays in time order, with NaN
+    for null values.
+    """
+    query = select([Metric.metric_type, Metric.timestamp, Metric.value])\
+        .where(Metric.metric_type.in_(metric_types))
+
+    if start_time is not None:
+        query = query.where(Metric.timestamp >= start_time)
+
+    if end_time is not None:
+        query = query.where(Metric.timestamp < end_time)
+
+    query = query.order_by(Metric.metric_type, Metric.timestamp)
+
+    result = db.execute(query)
+
+    type_chunks = []
+    timestamp_chunks = []
+    value_chunks = []
+
+    while True:
+        rows = result.fetchmany(FETCH_SIZE)
+
+        if not rows:
+            break
+
+        chunk_types, chunk_timestamps, chunk_values = zip(*rows)
+
+        type_chunks.append(np.array(chunk_types, dtype=np.int64))
+        timestamp_chunks.append(np.array(chunk_timestamps, dtype='datetime64[us]'))
+        value_chunks.append(np.array(chunk_values, dtype=np.float64))
+
+    result.close()
+
+    arrays = {
+        metric_type: (np.array([], dtype='datetime64[us]'), np.array([]))
+        for metric_type in metric_types
+    }
+
+    if not type_chunks:
+        return arrays
+
+    types = np.concatenate(type_chunks)
+    timestamps = np.concatenate(timestamp_chunks)
+    values = np.concatenate(value_chunks)
+
+    # The rows are sorted by metric_type, so each series is one contiguous run.
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(types)) + 1])
+    ends = np.concatenate([starts[1:], [len(types)]])
+
+    for start, end in zip(starts, ends):
+        arrays[int(types[start])] = (timestamps[start:end], values[start:end])
+
+    return arrays
+
+
+def cached_metric_arrays(db, metric_type, start_time, end_time, cache_dir):
+    """
+    The same as read_metric_arrays for a single metric_type, going through the on-disk
+    cache. A range that's open at the end only goes up to now. Only the part of the
+    range older than CACHE_SETTLE_TIME is cached, and the rest is read from the
+    database every time, so metrics written late for a recent time are picked up.
+    """
+    now = datetime.utcnow()
+
+    if end_time is None:
+        end_time = now
+
+    settled_end = min(end_time, now - CACHE_SETTLE_TIME)
+
+    if start_time is not None and start_time >= settled_end:
+        return read_metric_arrays(db, [metric_type], start_time, end_time)[metric_type]
+
+    cache_path = os.path.join(cache_dir, 'metric_%s.pkl' % metric_type)
+
+    if os.path.exists(cache_path):
+        cached = pd.read_pickle(cache_path)
+    else:
+        cached = None
+
+    if cached is None:
+        cached_start, cached_end = start_time, settled_end
+        timestamps, values = read_metric_arrays(
+            db,
+            [metric_type],
+            start_time,
+            settled_end,
+        )[metric_type]
+    else:
+        cached_start, cached_end = cached['start_time'], cached['end_time']
+        timestamps, values = cached['timestamps'], cached['values']
+
+        # None is unbounded, so it comes before any start time.
+        if cached_start is not None and (start_time is None or start_time < cached_start):
+            earlier_timestamps, earlier_values = read_metric_arrays(
+                db,
+                [metric_type],
+                start_time,
+                cached_start,
+            )[metric_type]
+
+            timestamps = np.concatenate([earlier_timestamps, timestamps])
+            values = np.concatenate([earlier_values, values])
+            cached_start = start_time
+
+        if settled_end > cached_end:
+            later_timestamps, later_values = read_metric_arrays(
+                db,
+                [metric_type],
+                cached_end,
+                settled_end,
+            )[metric_type]
+
+            timestamps = np.concatenate([timestamps, later_timestamps])
+            values = np.concatenate([values, later_values])
+            cached_end = settled_end
+
+    if cached is None or (cached_start, cached_end) != (
+            cached['start_time'], cached['end_time']):
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+
+        # Write to a temporary file first so a crash can't leave a partial cache.
+        tmp_path = cache_path + '.tmp'
+
+        pd.to_pickle({
+            'start_time': cached_start,
+            'end_time': cached_end,
+            'timestamps': timestamps,
+            'values': values,
+        }, tmp_path)
+
+        os.rename(tmp_path, cache_path)
+
+    if end_time > cached_end:
+        recent_timestamps, recent_values = read_metric_arrays(
+            db,
+            [metric_type],
+            cached_end,
+            end_time,
+        )[metric_type]
+
+        timestamps = np.concatenate([timestamps, recent_timestamps])
+        values = np.concatenate([values, recent_values])
+
+    in_range = timestamps < np.datetime64(end_time)
+
+    if start_time is not None:
+        in_range &= timestamps >= np.datetime64(start_time)
+
+    return timestamps[in_range], values[in_range]
@@ -5510,17 +5510,66 @@ def test_metric_type_completeness():
     assert set(complete_range) - set(vals) == set()
 
 
-def get_metric_type_int(metric_type):
+def build_metric_type_names(types_map):
+    """
+    The reverse of types_map, from metric type ints to their names. Raises a
+    MetricTypeException if two names share an int.
+    """
+    names = {}
+
+    for name, metric_type in types_map.iteritems():
+        if metric_type in names:
+            raise MetricTypeException('Metric type %s is used by both %s and %s' % (
+                metric_type,
+                names[metric_type],
+                name,
+            ))
+
+        names[metric_type] = name
 
-    test_metric_type_uniqueness()
+    return names
 
-    if metric_type in metric_types_map.values():
+
+# The registry is checked once, here, rather than on every lookup.
+metric_type_names = build_metric_type_names(metric_types_map)
+metric_type_ints = frozenset(metric_type_names)
+
+
+def get_metric_type_int(metric_type):
+    """
+    Resolve a metric type given by name or by int to its int.
+    """
+    if metric_type in metric_type_ints:
         return metric_type
-    elif metric_type in metric_types_map:
+
+    try:
         return metric_types_map[metric_type]
-    else:
+    except KeyError:
         raise MetricTypeException('Metric type is not in the dictionary')
 
+
+def get_metric_type_ints(metric_types):
+    """
+    Resolve many metric types at once for batch writers, raising a MetricTypeException
+    that lists every unknown type if there are any.
+    """
+    resolved_types = []
+    unknown_types = []
+
+    for metric_type in metric_types:
+        try:
+            resolved_types.append(get_metric_type_int(metric_type))
+        except MetricTypeException:
+            unknown_types.append(metric_type)
+
+    if unknown_types:
+        raise MetricTypeException(
+            'Metric types are not in the dictionary: %s' % unknown_types,
+        )
+
+    return resolved_types
+
+
 def generate_initial_series_name_list():
     count = 3
 
@@ -7,7 +7,7 @@ import uuid
 from decimal import *
 
 from gryphon.lib import gryphon_json_serialize
-from gryphon.lib.exchange.exchange_factory import make_exchange_from_key
+from gryphon.lib.exchange.exchange_factory import shared_exchange_from_key
 from gryphon.lib.exchange.consts import Consts
 from gryphon.lib.money import Money
 
@@ -66,7 +66,7 @@ class BasicOrder(object):
         if hasattr(self, '_exchange'):
             return self._exchange
         elif self._exchange_name:
-            self._exchange = make_exchange_from_key(self._exchange_name)
+            self._exchange = shared_exchange_from_key(self._exchange_name)
             return self._exchange
         else:
             return None
@@ -6,12 +6,17 @@ import uuid
 from cdecimal import Decimal
 from sqlalchemy import ForeignKey, Column, Integer, Unicode, DateTime, UnicodeText, Numeric
 
+from gryphon.lib.logger import get_logger
 from gryphon.lib.models.base import Base
 from gryphon.lib.session import commit_mysql_session
 from gryphon.lib.singleton import Singleton
 
+logger = get_logger(__name__)
+
 metadata = Base.metadata
 
+DEFAULT_MAX_QUEUE_SIZE = 1000
+
 
 class Datum(Base):
     __tablename__ = 'datum'
@@ -53,13 +58,31 @@ class Datum(Base):
 
 
 class DatumRecorder(object):
+    """
+    Records datums to the database, or to an external logger.
+
+    By default every datum is committed as soon as it's recorded. With buffered=True,
+    datums are queued instead and written in one bulk insert by flush(), which the
+    caller is responsible for calling (e.g. the live runner does so at the end of every
+    tick and on shutdown). If the queue reaches max_queue_size the recorder flushes
+    immediately, and backpressure_count is incremented. Datums lost to a failed flush
+    are counted in dropped_count. A failed backpressure flush is logged rather than
+    raised, since it happens inside whatever code recorded the datum. drain_counts()
+    returns both counters for reporting.
+    """
     __metaclass__ = Singleton
 
-    def create(self, db=None, logger=None):
+    def create(self, db=None, logger=None, buffered=False, max_queue_size=DEFAULT_MAX_QUEUE_SIZE):
         self.db = db
         self.external_logger = logger
         self.data_for_mean = defaultdict(list)
 
+        self.buffered = buffered
+        self.max_queue_size = max_queue_size
+        self.queue = []
+        self.backpressure_count = 0
+        self.dropped_count = 0
+
     def record(self, datum_type, numeric_value=None, string_value=None, meta_data={}, order=None):
         datum = Datum(
             datum_type,
@@ -73,14 +96,57 @@ class DatumRecorder(object):
             raise Exception('DatumRecorder must be created before you can record')
 
         if self.db:
-            self.db.add(datum)
-            commit_mysql_session(self.db)
+            # Datums attached to an order have to go through the ORM to get their
+            # order_id, so they aren't buffered.
+            if self.buffered and order is None:
+                self.queue.append(datum)
+
+                if len(self.queue) >= self.max_queue_size:
+                    self.backpressure_count += 1
+
+                    try:
+                        self.flush()
+                    except Exception:
+                        logger.exception('Backpressure flush of the datum queue failed')
+            else:
+                self.db.add(datum)
+                commit_mysql_session(self.db)
         elif self.external_logger:
             self.external_logger.info(datum)
         else:
             # we aren't recording events.
             pass
 
+    def flush(self):
+        """
+        Write all queued datums in a single bulk insert. Safe to call when nothing is
+        queued, or when the recorder isn't buffered.
+        """
+        if not getattr(self, 'queue', None):
+            return
+
+        datums = self.queue
+        self.queue = []
+
+        try:
+            self.db.bulk_save_objects(datums)
+            commit_mysql_session(self.db)
+        except Exception:
+            self.dropped_count += len(datums)
+            raise
+
+    def drain_counts(self):
+        """
+        Returns the backpressure and dropped counts since the last drain and resets
+        them.
+        """
+        counts = self.backpressure_count, self.dropped_count
+
+        self.backpressure_count = 0
+        self.dropped_count = 0
+
+        return counts
+
     def record_mean(self, datum_type, numeric_value, sample_size):
         """
         Store a datum with the mean of every <sample_size> data points.
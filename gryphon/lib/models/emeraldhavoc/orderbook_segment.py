@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+A run of consecutive orderbooks for one exchange, stored as a keyframe and per-level
+deltas in the binary format from gryphon.lib.orderbook_history. This is the columnar
+alternative to storing every book as JSON in the orderbook table.
+"""
+from datetime import datetime
+import uuid
+
+from sqlalchemy import Column, DateTime, Index, Integer, LargeBinary, Unicode
+from sqlalchemy.dialects.mysql import DATETIME
+
+from gryphon.lib.models.emeraldhavoc.base import EmeraldHavocBase
+
+metadata = EmeraldHavocBase.metadata
+
+
+class OrderbookSegment(EmeraldHavocBase):
+    __tablename__ = 'orderbook_segment'
+
+    orderbook_segment_id = Column(Integer, primary_key=True)
+    unique_id = Column(Unicode(64), nullable=False)
+    time_created = Column(DateTime, nullable=False)
+
+    exchange = Column(Unicode(64), nullable=False)
+    # Books are often less than a second apart, so the bounds keep microseconds.
+    start_time = Column(DATETIME(fsp=6), nullable=False)
+    end_time = Column(DATETIME(fsp=6), nullable=False)
+    book_count = Column(Integer, nullable=False)
+    data = Column(LargeBinary(length=2**31), nullable=False)
+
+    __table_args__ = (
+        Index('idx_exchange_start_time', 'exchange', 'start_time'),
+        Index('idx_exchange_end_time', 'exchange', 'end_time'),
+    )
+
+    def __init__(self, exchange, start_time, end_time, book_count, data):
+        self.unique_id = unicode(uuid.uuid4().hex)
+        self.time_created = datetime.utcnow()
+        self.exchange = exchange
+        self.start_time = start_time
+        self.end_time = end_time
+        self.book_count = book_count
+        self.data = data
+
+    def __unicode__(self):
+        return u'[ORDERBOOK SEGMENT - %s] %s books from %s to %s' % (
+            self.exchange,
+            self.book_count,
+            self.start_time,
+            self.end_time,
+        )
+
+    def __repr__(self):
+        return self.__unicode__().encode('utf-8')
@@ -11,10 +11,12 @@ from sqlalchemy.ext.mutable import Mutable
 from sqlalchemy.orm import relationship, reconstructor, Session
 from sqlalchemy.types import TypeDecorator, UnicodeText
 
+from gryphon.lib import deposit_matching
 from gryphon.lib import gryphon_json_serialize
-from gryphon.lib.exchange.exchange_factory import make_exchange_from_key
+from gryphon.lib.exchange.exchange_factory import shared_exchange_from_key
 from gryphon.lib.logger import get_logger
 from gryphon.lib.models.base import Base
+from gryphon.lib.models.datum import DatumRecorder
 from gryphon.lib.models.order import Order
 from gryphon.lib.models.trade import Trade
 from gryphon.lib.models.transaction import Transaction
@@ -219,7 +221,7 @@ class Exchange(Base):
                 transaction_details.update({'exchange_rate': exchange_rate})
 
         withdrawal_fee = None
-        source_exchange = make_exchange_from_key(self.name)
+        source_exchange = shared_exchange_from_key(self.name)
         # We don't have exchange objects for bank accounts (BMO_USD, BMO_CAD)
         if source_exchange:
             withdrawal_fee = source_exchange.fiat_withdrawal_fee(withdrawal_amount)
@@ -233,7 +235,7 @@ class Exchange(Base):
             deposit_amount = withdrawal_amount
 
         deposit_fee = None
-        target_exchange = make_exchange_from_key(target_exchange_data.name)
+        target_exchange = shared_exchange_from_key(target_exchange_data.name)
         if target_exchange:
             deposit_fee = target_exchange.fiat_deposit_fee(deposit_amount)
 
@@ -250,7 +252,7 @@ class Exchange(Base):
         if exchange_withdrawal_id:
             details['exchange_withdrawal_id'] = exchange_withdrawal_id
 
-        exchange = make_exchange_from_key(self.name)
+        exchange = shared_exchange_from_key(self.name)
         withdrawal_fee = exchange.withdrawal_fee
         deposit = Transaction(Transaction.DEPOSIT, Transaction.IN_TRANSIT, amount, target_exchange_data, details)
         withdrawl = Transaction(Transaction.WITHDRAWL, Transaction.IN_TRANSIT, amount, self, details, fee=withdrawal_fee)
@@ -273,23 +275,54 @@ class Exchange(Base):
 
     def deposit_landed(self, amount_changed, tolerance=0):
         expected_deposits = self.pending_deposits(amount_changed.currency)
-        possible_combinations = self.combinations_of_all_lengths(expected_deposits)
-        for c in possible_combinations:
-            total_amount = 0
-            for deposit in c:
-                total_amount += deposit.amount
-                if deposit.fee:
-                    total_amount -= deposit.fee
-            # we found a combination of deposits which match the amount changed
-            # this should have a tolerance
-            if abs(total_amount - amount_changed) <= tolerance:
-                for deposit in c:
-                    deposit.complete()
-
-                deposit_ids = [int(d.transaction_id) for d in c]
-                logger.info('Deposits %s for %s match up to the %s change in balance' % (deposit_ids, total_amount, amount_changed))
-                return True
-        return False
+
+        net_amounts = []
+
+        for deposit in expected_deposits:
+            net_amount = deposit.amount
+
+            if deposit.fee:
+                net_amount -= deposit.fee
+
+            net_amounts.append(net_amount.amount)
+
+        # Finds the same combination as trying all combinations_of_all_lengths in
+        # order, but without enumerating them.
+        match, stats = deposit_matching.find_matching_subset(
+            net_amounts,
+            amount_changed.amount,
+            tolerance.amount if isinstance(tolerance, Money) else tolerance,
+        )
+
+        DatumRecorder().record(
+            'DEPOSIT_MATCH_TIME_%s' % self.name.upper(),
+            numeric_value=stats.elapsed,
+            meta_data={
+                'pending_deposits': len(expected_deposits),
+                'nodes': stats.nodes,
+                'budget_exceeded': stats.budget_exceeded,
+            },
+        )
+
+        if stats.budget_exceeded:
+            logger.info('Gave up matching %s pending deposits to %s after %s' % (
+                len(expected_deposits),
+                amount_changed,
+                stats,
+            ))
+
+        if match is None:
+            return False
+
+        c = [expected_deposits[i] for i in match]
+        total_amount = Money(sum(net_amounts[i] for i in match), amount_changed.currency)
+
+        for deposit in c:
+            deposit.complete()
+
+        deposit_ids = [int(d.transaction_id) for d in c]
+        logger.info('Deposits %s for %s match up to the %s change in balance' % (deposit_ids, total_amount, amount_changed))
+        return True
 
     @property
     def full_balance(self):
@@ -411,7 +444,7 @@ class Exchange(Base):
         else:
             return [self.name]
 
-    def ledger_balance(self, start_time=None, end_time=None, include_pending=False):
+    def ledger_balance(self, start_time=None, end_time=None, include_pending=False, use_checkpoints=False):
         from gryphon.lib import assets
         session = Session.object_session(self)
 
@@ -421,4 +454,5 @@ class Exchange(Base):
             end_time=end_time,
             include_pending=include_pending,
             exchange_names=self.all_pair_names,
+            use_checkpoints=use_checkpoints,
         )
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+A materialised ledger balance for one exchange account at a point in time, usually
+midnight at the end of a day.
+
+assets.ledger_balance(..., use_checkpoints=True) starts from the most recent checkpoint
+before the time it's asked about, and only aggregates the trades and transactions after
+it. A checkpoint is only correct as long as nothing is added to the ledger before its
+checkpoint_time afterwards, so only checkpoint days that are fully settled.
+The ledger_checkpoints script writes them once a day for every initialized ledger.
+"""
+from datetime import datetime
+import json
+import uuid
+
+from sqlalchemy import Boolean, Column, DateTime, Integer, Unicode
+
+from gryphon.lib.models.base import Base
+from gryphon.lib.models.exchange import JSONEncodedMoneyDict, Position
+
+metadata = Base.metadata
+
+
+class LedgerCheckpoint(Base):
+    __tablename__ = 'ledger_checkpoint'
+
+    ledger_checkpoint_id = Column(Integer, primary_key=True)
+    unique_id = Column(Unicode(64), nullable=False)
+    time_created = Column(DateTime, nullable=False)
+
+    exchange_name = Column(Unicode(64), nullable=False)
+    checkpoint_time = Column(DateTime, nullable=False, index=True)
+    include_pending = Column(Boolean, nullable=False)
+    balance = Column(Position.as_mutable(JSONEncodedMoneyDict))
+
+    def __init__(self, exchange_name, checkpoint_time, balance, include_pending=False):
+        self.unique_id = u'lcp_%s' % unicode(uuid.uuid4().hex)
+        self.time_created = datetime.utcnow()
+        self.exchange_name = exchange_name
+        self.checkpoint_time = checkpoint_time
+        self.balance = balance
+        self.include_pending = include_pending
+
+    def __unicode__(self):
+        return unicode(repr(self))
+
+    def __repr__(self):
+        return json.dumps({
+            'exchange_name': self.exchange_name,
+            'checkpoint_time': unicode(self.checkpoint_time),
+            'include_pending': self.include_pending,
+            'balance': {c: unicode(m.amount) for c, m in self.balance.iteritems()},
+        })
+
+    @classmethod
+    def nearest(cls, db, exchange_name, end_time=None, include_pending=False):
+        """
+        The latest checkpoint for exchange_name at or before end_time, or None.
+        """
+        query = db.query(cls)\
+            .filter(cls.exchange_name == exchange_name)\
+            .filter(cls.include_pending == include_pending)
+
+        if end_time:
+            query = query.filter(cls.checkpoint_time <= end_time)
+
+        return query.order_by(cls.checkpoint_time.desc()).first()
@@ -13,7 +13,7 @@ from sqlalchemy.ext.declarative import declarative_base
 
 from gryphon.lib.money import Money
 from gryphon.lib import gryphon_json_serialize
-from gryphon.lib.exchange.exchange_factory import make_exchange_from_key
+from gryphon.lib.exchange.exchange_factory import shared_exchange_from_key
 from gryphon.lib.models.base import Base
 from gryphon.lib.models.basic_order import BasicOrder
 from gryphon.lib.models.datum import Datum
@@ -150,7 +150,7 @@ class Order(Base, BasicOrder):
         if hasattr(self, '_exchange'):
             return self._exchange
         elif self._exchange_name:
-            self._exchange = make_exchange_from_key(self._exchange_name)
+            self._exchange = shared_exchange_from_key(self._exchange_name)
             return self._exchange
         else:
             return None
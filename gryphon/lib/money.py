@@ -68,8 +68,11 @@ class Money(super_money.Money):
     def to_json(self):
         return repr(self)
 
-    def to(self, currency, date=None, exchange_rate_to_usd=None):
-        """Return equivalent money object in another currency from a specific date"""
+    def to(self, currency, date=None, exchange_rate_to_usd=None, fx_snapshot=None):
+        """
+        Return equivalent money object in another currency from a specific date. If an
+        FXSnapshot is given, its rates are used instead.
+        """
         if currency == self.currency:
             return self
 
@@ -83,6 +86,10 @@ class Money(super_money.Money):
             usd_amount = self.amount * exchange_rate_to_usd
             return self.__class__(usd_amount, "USD")
 
+        if fx_snapshot:
+            amount = self.amount * fx_snapshot.cross_rate(self.currency, currency)
+            return self.__class__(amount, currency)
+
         if date:
             a = USDCurrencyConverter.historical_rate(self.currency, date)
             b = USDCurrencyConverter.historical_rate(currency, date)
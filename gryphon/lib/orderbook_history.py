@@ -0,0 +1,515 @@
+"""
+A compact store for orderbook history, as an alternative to the GDS orderbook table's
+JSON blobs.
+
+Consecutive books for an exchange are grouped into segments (OrderbookSegment rows).
+A segment holds the first book in full as a keyframe, and every book after that as
+just the levels that changed since the book before it, with a volume of zero for a
+level that went away. Segments are closed after KEYFRAME_INTERVAL books, and never
+span a PARTITION_SECONDS boundary, so every segment belongs to one exchange and one
+time partition and a lookup never has to replay more than one segment.
+
+A segment's data is a small header followed by a zlib-compressed body of columns.
+Prices and volumes are fixed-point int64s, scaled like the packed orderbooks in
+gryphon.lib.packed_orderbook:
+
+    header: magic 'GOS', version (uint8), price_scale (uint8), volume_scale (uint8),
+            book_count (uint32), keyframe_bid_depth (uint32),
+            keyframe_ask_depth (uint32), change_count (uint32)
+    body:   timestamps (float64, one per book),
+            change counts (uint32, one per book after the keyframe),
+            keyframe bid prices, bid volumes, ask prices, ask volumes (int64),
+            change sides (uint8, 0 for bids and 1 for asks),
+            change prices, change volumes (int64)
+
+The newest segment for an exchange stays open until it is full, and new books are
+appended to it in place. A book that arrives late goes into the segment covering its
+time, so an exchange's segments never overlap. Writers keep nothing in memory between writes, so a book is
+stored as soon as the transaction it was written in commits, and a rolled back write
+leaves the segments as they were.
+
+Books are normalised before they are stored: levels at the same price are merged,
+empty levels are dropped and each side is sorted best first. Books come back as
+HistoricalOrderbooks, whose bids and asks are lists of [price, volume] Decimals like
+the orderbook table's.
+"""
+
+import bisect
+from collections import namedtuple
+import calendar
+from datetime import datetime
+import struct
+import zlib
+
+from cdecimal import Decimal
+import pytz
+
+from gryphon.lib import packed_orderbook
+from gryphon.lib.models.emeraldhavoc.orderbook_segment import OrderbookSegment
+
+MAGIC = 'GOS'
+VERSION = 1
+
+HEADER = struct.Struct('<3sBBBIIII')
+
+KEYFRAME_INTERVAL = 100  # Books.
+PARTITION_SECONDS = 3600
+
+BID = 0
+ASK = 1
+
+HistoricalOrderbook = namedtuple(
+    'HistoricalOrderbook',
+    ['exchange', 'timestamp', 'bids', 'asks'],
+)
+
+
+class OrderbookHistoryException(Exception):
+    pass
+
+
+class OrderbookHistoryWriter(object):
+    """
+    Appends books to an exchange's segments. Everything goes through db without a
+    commit, so the books are stored, or rolled back, with the caller's transaction.
+    """
+
+    def __init__(self, keyframe_interval=KEYFRAME_INTERVAL, partition_seconds=PARTITION_SECONDS):
+        self.keyframe_interval = keyframe_interval
+        self.partition_seconds = partition_seconds
+
+    def write(self, db, exchange, books):
+        """
+        books is a list of (timestamp, orderbook) pairs. timestamp is a unix timestamp
+        and orderbook is in the format the pollers publish,
+        {'bids': [[price, volume, ...], ...], 'asks': [...]}.
+        """
+        if not books:
+            return
+
+        books = sorted(
+            [normalise_book(timestamp, orderbook) for timestamp, orderbook in books],
+            key=lambda book: book[0],
+        )
+
+        newest = self.latest_segments(db, exchange).first()
+        late_books = []
+
+        if newest is not None:
+            newest_end = _microseconds(_epoch(newest.end_time))
+
+            late_books = [b for b in books if _microseconds(b[0]) < newest_end]
+            books = [b for b in books if _microseconds(b[0]) >= newest_end]
+
+        if books:
+            segment_id, segment_books = self.open_segment(db, newest, books[0])
+
+            for book in books:
+                if segment_books and not self.can_append(segment_books, book):
+                    write_segment(db, exchange, segment_id, segment_books)
+                    segment_id, segment_books = None, []
+
+                segment_books.append(book)
+
+            write_segment(db, exchange, segment_id, segment_books)
+
+        for book in late_books:
+            self.write_late_book(db, exchange, book)
+
+    def latest_segments(self, db, exchange):
+        """
+        A query for the bounds of exchange's segments, newest first. Segments never
+        overlap, so that's the same order whether we go by start or end time.
+        """
+        return db.query(
+                OrderbookSegment.orderbook_segment_id,
+                OrderbookSegment.start_time,
+                OrderbookSegment.end_time,
+                OrderbookSegment.book_count,
+            )\
+            .filter(OrderbookSegment.exchange == exchange)\
+            .order_by(
+                OrderbookSegment.start_time.desc(),
+                OrderbookSegment.orderbook_segment_id.desc(),
+            )
+
+    def open_segment(self, db, segment, book):
+        """
+        The id and books of segment, the exchange's newest, if book can be appended to
+        it, otherwise (None, []).
+        """
+        if (segment is None
+                or segment.book_count >= self.keyframe_interval
+                or self.partition(_epoch(segment.start_time)) != self.partition(book[0])):
+            return None, []
+
+        segment_books = segment_books_by_id(db, segment.orderbook_segment_id)
+
+        if not self.can_append(segment_books, book):
+            return None, []
+
+        return segment.orderbook_segment_id, segment_books
+
+    def write_late_book(self, db, exchange, book):
+        """
+        Write a book that's older than the exchange's newest stored book into the
+        segment that covers its time, so that segments never overlap. A book that falls
+        in a gap between segments goes on the end of the one before the gap if it has
+        room, otherwise into a segment of its own. Late books can take a segment past
+        keyframe_interval.
+        """
+        timestamp = _datetime(book[0])
+
+        segment = self.latest_segments(db, exchange)\
+            .filter(OrderbookSegment.start_time <= timestamp)\
+            .first()
+
+        if segment is None or (timestamp > segment.end_time and (
+                segment.book_count >= self.keyframe_interval
+                or self.partition(_epoch(segment.start_time)) != self.partition(book[0]))):
+            write_segment(db, exchange, None, [book])
+            return
+
+        segment_books = segment_books_by_id(db, segment.orderbook_segment_id)
+
+        # After any books with the same timestamp, so the keyframe stays first.
+        index = bisect.bisect_right(
+            [_microseconds(b[0]) for b in segment_books],
+            _microseconds(book[0]),
+        )
+
+        segment_books.insert(index, book)
+
+        write_segment(db, exchange, segment.orderbook_segment_id, segment_books)
+
+    def can_append(self, segment_books, book):
+        return (len(segment_books) < self.keyframe_interval
+            and self.partition(segment_books[0][0]) == self.partition(book[0])
+            and _microseconds(book[0]) >= _microseconds(segment_books[-1][0]))
+
+    def partition(self, timestamp):
+        return int(timestamp // self.partition_seconds)
+
+
+def segment_books_by_id(db, segment_id):
+    data = db.query(OrderbookSegment.data)\
+        .filter(OrderbookSegment.orderbook_segment_id == segment_id)\
+        .scalar()
+
+    return list(iter_segment_books(data))
+
+
+def write_segment(db, exchange, segment_id, books):
+    """
+    Insert a segment of books, or with a segment_id, replace that segment's books.
+    """
+    row = segment_row(exchange, books)
+    table = OrderbookSegment.__table__
+
+    if segment_id is None:
+        db.execute(table.insert().values(row))
+    else:
+        update = table.update()\
+            .where(table.c.orderbook_segment_id == segment_id)\
+            .values(
+                end_time=row['end_time'],
+                book_count=row['book_count'],
+                data=row['data'],
+            )
+
+        db.execute(update)
+
+
+def segment_row(exchange, books):
+    """Builds a row for an insert into the orderbook_segment table."""
+    segment = OrderbookSegment(
+        exchange,
+        _datetime(books[0][0]),
+        _datetime(books[-1][0]),
+        len(books),
+        encode_segment(books),
+    )
+
+    return {
+        'unique_id': segment.unique_id,
+        'time_created': segment.time_created,
+        'exchange': segment.exchange,
+        'start_time': segment.start_time,
+        'end_time': segment.end_time,
+        'book_count': segment.book_count,
+        'data': segment.data,
+    }
+
+
+def orderbook_at(db, exchange, timestamp):
+    """
+    The most recent book for exchange at or before timestamp, or None.
+    """
+    timestamp = _naive_utc(timestamp)
+
+    segment = db.query(OrderbookSegment)\
+        .filter(OrderbookSegment.exchange == exchange)\
+        .filter(OrderbookSegment.start_time <= timestamp)\
+        .order_by(OrderbookSegment.start_time.desc())\
+        .first()
+
+    if segment is None:
+        return None
+
+    target = _microseconds(_epoch(timestamp))
+    book = None
+
+    for candidate in iter_segment_books(segment.data):
+        if _microseconds(candidate[0]) > target:
+            break
+
+        book = candidate
+
+    return _historical_orderbook(exchange, book)
+
+
+def iter_orderbooks(db, exchange, start_time, end_time, segments_per_query=10):
+    """
+    Yields every book for exchange between start_time and end_time inclusive, oldest
+    first. Segments are loaded segments_per_query at a time, so this can stream
+    through long periods.
+    """
+    start_time = _naive_utc(start_time)
+    end_time = _naive_utc(end_time)
+
+    start = _microseconds(_epoch(start_time))
+    end = _microseconds(_epoch(end_time))
+
+    segments = db.query(OrderbookSegment)\
+        .filter(OrderbookSegment.exchange == exchange)\
+        .filter(OrderbookSegment.end_time >= start_time)\
+        .filter(OrderbookSegment.start_time <= end_time)\
+        .order_by(OrderbookSegment.start_time)\
+        .yield_per(segments_per_query)
+
+    for segment in segments:
+        for book in iter_segment_books(segment.data):
+            book_time = _microseconds(book[0])
+
+            if book_time > end:
+                break
+
+            if book_time >= start:
+                yield _historical_orderbook(exchange, book)
+
+
+def normalise_book(timestamp, orderbook):
+    return (
+        float(timestamp),
+        _normalise_side(orderbook['bids'], best_first_reverse=True),
+        _normalise_side(orderbook['asks'], best_first_reverse=False),
+    )
+
+
+def encode_segment(books):
+    """
+    Encode a list of normalised (timestamp, bids, asks) books.
+    """
+    levels = []
+
+    for timestamp, bids, asks in books:
+        levels.extend(bids)
+        levels.extend(asks)
+
+    price_scale = packed_orderbook._scale_for([price for price, volume in levels])
+    volume_scale = packed_orderbook._scale_for([volume for price, volume in levels])
+
+    def fixed_prices(side):
+        return [packed_orderbook._fixed_point(p, price_scale) for p, v in side]
+
+    def fixed_volumes(side):
+        return [packed_orderbook._fixed_point(v, volume_scale) for p, v in side]
+
+    timestamps = [book[0] for book in books]
+    keyframe_bids = books[0][1]
+    keyframe_asks = books[0][2]
+
+    change_counts = []
+    change_sides = []
+    change_prices = []
+    change_volumes = []
+
+    previous_bids = dict(keyframe_bids)
+    previous_asks = dict(keyframe_asks)
+
+    for timestamp, bids, asks in books[1:]:
+        current_bids = dict(bids)
+        current_asks = dict(asks)
+        count = 0
+
+        for side, previous, current in [
+                (BID, previous_bids, current_bids),
+                (ASK, previous_asks, current_asks)]:
+            for price, volume in current.iteritems():
+                if previous.get(price) != volume:
+                    change_sides.append(side)
+                    change_prices.append(price)
+                    change_volumes.append(volume)
+                    count += 1
+
+            for price in previous:
+                if price not in current:
+                    change_sides.append(side)
+                    change_prices.append(price)
+                    change_volumes.append(Decimal('0'))
+                    count += 1
+
+        change_counts.append(count)
+
+        previous_bids = current_bids
+        previous_asks = current_asks
+
+    header = HEADER.pack(
+        MAGIC,
+        VERSION,
+        price_scale,
+        volume_scale,
+        len(books),
+        len(keyframe_bids),
+        len(keyframe_asks),
+        len(change_sides),
+    )
+
+    body = ''.join([
+        _pack('d', timestamps),
+        _pack('I', change_counts),
+        _pack('q', fixed_prices(keyframe_bids)),
+        _pack('q', fixed_volumes(keyframe_bids)),
+        _pack('q', fixed_prices(keyframe_asks)),
+        _pack('q', fixed_volumes(keyframe_asks)),
+        _pack('B', change_sides),
+        _pack('q', [packed_orderbook._fixed_point(p, price_scale) for p in change_prices]),
+        _pack('q', [packed_orderbook._fixed_point(v, volume_scale) for v in change_volumes]),
+    ])
+
+    return header + zlib.compress(body)
+
+
+def iter_segment_books(data):
+    """
+    Yields the (timestamp, bids, asks) books in a segment, replaying its deltas on top
+    of the keyframe.
+    """
+    if len(data) < HEADER.size:
+        raise OrderbookHistoryException('Orderbook segment is too short')
+
+    (
+        magic,
+        version,
+        price_scale,
+        volume_scale,
+        book_count,
+        bid_depth,
+        ask_depth,
+        change_count,
+    ) = HEADER.unpack_from(data)
+
+    if magic != MAGIC or version != VERSION:
+        raise OrderbookHistoryException('Unrecognised orderbook segment header')
+
+    columns = _ColumnReader(zlib.decompress(data[HEADER.size:]))
+
+    timestamps = columns.read('d', book_count)
+    change_counts = columns.read('I', book_count - 1)
+    bid_prices = columns.read('q', bid_depth)
+    bid_volumes = columns.read('q', bid_depth)
+    ask_prices = columns.read('q', ask_depth)
+    ask_volumes = columns.read('q', ask_depth)
+    change_sides = columns.read('B', change_count)
+    change_prices = columns.read('q', change_count)
+    change_volumes = columns.read('q', change_count)
+
+    sides = [dict(zip(bid_prices, bid_volumes)), dict(zip(ask_prices, ask_volumes))]
+
+    def decoded_book(timestamp):
+        return (
+            timestamp,
+            _decode_side(sides[BID], price_scale, volume_scale, reverse=True),
+            _decode_side(sides[ASK], price_scale, volume_scale, reverse=False),
+        )
+
+    yield decoded_book(timestamps[0])
+
+    change_index = 0
+
+    for book_index in xrange(1, book_count):
+        for i in xrange(change_index, change_index + change_counts[book_index - 1]):
+            levels = sides[change_sides[i]]
+
+            if change_volumes[i] == 0:
+                levels.pop(change_prices[i], None)
+            else:
+                levels[change_prices[i]] = change_volumes[i]
+
+        change_index += change_counts[book_index - 1]
+
+        yield decoded_book(timestamps[book_index])
+
+
+class _ColumnReader(object):
+    def __init__(self, body):
+        self.body = body
+        self.offset = 0
+
+    def read(self, type_code, count):
+        column_format = '<%s%s' % (count, type_code)
+        values = struct.unpack_from(column_format, self.body, self.offset)
+        self.offset += struct.calcsize(column_format)
+
+        return values
+
+
+def _pack(type_code, values):
+    return struct.pack('<%s%s' % (len(values), type_code), *values)
+
+
+def _normalise_side(levels, best_first_reverse):
+    volumes = {}
+
+    for price, volume in packed_orderbook._decimal_levels(levels):
+        volumes[price] = volumes.get(price, Decimal('0')) + volume
+
+    return sorted(
+        [(price, volume) for price, volume in volumes.iteritems() if volume != 0],
+        reverse=best_first_reverse,
+    )
+
+
+def _decode_side(levels, price_scale, volume_scale, reverse):
+    return [
+        [Decimal(price).scaleb(-price_scale), Decimal(levels[price]).scaleb(-volume_scale)]
+        for price in sorted(levels, reverse=reverse)
+    ]
+
+
+def _historical_orderbook(exchange, book):
+    if book is None:
+        return None
+
+    timestamp, bids, asks = book
+
+    return HistoricalOrderbook(exchange, _datetime(timestamp), bids, asks)
+
+
+def _datetime(timestamp):
+    return datetime.utcfromtimestamp(timestamp)
+
+
+def _naive_utc(timestamp):
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(pytz.utc).replace(tzinfo=None)
+
+    return timestamp
+
+
+def _epoch(timestamp):
+    return calendar.timegm(timestamp.utctimetuple()) + timestamp.microsecond / 1e6
+
+
+def _microseconds(timestamp):
+    return int(round(timestamp * 1e6))
@@ -0,0 +1,234 @@
+"""
+A compact binary encoding for the orderbooks the data service caches in redis.
+
+Reading the JSON orderbook means json.loads-ing and sorting the whole book before we can
+look at the first level, even though most strategies only use the top few. The packed
+format stores each side as already-sorted fixed-point int64 price and volume arrays
+behind a small header, so a reader can pull out individual levels with
+struct.unpack_from without touching the rest of the buffer.
+
+Layout (little-endian):
+
+    header: magic 'GOB', version (uint8), price_scale (uint8), volume_scale (uint8),
+            timestamp (float64), sequence (uint64), bid_depth (uint32),
+            ask_depth (uint32)
+    body:   bid prices, bid volumes, ask prices, ask volumes, each an int64 array.
+
+A price p is stored as p * 10**price_scale, and similarly for volumes. The scales are
+the smallest that represent every value in the book exactly. Bids are stored best
+(highest) first and asks best (lowest) first.
+
+Besides the full book, pollers publish views truncated to each of VIEW_DEPTHS levels
+per side under their own keys, so readers that only need the top of the book don't
+have to transfer the rest of it.
+"""
+
+import struct
+
+from cdecimal import Decimal
+
+MAGIC = 'GOB'
+VERSION = 1
+MAX_SCALE = 18
+
+HEADER = struct.Struct('<3sBBBdQII')
+LEVEL = struct.Struct('<q')
+
+INT64_MAX = 2 ** 63 - 1
+
+VIEW_DEPTHS = (25, 100)
+
+
+class PackedOrderbookException(Exception):
+    pass
+
+
+def packed_orderbook_key(exchange_name, depth=None):
+    """
+    The redis key for an exchange's packed orderbook, or for its view truncated to
+    depth levels.
+    """
+    if depth is None:
+        return '%s_orderbook_packed' % exchange_name.lower()
+    else:
+        return '%s_orderbook_packed_%s' % (exchange_name.lower(), depth)
+
+
+def orderbook_updates_channel(exchange_name):
+    """
+    The redis pub/sub channel pollers publish to when an exchange's orderbook changes.
+    """
+    return '%s_orderbook_updates' % exchange_name.lower()
+
+
+def pack_orderbook(orderbook, timestamp, sequence=0, depth=None):
+    """
+    Encode an orderbook in the format the pollers publish, i.e.
+        {'bids': [[price, volume, ...], ...], 'asks': [...]}
+    where prices and volumes are strings, numbers or Decimals. If depth is given only
+    the best depth levels of each side are kept.
+    """
+    bids, asks = _sorted_levels(orderbook)
+
+    return _pack_sorted_levels(bids[:depth], asks[:depth], timestamp, sequence)
+
+
+def pack_orderbook_views(orderbook, timestamp, sequence=0, depths=VIEW_DEPTHS):
+    """
+    Encode the full orderbook and each of its depth-limited views, sorting the book
+    only once. Returns a dict of depth -> packed orderbook, with None for the full
+    book.
+    """
+    bids, asks = _sorted_levels(orderbook)
+
+    views = {None: _pack_sorted_levels(bids, asks, timestamp, sequence)}
+
+    for depth in depths:
+        views[depth] = _pack_sorted_levels(
+            bids[:depth],
+            asks[:depth],
+            timestamp,
+            sequence,
+        )
+
+    return views
+
+
+def _sorted_levels(orderbook):
+    bids = sorted(_decimal_levels(orderbook['bids']), reverse=True)
+    asks = sorted(_decimal_levels(orderbook['asks']))
+
+    return bids, asks
+
+
+def _pack_sorted_levels(bids, asks, timestamp, sequence):
+    price_scale = _scale_for([price for price, volume in bids + asks])
+    volume_scale = _scale_for([volume for price, volume in bids + asks])
+
+    values = []
+
+    for side in (bids, asks):
+        values.extend(_fixed_point(price, price_scale) for price, volume in side)
+        values.extend(_fixed_point(volume, volume_scale) for price, volume in side)
+
+    header = HEADER.pack(
+        MAGIC,
+        VERSION,
+        price_scale,
+        volume_scale,
+        timestamp,
+        sequence,
+        len(bids),
+        len(asks),
+    )
+
+    return header + struct.pack('<%sq' % len(values), *values)
+
+
+class PackedOrderbook(object):
+    """
+    A read-only view onto a packed orderbook. Only the header is decoded up front,
+    levels are decoded on demand.
+    """
+
+    def __init__(self, data):
+        if len(data) < HEADER.size:
+            raise PackedOrderbookException('Packed orderbook is too short')
+
+        (
+            magic,
+            version,
+            self.price_scale,
+            self.volume_scale,
+            self.timestamp,
+            self.sequence,
+            self.bid_depth,
+            self.ask_depth,
+        ) = HEADER.unpack_from(data)
+
+        if magic != MAGIC or version != VERSION:
+            raise PackedOrderbookException('Unrecognised packed orderbook header')
+
+        expected_length = HEADER.size + (self.bid_depth + self.ask_depth) * 2 * LEVEL.size
+
+        if len(data) != expected_length:
+            raise PackedOrderbookException('Packed orderbook has the wrong length')
+
+        self.data = data
+
+        self._bid_offset = HEADER.size
+        self._ask_offset = HEADER.size + self.bid_depth * 2 * LEVEL.size
+
+    def bids(self):
+        """Yields (price, volume) Decimal tuples, best bid first."""
+        return self._levels(self._bid_offset, self.bid_depth)
+
+    def asks(self):
+        """Yields (price, volume) Decimal tuples, best ask first."""
+        return self._levels(self._ask_offset, self.ask_depth)
+
+    def total_bid_volume(self):
+        return self._total_volume(self._bid_offset, self.bid_depth)
+
+    def total_ask_volume(self):
+        return self._total_volume(self._ask_offset, self.ask_depth)
+
+    def _total_volume(self, offset, depth):
+        volumes = struct.unpack_from(
+            '<%sq' % depth,
+            self.data,
+            offset + depth * LEVEL.size,
+        )
+
+        return Decimal(sum(volumes)).scaleb(-self.volume_scale)
+
+    def _levels(self, offset, depth):
+        price_exponent = -self.price_scale
+        volume_exponent = -self.volume_scale
+        volume_offset = offset + depth * LEVEL.size
+
+        for i in xrange(depth):
+            price = LEVEL.unpack_from(self.data, offset + i * LEVEL.size)[0]
+            volume = LEVEL.unpack_from(self.data, volume_offset + i * LEVEL.size)[0]
+
+            yield (
+                Decimal(price).scaleb(price_exponent),
+                Decimal(volume).scaleb(volume_exponent),
+            )
+
+
+def _to_decimal(value):
+    if isinstance(value, float):
+        # repr gives the shortest string that round-trips, which is what the exchange
+        # sent us before json.loads turned it into a float.
+        return Decimal(repr(value))
+    else:
+        return Decimal(value)
+
+
+def _decimal_levels(levels):
+    return [(_to_decimal(level[0]), _to_decimal(level[1])) for level in levels]
+
+
+def _scale_for(values):
+    scale = 0
+
+    for value in values:
+        exponent = value.normalize().as_tuple().exponent
+
+        if -exponent > scale:
+            scale = -exponent
+
+    if scale > MAX_SCALE:
+        raise PackedOrderbookException('Value too precise to pack: %s' % scale)
+
+    return scale
+
+
+def _fixed_point(value, scale):
+    fixed = int(value.scaleb(scale))
+
+    if abs(fixed) > INT64_MAX:
+        raise PackedOrderbookException('Value too large to pack: %s' % value)
+
+    return fixed
@@ -0,0 +1,32 @@
+# Simple script for benchmarking how long it takes to construct Metric rows, which is
+# dominated by resolving their metric types.
+
+import pyximport; pyximport.install()
+import gryphon.lib; gryphon.lib.prepare()
+
+import timeit
+
+from gryphon.lib.models.atlaszero.metric_types import metric_types_map
+
+setup = """
+from datetime import datetime
+
+from gryphon.lib.models.atlaszero.metric import Metric
+from gryphon.lib.models.atlaszero.metric_types import metric_types_map
+
+metric_types = sorted(metric_types_map.keys())
+timestamp = datetime(2018, 1, 1)
+"""
+
+statement = """
+for metric_type in metric_types:
+    Metric(metric_type, 1, timestamp)
+"""
+
+seconds = min(timeit.repeat(statement, setup, number=1, repeat=3))
+
+print 'Metric construction: %.1f us/row' % (seconds / len(metric_types_map) * 1e6)
+
+# Results 2026-10-18, all 5,455 metric types
+# Checking the registry and scanning its values on every lookup: 1417.3 us/row
+# Checked once at import, with a set of the ints: 16.8 us/row
@@ -24,6 +24,11 @@ def get_gds_db_mysql_creds():
     return os.environ['GDS_DB_CRED']
 
 
+def get_atlas_zero_db_mysql_creds():
+    import os
+    return os.environ['ATLAS_ZERO_DB_CRED']
+
+
 def get_redis_creds():
     # TODO: this should throw some exception if connection info unavailable.
     import os
@@ -65,6 +70,11 @@ def get_a_dashboard_db_mysql_session():
     return get_a_mysql_session(creds)
 
 
+def get_a_atlas_zero_db_mysql_session():
+    creds = get_atlas_zero_db_mysql_creds()
+    return get_a_mysql_session(creds)
+
+
 def commit_mysql_session(session):
     try:
         session.commit()
@@ -0,0 +1,190 @@
+import pyximport; pyximport.install()
+import gryphon.lib; gryphon.lib.prepare()
+
+from datetime import datetime
+import unittest
+
+from cdecimal import Decimal
+import mock
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.dialects.mysql.dml import OnDuplicateClause
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+import sure
+
+from gryphon.data_service.scripts import metric_series_generator as generator
+from gryphon.lib.models.atlaszero.base import AtlasZeroBase
+from gryphon.lib.models.atlaszero.metric import Metric
+from gryphon.lib.models.atlaszero.metric_types import get_metric_type_int
+from gryphon.lib.models.emeraldhavoc.base import EmeraldHavocBase
+from gryphon.lib.models.emeraldhavoc.orderbook import Orderbook
+from gryphon.lib.models.emeraldhavoc.trade import Trade
+from gryphon.lib.money import Money
+
+
+@compiles(OnDuplicateClause, 'sqlite')
+def sqlite_on_duplicate_key_update(clause, compiler, **kw):
+    """
+    Render mysql's ON DUPLICATE KEY UPDATE as sqlite's upsert, on the table's unique
+    index, so the tests can run against sqlite.
+    """
+    table = compiler.statement.table
+
+    unique_columns = [
+        column.name
+        for index in table.indexes if index.unique
+        for column in index.columns
+    ]
+
+    updates = ', '.join('%s = excluded.%s' % (key, key) for key in clause.update)
+
+    return 'ON CONFLICT (%s) DO UPDATE SET %s' % (', '.join(unique_columns), updates)
+
+
+def sqlite_session(base):
+    engine = create_engine('sqlite://')
+    base.metadata.create_all(engine)
+
+    return sessionmaker(bind=engine)()
+
+
+class TestMetricSeriesGenerator(unittest.TestCase):
+    def setUp(self):
+        self.gds_db = sqlite_session(EmeraldHavocBase)
+        self.atlas_zero_db = sqlite_session(AtlasZeroBase)
+
+        self.add_orderbook(datetime(2018, 1, 1, 7, 10), bid='590', ask='610')
+        self.add_orderbook(datetime(2018, 1, 1, 7, 50), bid='599', ask='601')
+        self.add_orderbook(datetime(2018, 1, 1, 8, 30), bid='595', ask='605')
+
+        self.add_trade(datetime(2018, 1, 1, 7, 15), '600', '1')
+        self.add_trade(datetime(2018, 1, 1, 7, 45), '604', '3')
+        self.add_trade(datetime(2018, 1, 1, 8, 0), '610', '0.5')
+
+        self.gds_db.commit()
+
+    def tearDown(self):
+        self.gds_db.close()
+        self.atlas_zero_db.close()
+
+    def add_orderbook(self, timestamp, bid, ask):
+        bid = Decimal(bid)
+        ask = Decimal(ask)
+
+        orderbook = {
+            'bids': [[str(bid - 1), '4'], [str(bid), '1']],
+            'asks': [[str(ask), '1'], [str(ask + 1), '4']],
+        }
+
+        self.gds_db.add(Orderbook(u'BITSTAMP_BTC_USD', orderbook, timestamp=timestamp))
+
+    def add_trade(self, timestamp, price, volume):
+        self.gds_db.add(Trade(
+            Money(price, 'USD'),
+            Money(volume, 'BTC'),
+            u'BITSTAMP_BTC_USD',
+            timestamp,
+            unicode(timestamp),
+        ))
+
+    def generate(self, start_time, end_time):
+        return generator.generate_exchange_metrics(
+            self.gds_db,
+            self.atlas_zero_db,
+            'bitstamp',
+            start_time,
+            end_time,
+        )
+
+    def metric_values(self, metric_type):
+        metrics = self.atlas_zero_db.query(Metric)\
+            .filter(Metric.metric_type == get_metric_type_int(metric_type))\
+            .order_by(Metric.timestamp)\
+            .all()
+
+        return [(m.timestamp, m.value) for m in metrics]
+
+    def test_depth_quotes(self):
+        quotes = generator.depth_quotes(
+            np.array([100.0, 101.0, 102.0]),
+            np.array([1.0, 2.0, 1.0]),
+            np.array([0.0, 1.0, 2.0, 4.0, 5.0]),
+        )
+
+        quotes[:4].tolist().should.equal([100.0, 100.0, 100.5, 101.0])
+        bool(np.isnan(quotes[4])).should.equal(True)
+
+    def test_levels_array(self):
+        prices, volumes = generator.levels_array(
+            [['99', '1'], ['100', '2'], ['98', '3']],
+            descending=True,
+        )
+
+        prices.tolist().should.equal([100.0, 99.0, 98.0])
+        volumes.tolist().should.equal([2.0, 1.0, 3.0])
+
+    def test_generates_hourly_series(self):
+        self.generate(datetime(2018, 1, 1, 7), datetime(2018, 1, 1, 9))
+
+        # The 8:00 sample is the last book before 8:00.
+        self.metric_values('bid-bitstamp-orderbook-1hr-0.00btc_depth').should.equal([
+            (datetime(2018, 1, 1, 8), Decimal('599')),
+            (datetime(2018, 1, 1, 9), Decimal('595')),
+        ])
+
+        # 5 BTC takes the whole side: (1 * 601 + 4 * 602) / 5.
+        self.metric_values('ask-bitstamp-orderbook-1hr-5.00btc_depth')[0][1]\
+            .should.equal(Decimal('601.8'))
+
+        self.metric_values('spread-bitstamp-orderbook-1hr-1.00btc_depth')[0][1]\
+            .should.equal(Decimal('2'))
+
+        self.metric_values('midpoint-bitstamp-orderbook-1hr-0.00btc_depth')[0][1]\
+            .should.equal(Decimal('600'))
+
+        # Not enough depth for 10 BTC.
+        self.metric_values('bid-bitstamp-orderbook-1hr-10.00btc_depth')\
+            .should.equal([])
+
+        self.metric_values('volume-bitstamp-trades-1hr').should.equal([
+            (datetime(2018, 1, 1, 8), Decimal('4')),
+            (datetime(2018, 1, 1, 9), Decimal('0.5')),
+        ])
+
+        # (600 * 1 + 604 * 3) / 4.
+        self.metric_values('vwap-bitstamp-trades-1hr')[0][1]\
+            .should.equal(Decimal('603'))
+
+    def test_incremental(self):
+        self.generate(datetime(2018, 1, 1, 7), datetime(2018, 1, 1, 8))
+
+        len(self.metric_values('volume-bitstamp-trades-1hr')).should.equal(1)
+
+        self.generate(datetime(2018, 1, 1, 7), datetime(2018, 1, 1, 9))
+
+        self.metric_values('volume-bitstamp-trades-1hr').should.equal([
+            (datetime(2018, 1, 1, 8), Decimal('4')),
+            (datetime(2018, 1, 1, 9), Decimal('0.5')),
+        ])
+
+        # Running it again doesn't write anything.
+        self.generate(datetime(2018, 1, 1, 7), datetime(2018, 1, 1, 9)).should.equal(0)
+
+    def test_overlapping_runs(self):
+        self.generate(datetime(2018, 1, 1, 7), datetime(2018, 1, 1, 9))
+
+        # Another run that started before the first one wrote anything.
+        with mock.patch.object(generator, 'latest_metric_timestamps', return_value={}):
+            self.generate(datetime(2018, 1, 1, 7), datetime(2018, 1, 1, 9))
+
+        self.metric_values('volume-bitstamp-trades-1hr').should.equal([
+            (datetime(2018, 1, 1, 8), Decimal('4')),
+            (datetime(2018, 1, 1, 9), Decimal('0.5')),
+        ])
+
+    def test_chunks(self):
+        with mock.patch.object(generator, 'CHUNK_HOURS', 1):
+            self.generate(datetime(2018, 1, 1, 7), datetime(2018, 1, 1, 9))
+
+        len(self.metric_values('vwap-bitstamp-trades-1hr')).should.equal(2)
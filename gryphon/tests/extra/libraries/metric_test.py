@@ -0,0 +1,133 @@
+import pyximport; pyximport.install()
+import gryphon.lib; gryphon.lib.prepare()
+
+from datetime import datetime, timedelta
+import shutil
+import tempfile
+import unittest
+
+import mock
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+import sure
+
+from gryphon.lib.models.atlaszero import metric as metric_module
+from gryphon.lib.models.atlaszero.base import AtlasZeroBase
+from gryphon.lib.models.atlaszero.metric import Metric
+
+
+def hour(h):
+    return datetime(2018, 1, 1, h)
+
+
+class TestMetricReads(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine('sqlite://')
+        AtlasZeroBase.metadata.create_all(engine)
+        self.db = sessionmaker(bind=engine)()
+
+        self.cache_dir = tempfile.mkdtemp()
+
+        for h in range(1, 6):
+            self.db.add(Metric('test', h, hour(h)))
+            self.db.add(Metric('revenue-gryphon-trades-1hr', h * 10, hour(h)))
+
+        self.db.add(Metric('revenue-gryphon-trades-1hr', None, hour(6)))
+
+        self.db.commit()
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.cache_dir)
+
+    def test_by_series_id(self):
+        series = Metric.get_as_pandas_by_series_id(self.db, 'test')
+
+        series.values.tolist().should.equal([1.0, 2.0, 3.0, 4.0, 5.0])
+        list(series.index.to_pydatetime()).should.equal([hour(h) for h in range(1, 6)])
+
+    def test_by_series_id_range(self):
+        series = Metric.get_as_pandas_by_series_id(
+            self.db,
+            0,
+            start_time=hour(2),
+            end_time=hour(4),
+        )
+
+        series.values.tolist().should.equal([2.0, 3.0])
+
+    def test_multiple_series(self):
+        # Make sure the series are split across fetches.
+        with mock.patch.object(metric_module, 'FETCH_SIZE', 3):
+            frame = Metric.get_as_pandas(
+                self.db,
+                ['test', 'revenue-gryphon-trades-1hr'],
+                start_time=hour(4),
+            )
+
+        list(frame.columns).should.equal(['test', 'revenue-gryphon-trades-1hr'])
+        list(frame.index.to_pydatetime()).should.equal([hour(4), hour(5), hour(6)])
+
+        frame['revenue-gryphon-trades-1hr'].values[:2].tolist().should.equal([40.0, 50.0])
+        bool(np.isnan(frame['revenue-gryphon-trades-1hr'].values[2])).should.equal(True)
+        bool(np.isnan(frame['test'].values[2])).should.equal(True)
+
+    def test_empty_series(self):
+        frame = Metric.get_as_pandas(self.db, ['test', 1], start_time=hour(10))
+
+        len(frame).should.equal(0)
+        list(frame.columns).should.equal(['test', 1])
+
+    def test_cache(self):
+        frame = Metric.get_as_pandas(
+            self.db,
+            ['test'],
+            start_time=hour(2),
+            end_time=hour(4),
+            cache_dir=self.cache_dir,
+        )
+
+        frame['test'].values.tolist().should.equal([2.0, 3.0])
+
+        # Cached ranges aren't read again, but anything outside them is.
+        self.db.query(Metric)\
+            .filter(Metric.metric_type == 0)\
+            .filter(Metric.timestamp == hour(3))\
+            .one().value = 100
+
+        self.db.commit()
+
+        frame = Metric.get_as_pandas(
+            self.db,
+            ['test'],
+            start_time=hour(1),
+            end_time=hour(5),
+            cache_dir=self.cache_dir,
+        )
+
+        frame['test'].values.tolist().should.equal([1.0, 2.0, 3.0, 4.0])
+
+        frame = Metric.get_as_pandas(self.db, ['test'], cache_dir=self.cache_dir)
+
+        frame['test'].values.tolist().should.equal([1.0, 2.0, 3.0, 4.0, 5.0])
+
+    def test_cache_picks_up_late_metrics(self):
+        recent = datetime.utcnow() - timedelta(hours=2)
+
+        self.db.add(Metric('test', 6, recent))
+        self.db.commit()
+
+        frame = Metric.get_as_pandas(self.db, ['test'], cache_dir=self.cache_dir)
+
+        frame['test'].values.tolist().should.equal([1.0, 2.0, 3.0, 4.0, 5.0, 6.0])
+
+        # A metric that's written late, for a time before the end of the last read.
+        self.db.add(Metric('test', 7, recent - timedelta(hours=1)))
+        self.db.commit()
+
+        frame = Metric.get_as_pandas(self.db, ['test'], cache_dir=self.cache_dir)
+
+        frame['test'].values.tolist().should.equal(
+            [1.0, 2.0, 3.0, 4.0, 5.0, 7.0, 6.0],
+        )
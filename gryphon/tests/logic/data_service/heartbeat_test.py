@@ -0,0 +1,69 @@
+import pyximport; pyximport.install()
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import sure
+import mock
+
+from gryphon.data_service.heartbeat import HeartbeatTicker
+
+
+class TestHeartbeatTicker(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'consumer.txt')
+        self.ticker = HeartbeatTicker(self.path, interval=5)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def read_stats(self):
+        with open(self.path) as f:
+            return json.loads(f.read())
+
+    @mock.patch('gryphon.data_service.heartbeat.time.time')
+    def test_first_record_beats(self, mock_time):
+        mock_time.return_value = 1000
+
+        self.ticker.record(timestamp=998)
+
+        self.read_stats()['message_count'].should.equal(1)
+        self.read_stats()['lag_seconds'].should.equal(2)
+
+    @mock.patch('gryphon.data_service.heartbeat.time.time')
+    def test_beats_at_most_once_per_interval(self, mock_time):
+        mock_time.return_value = 1000
+        self.ticker.record()
+
+        mock_time.return_value = 1001
+        self.ticker.record(10)
+
+        self.read_stats()['message_count'].should.equal(1)
+
+        mock_time.return_value = 1005
+        self.ticker.tick()
+
+        stats = self.read_stats()
+        stats['message_count'].should.equal(11)
+        stats['messages_per_second'].should.equal(2)
+
+    @mock.patch('gryphon.data_service.heartbeat.time.time')
+    def test_tick_without_messages_does_not_beat(self, mock_time):
+        mock_time.return_value = 1000
+        self.ticker.record()
+        os.remove(self.path)
+
+        mock_time.return_value = 1010
+        self.ticker.tick()
+
+        os.path.exists(self.path).should.equal(False)
+
+    def test_missing_directory_is_not_fatal(self):
+        ticker = HeartbeatTicker(os.path.join(self.directory, 'nope', 'consumer.txt'))
+
+        ticker.record()
+
+        ticker.message_count.should.equal(1)
@@ -0,0 +1,312 @@
+import pyximport; pyximport.install()
+import gryphon.lib; gryphon.lib.prepare()
+
+from datetime import datetime
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+import mock
+import sure
+
+from cdecimal import Decimal
+from sqlalchemy import create_engine
+from sqlalchemy.orm import scoped_session, sessionmaker
+
+from gryphon.data_service.scripts import historical_trade_collector as collector
+from gryphon.lib.models.emeraldhavoc.base import EmeraldHavocBase
+from gryphon.lib.models.emeraldhavoc.trade import Trade
+from gryphon.lib.money import Money
+
+
+CSV_ROWS = [
+    '1420070400,300.5,0.1',
+    '1420070460,301,0.25',
+    '1420070520,302.25,1',
+    '1420070580,303,0.5',
+    '1420070640,304,2',
+]
+
+
+class TestHistoricalTradeCollector(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.source_path = os.path.join(self.temp_dir, 'bitstampUSD.csv.gz')
+
+        with gzip.open(self.source_path, 'wb') as f:
+            f.write('\n'.join(CSV_ROWS) + '\n')
+
+        engine = create_engine('sqlite://')
+        EmeraldHavocBase.metadata.create_all(engine)
+        self.db = scoped_session(sessionmaker(bind=engine))
+
+        self.session_patch = mock.patch.object(collector, 'session')
+        mock_session = self.session_patch.start()
+        mock_session.get_a_gds_db_mysql_session.return_value = self.db
+        mock_session.commit_mysql_session.side_effect = lambda db: db.commit()
+
+    def tearDown(self):
+        self.session_patch.stop()
+        shutil.rmtree(self.temp_dir)
+
+    def recorded_trades(self):
+        return self.db.query(Trade).order_by(Trade.timestamp).all()
+
+    def test_streams_local_file(self):
+        # Make sure rows are split across reads.
+        with mock.patch.object(collector, 'READ_SIZE', 7):
+            trades = collector.get_historical_trades(
+                'bitstamp',
+                'USD',
+                source_path=self.source_path,
+            )
+
+        len(trades).should.equal(5)
+
+        trades[0].should.equal([
+            datetime(2015, 1, 1, 0, 0),
+            Money('300.5', 'USD'),
+            Money('0.1', 'BTC'),
+        ])
+
+        trades[-1][2].should.equal(Money('2', 'BTC'))
+
+    def test_chunked(self):
+        list(collector.chunked(range(5), 2)).should.equal([[0, 1], [2, 3], [4]])
+
+    def test_backfill_before_recorded_trades(self):
+        self.db.add(Trade(
+            Money('303', 'USD'),
+            Money('0.5', 'BTC'),
+            u'BITSTAMP',
+            datetime(2015, 1, 1, 0, 3),
+            u'1',
+        ))
+
+        self.db.commit()
+
+        with mock.patch.object(collector, 'CHUNK_SIZE', 2):
+            collector.backfill_exchange(
+                u'BITSTAMP',
+                'bitstamp',
+                'USD',
+                'BTC',
+                source_path=self.source_path,
+            )
+
+        trades = self.recorded_trades()
+
+        [t.source for t in trades].should.equal(
+            [u'BITCOINCHARTS'] * 3 + [u'EXCHANGE'],
+        )
+
+        [t.volume.amount for t in trades].should.equal(
+            [Decimal('0.1'), Decimal('0.25'), Decimal('1'), Decimal('0.5')],
+        )
+
+    def test_resume_from_checkpoint(self):
+        checkpoint_path = os.path.join(self.temp_dir, 'checkpoint.json')
+        insert_trades = collector.insert_trades
+        calls = []
+
+        def interrupt_second_chunk(*args, **kwargs):
+            calls.append(args)
+
+            if len(calls) == 2:
+                raise KeyboardInterrupt()
+
+            insert_trades(*args, **kwargs)
+
+        with mock.patch.object(collector, 'CHUNK_SIZE', 2):
+            with mock.patch.object(collector, 'insert_trades', interrupt_second_chunk):
+                collector.backfill_exchange.when.called_with(
+                    u'BITSTAMP',
+                    'bitstamp',
+                    'USD',
+                    'BTC',
+                    source_path=self.source_path,
+                    checkpoint_path=checkpoint_path,
+                ).should.throw(KeyboardInterrupt)
+
+            len(self.recorded_trades()).should.equal(2)
+
+            collector.load_checkpoint(checkpoint_path).should.equal({
+                'cutoff': None,
+                'rows_done': 2,
+                'backfilled': (datetime(2015, 1, 1, 0, 1), 1),
+            })
+
+            collector.backfill_exchange(
+                u'BITSTAMP',
+                'bitstamp',
+                'USD',
+                'BTC',
+                source_path=self.source_path,
+                checkpoint_path=checkpoint_path,
+            )
+
+        trades = self.recorded_trades()
+
+        len(trades).should.equal(5)
+        [t.price.amount for t in trades].should.equal(
+            [Decimal(row.split(',')[1]) for row in CSV_ROWS],
+        )
+
+    def interrupted_backfill(self, interrupt_at_call):
+        insert_trades = collector.insert_trades
+        calls = []
+
+        def interrupt(*args, **kwargs):
+            calls.append(args)
+
+            if len(calls) == interrupt_at_call:
+                raise KeyboardInterrupt()
+
+            insert_trades(*args, **kwargs)
+
+        with mock.patch.object(collector, 'insert_trades', interrupt):
+            collector.backfill_exchange.when.called_with(
+                u'BITSTAMP',
+                'bitstamp',
+                'USD',
+                'BTC',
+                source_path=self.source_path,
+            ).should.throw(KeyboardInterrupt)
+
+    def test_rerun_without_checkpoint(self):
+        self.db.add(Trade(
+            Money('304', 'USD'),
+            Money('2', 'BTC'),
+            u'BITSTAMP',
+            datetime(2015, 1, 1, 0, 4),
+            u'1',
+        ))
+
+        self.db.commit()
+
+        with mock.patch.object(collector, 'CHUNK_SIZE', 2):
+            self.interrupted_backfill(2)
+
+            len(self.recorded_trades()).should.equal(3)
+
+            collector.backfill_exchange(
+                u'BITSTAMP',
+                'bitstamp',
+                'USD',
+                'BTC',
+                source_path=self.source_path,
+            )
+
+        trades = self.recorded_trades()
+
+        [t.source for t in trades].should.equal(
+            [u'BITCOINCHARTS'] * 4 + [u'EXCHANGE'],
+        )
+
+        [t.price.amount for t in trades].should.equal(
+            [Decimal(row.split(',')[1]) for row in CSV_ROWS],
+        )
+
+    def test_rerun_splits_a_second(self):
+        rows = [
+            '1420070400,300,1',
+            '1420070400,301,2',
+            '1420070400,302,3',
+            '1420070460,303,4',
+        ]
+
+        with gzip.open(self.source_path, 'wb') as f:
+            f.write('\n'.join(rows) + '\n')
+
+        with mock.patch.object(collector, 'CHUNK_SIZE', 2):
+            self.interrupted_backfill(2)
+
+            collector.backfill_exchange(
+                u'BITSTAMP',
+                'bitstamp',
+                'USD',
+                'BTC',
+                source_path=self.source_path,
+            )
+
+            # A complete rerun doesn't add anything.
+            collector.backfill_exchange(
+                u'BITSTAMP',
+                'bitstamp',
+                'USD',
+                'BTC',
+                source_path=self.source_path,
+            )
+
+        sorted(t.volume.amount for t in self.recorded_trades()).should.equal(
+            [Decimal('1'), Decimal('2'), Decimal('3'), Decimal('4')],
+        )
+
+    def write_source(self, rows):
+        with gzip.open(self.source_path, 'wb') as f:
+            f.write('\n'.join(rows) + '\n')
+
+    def resume_after_interrupt(self, function_name, interrupt_at_call):
+        checkpoint_path = os.path.join(self.temp_dir, 'checkpoint.json')
+        original = getattr(collector, function_name)
+        calls = []
+
+        def interrupt(*args, **kwargs):
+            calls.append(args)
+
+            if len(calls) == interrupt_at_call:
+                raise KeyboardInterrupt()
+
+            return original(*args, **kwargs)
+
+        with mock.patch.object(collector, 'CHUNK_SIZE', 2):
+            with mock.patch.object(collector, function_name, interrupt):
+                collector.backfill_exchange.when.called_with(
+                    u'BITSTAMP',
+                    'bitstamp',
+                    'USD',
+                    'BTC',
+                    source_path=self.source_path,
+                    checkpoint_path=checkpoint_path,
+                ).should.throw(KeyboardInterrupt)
+
+            collector.backfill_exchange(
+                u'BITSTAMP',
+                'bitstamp',
+                'USD',
+                'BTC',
+                source_path=self.source_path,
+                checkpoint_path=checkpoint_path,
+            )
+
+    def test_resume_after_commit_before_checkpoint(self):
+        self.write_source([
+            '1420070400,300,1',
+            '1420070400,301,2',
+            '1420070400,302,3',
+            '1420070460,303,4',
+            '1420070520,304,5',
+        ])
+
+        # The second chunk is committed, but its checkpoint is never saved.
+        self.resume_after_interrupt('save_checkpoint', 2)
+
+        sorted(t.volume.amount for t in self.recorded_trades()).should.equal(
+            [Decimal(v) for v in ['1', '2', '3', '4', '5']],
+        )
+
+    def test_resume_splits_a_second(self):
+        self.write_source([
+            '1420070400,300,1',
+            '1420070400,301,2',
+            '1420070400,302,3',
+            '1420070460,303,4',
+        ])
+
+        # The second chunk starts in the same second the checkpoint ends in.
+        self.resume_after_interrupt('insert_trades', 2)
+
+        sorted(t.volume.amount for t in self.recorded_trades()).should.equal(
+            [Decimal(v) for v in ['1', '2', '3', '4']],
+        )
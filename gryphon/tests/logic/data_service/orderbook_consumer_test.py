@@ -0,0 +1,130 @@
+import pyximport; pyximport.install()
+import gryphon.lib; gryphon.lib.prepare()
+
+from datetime import datetime
+import json
+import unittest
+import mock
+import sure
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import scoped_session, sessionmaker
+
+import gryphon.data_service.consts as consts
+from gryphon.data_service import orderbook_consumer
+from gryphon.data_service import queue_consumer
+from gryphon.data_service.queue_consumer import QueueConsumer
+from gryphon.lib import orderbook_history
+from gryphon.lib.models.emeraldhavoc.base import EmeraldHavocBase
+from gryphon.lib.models.emeraldhavoc.orderbook_segment import OrderbookSegment
+
+START = 1514764800  # 2018-01-01 00:00:00 UTC.
+
+
+def message(exchange, timestamp, best_bid):
+    return json.dumps({
+        'timestamp': timestamp,
+        exchange: {
+            'bids': [[str(best_bid), '1', 'x']],
+            'asks': [[str(best_bid + 1), '1', 'x']],
+        },
+    })
+
+
+def delivery(tag):
+    basic_deliver = mock.Mock()
+    basic_deliver.delivery_tag = tag
+
+    return basic_deliver
+
+
+class TestOrderbookSegmentConsumer(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine('sqlite://')
+        EmeraldHavocBase.metadata.create_all(engine)
+        self.db = scoped_session(sessionmaker(bind=engine))
+
+        self.commit_failures = 0
+
+        self.patches = [
+            mock.patch.object(orderbook_consumer, 'storage', consts.ORDERBOOK_STORAGE_SEGMENTS),
+            mock.patch.object(orderbook_consumer, 'heartbeat'),
+            mock.patch.object(orderbook_consumer.session, 'commit_mysql_session', self.commit),
+            mock.patch.object(queue_consumer.time, 'sleep'),
+        ]
+
+        for patch in self.patches:
+            patch.start()
+
+        self.consumer = QueueConsumer(
+            'amqp://localhost',
+            orderbook_consumer.orderbook_batch_consumer_function,
+            self.db,
+            'exchange',
+            'topic',
+            'binding_key',
+            'queue',
+            batch_size=3,
+        )
+
+        self.consumer.heartbeat = mock.Mock()
+        self.consumer._connection = mock.Mock()
+        self.consumer._channel = mock.Mock()
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+
+        self.db.remove()
+
+    def commit(self, db):
+        if self.commit_failures:
+            self.commit_failures -= 1
+            raise Exception('Lost connection')
+
+        db.commit()
+
+    def deliver(self, tag, exchange, timestamp):
+        self.consumer.on_message(
+            None,
+            delivery(tag),
+            None,
+            message(exchange, timestamp, 100 + tag),
+        )
+
+    def stored_bids(self, exchange):
+        books = orderbook_history.iter_orderbooks(
+            self.db,
+            exchange,
+            datetime(2018, 1, 1),
+            datetime(2018, 1, 2),
+        )
+
+        return [int(ob.bids[0][0]) for ob in books]
+
+    def test_failed_batch_then_retry(self):
+        self.deliver(1, u'BITSTAMP_BTC_USD', START)
+        self.deliver(2, u'KRAKEN_BTC_EUR', START)
+        self.deliver(3, u'BITSTAMP_BTC_USD', START + 1)
+
+        # Acked books are already in the database, not held in memory.
+        self.stored_bids(u'BITSTAMP_BTC_USD').should.equal([101, 103])
+        self.stored_bids(u'KRAKEN_BTC_EUR').should.equal([102])
+
+        # The segments were written but the commit fails, once.
+        self.commit_failures = 1
+
+        self.deliver(4, u'BITSTAMP_BTC_USD', START + 2)
+        self.deliver(5, u'KRAKEN_BTC_EUR', START + 1)
+        self.deliver(6, u'BITSTAMP_BTC_USD', START + 3)
+
+        self.stored_bids(u'BITSTAMP_BTC_USD').should.equal([101, 103, 104, 106])
+        self.stored_bids(u'KRAKEN_BTC_EUR').should.equal([102, 105])
+
+        # Each exchange's books were appended to its open segment.
+        self.db.query(OrderbookSegment).count().should.equal(2)
+
+        self.consumer._channel.basic_ack.call_args_list.should.equal([
+            mock.call(3, multiple=True),
+            mock.call(6, multiple=True),
+        ])
@@ -0,0 +1,110 @@
+import pyximport; pyximport.install()
+
+import unittest
+import sure
+
+from cdecimal import Decimal
+
+from gryphon.data_service.pollers.orderbook.websocket.price_level_book import PriceLevelBook
+
+
+class TestPriceLevelBook(unittest.TestCase):
+    def setUp(self):
+        self.book = PriceLevelBook()
+
+    def test_empty(self):
+        self.book.to_publish().should.equal({'bids': [], 'asks': []})
+
+    def test_levels_are_sorted(self):
+        self.book.set_level('bids', '249', '1')
+        self.book.set_level('bids', '250', '2')
+        self.book.set_level('bids', '248.5', '3')
+        self.book.set_level('asks', '252', '1')
+        self.book.set_level('asks', '251', '2')
+
+        self.book.to_publish().should.equal({
+            'bids': [['250', '2', ''], ['249', '1', ''], ['248.5', '3', '']],
+            'asks': [['251', '2', ''], ['252', '1', '']],
+        })
+
+    def test_set_level_zero_removes(self):
+        self.book.set_level('bids', '250', '2')
+        self.book.set_level('bids', '249', '1')
+        self.book.set_level('bids', '250', '0')
+
+        self.book.to_publish()['bids'].should.equal([['249', '1', '']])
+        len(self.book.bids).should.equal(1)
+
+    def test_equivalent_prices_share_a_level(self):
+        self.book.set_level('asks', '250.10', '1')
+        self.book.set_level('asks', '250.1', '2')
+
+        list(self.book.asks.levels()).should.equal([(Decimal('250.1'), Decimal('2'))])
+
+    def test_depth(self):
+        for price in ['1', '2', '3', '4']:
+            self.book.set_level('asks', price, '1')
+
+        self.book.to_publish(depth=2)['asks'].should.equal([
+            ['1', '1', ''],
+            ['2', '1', ''],
+        ])
+
+    def test_orders_aggregate_into_levels(self):
+        self.book.add_order('a', 'bids', '250', '1.5')
+        self.book.add_order('b', 'bids', '250', '0.5')
+        self.book.add_order('c', 'bids', '249', '1')
+
+        self.book.to_publish()['bids'].should.equal([
+            ['250', '2.0', ''],
+            ['249', '1', ''],
+        ])
+
+    def test_remove_order(self):
+        self.book.add_order('a', 'asks', '251', '1')
+        self.book.add_order('b', 'asks', '251', '2')
+
+        self.book.remove_order('a').should.equal(True)
+        self.book.remove_order('a').should.equal(False)
+        self.book.to_publish()['asks'].should.equal([['251', '2', '']])
+
+        self.book.remove_order('b')
+        len(self.book.asks).should.equal(0)
+
+    def test_change_order(self):
+        self.book.add_order('a', 'asks', '251', '1')
+        self.book.add_order('b', 'asks', '251', '2')
+
+        self.book.change_order('b', '0.5').should.equal(True)
+        self.book.change_order('z', '0.5').should.equal(False)
+
+        self.book.to_publish()['asks'].should.equal([['251', '1.5', '']])
+        self.book.has_order('b').should.equal(True)
+
+    def test_unknown_side(self):
+        self.book.set_level.when.called_with('middle', '1', '1').should.throw(ValueError)
+
+    def test_version(self):
+        versions = [self.book.version]
+
+        self.book.set_level('bids', '250', '1')
+        versions.append(self.book.version)
+
+        # Setting a level to the volume it already has isn't a change.
+        self.book.set_level('bids', '250', '1.0')
+        versions.append(self.book.version)
+
+        self.book.add_order('a', 'asks', '251', '1')
+        versions.append(self.book.version)
+
+        self.book.remove_order('a')
+        versions.append(self.book.version)
+
+        # Neither is removing a level that isn't there.
+        self.book.set_level('asks', '300', '0')
+        versions.append(self.book.version)
+
+        self.book.clear()
+        versions.append(self.book.version)
+
+        versions.should.equal([0, 1, 1, 2, 3, 3, 4])
@@ -0,0 +1,126 @@
+import pyximport; pyximport.install()
+
+import unittest
+import mock
+import sure
+
+from gryphon.data_service import queue_consumer
+from gryphon.data_service.queue_consumer import QueueConsumer, QueueConsumerException
+
+
+def delivery(tag):
+    basic_deliver = mock.Mock()
+    basic_deliver.delivery_tag = tag
+
+    return basic_deliver
+
+
+class TestQueueConsumerBatching(unittest.TestCase):
+    def setUp(self):
+        self.batches = []
+        self.failures = 0
+
+        self.db = mock.Mock()
+
+        self.consumer = QueueConsumer(
+            'amqp://localhost',
+            self.consumer_func,
+            self.db,
+            'exchange',
+            'topic',
+            'binding_key',
+            'queue',
+            batch_size=3,
+            batch_interval=0.5,
+        )
+
+        self.consumer.heartbeat = mock.Mock()
+        self.consumer._connection = mock.Mock()
+        self.consumer._channel = mock.Mock()
+
+        self.sleep_patch = mock.patch.object(queue_consumer.time, 'sleep')
+        self.sleep_patch.start()
+
+    def tearDown(self):
+        self.sleep_patch.stop()
+
+    def consumer_func(self, bodies, db):
+        if self.failures:
+            self.failures -= 1
+            raise Exception('Lost connection')
+
+        self.batches.append(list(bodies))
+
+    def deliver(self, *tags):
+        for tag in tags:
+            self.consumer.on_message(None, delivery(tag), None, 'message %s' % tag)
+
+    def test_size_trigger(self):
+        self.deliver(1, 2)
+
+        self.batches.should.equal([])
+
+        self.deliver(3)
+
+        self.batches.should.equal([['message 1', 'message 2', 'message 3']])
+
+        self.consumer._channel.basic_ack.assert_called_once_with(3, multiple=True)
+        self.consumer.heartbeat.record.assert_called_once_with(3)
+
+    def test_interval_trigger(self):
+        self.deliver(1)
+
+        self.consumer._connection.add_timeout.assert_called_once_with(
+            0.5,
+            self.consumer.flush_batch,
+        )
+
+        # Only one timer per batch.
+        self.deliver(2)
+        self.consumer._connection.add_timeout.call_count.should.equal(1)
+
+        self.consumer.flush_batch()
+
+        self.batches.should.equal([['message 1', 'message 2']])
+        self.consumer._channel.basic_ack.assert_called_once_with(2, multiple=True)
+
+    def test_full_batch_cancels_timer(self):
+        self.deliver(1, 2, 3)
+
+        self.consumer._connection.remove_timeout.assert_called_once_with(
+            self.consumer._connection.add_timeout.return_value,
+        )
+
+    def test_retry_rolls_back(self):
+        self.failures = 2
+
+        self.deliver(1, 2, 3)
+
+        self.db.rollback.call_count.should.equal(2)
+        self.batches.should.equal([['message 1', 'message 2', 'message 3']])
+        self.consumer._channel.basic_ack.assert_called_once_with(3, multiple=True)
+
+    def test_too_many_failures(self):
+        self.failures = 1000
+
+        self.deliver.when.called_with(1, 2, 3).should.throw(QueueConsumerException)
+
+        self.consumer._channel.basic_ack.called.should.equal(False)
+
+    def test_stop_flushes(self):
+        self.deliver(1)
+
+        self.consumer.stop()
+
+        self.batches.should.equal([['message 1']])
+        self.consumer._channel.basic_ack.assert_called_once_with(1, multiple=True)
+        self.consumer._channel.basic_cancel.called.should.equal(True)
+
+    def test_unbatched_retry_rolls_back(self):
+        self.consumer.batch_size = None
+        self.failures = 1
+
+        self.deliver(1)
+
+        self.db.rollback.call_count.should.equal(1)
+        self.consumer._channel.basic_ack.assert_called_once_with(1, multiple=False)
@@ -0,0 +1,100 @@
+import pyximport; pyximport.install()
+
+import unittest
+import mock
+import sure
+
+from twisted.internet import defer, task
+
+from gryphon.data_service.pollers.orderbook.websocket import websocket_orderbook_poller
+from gryphon.data_service.pollers.orderbook.websocket.price_level_book import PriceLevelBook
+from gryphon.data_service.pollers.orderbook.websocket.websocket_orderbook_poller import WebsocketOrderbookPoller
+
+
+class TestWebsocketOrderbookPoller(unittest.TestCase):
+    def setUp(self):
+        self.clock = task.Clock()
+
+        self.reactor_patch = mock.patch.object(
+            websocket_orderbook_poller,
+            'reactor',
+            self.clock,
+        )
+
+        self.reactor_patch.start()
+
+        self.poller = WebsocketOrderbookPoller()
+        self.poller.exchange_name = u'BITSTAMP_BTC_USD'
+        self.poller.orderbook = PriceLevelBook()
+
+        self.poller.redis = mock.Mock()
+        self.poller.redis.set.return_value = defer.succeed(None)
+        self.poller.redis.publish.return_value = defer.succeed(None)
+
+        self.poller.producer = mock.Mock()
+
+        self.poller.reset_publishing()
+
+    def tearDown(self):
+        self.reactor_patch.stop()
+
+    def orderbook_sets(self):
+        return [
+            c for c in self.poller.redis.set.call_args_list
+            if c[0][0] == self.poller.orderbook_key
+        ]
+
+    def test_burst_is_coalesced(self):
+        for price in ['250', '251', '252']:
+            self.poller.orderbook.set_level('bids', price, '1')
+            self.poller.publish_orderbook()
+
+        len(self.orderbook_sets()).should.equal(0)
+
+        self.clock.advance(WebsocketOrderbookPoller.PUBLISH_INTERVAL)
+
+        len(self.orderbook_sets()).should.equal(1)
+        self.poller.producer.publish_message.call_count.should.equal(1)
+        self.poller.redis.publish.call_count.should.equal(1)
+
+    def test_unchanged_book_is_not_pushed(self):
+        self.poller.orderbook.set_level('bids', '250', '1')
+        self.poller.publish_orderbook()
+        self.clock.advance(WebsocketOrderbookPoller.PUBLISH_INTERVAL)
+
+        # Past the AMQP rate limit, with nothing new in the book.
+        self.poller.last_amqp_push = 0
+        self.poller.orderbook.set_level('bids', '250', '1')
+        self.poller.publish_orderbook()
+        self.clock.advance(WebsocketOrderbookPoller.PUBLISH_INTERVAL)
+
+        # Redis still gets the new timestamp.
+        len(self.orderbook_sets()).should.equal(2)
+        self.poller.producer.publish_message.call_count.should.equal(1)
+        self.poller.redis.publish.call_count.should.equal(1)
+
+    def test_new_book_counts_as_a_change(self):
+        self.poller.orderbook.set_level('bids', '250', '1')
+        self.poller.publish_orderbook()
+        self.clock.advance(WebsocketOrderbookPoller.PUBLISH_INTERVAL)
+
+        self.poller.orderbook = PriceLevelBook()
+        self.poller.orderbook.set_level('bids', '250', '2')
+        self.poller.publish_orderbook()
+        self.clock.advance(WebsocketOrderbookPoller.PUBLISH_INTERVAL)
+
+        self.poller.redis.publish.call_count.should.equal(2)
+
+    def test_reconnect_cancels_pending_publish(self):
+        self.poller.orderbook.set_level('bids', '250', '1')
+        self.poller.publish_orderbook()
+
+        self.poller.reset_publishing()
+
+        self.poller.pending_publish.should.equal(None)
+        self.clock.getDelayedCalls().should.equal([])
+
+        self.clock.advance(WebsocketOrderbookPoller.PUBLISH_INTERVAL)
+
+        len(self.orderbook_sets()).should.equal(0)
+        self.poller.producer.publish_message.called.should.equal(False)
@@ -0,0 +1,348 @@
+"""
+Tests for the harness's coordinator handling and parallel ledger consolidation.
+"""
+import pyximport; pyximport.install()
+from collections import OrderedDict
+import unittest
+import mock
+import sure
+
+from cdecimal import Decimal
+
+from gryphon.execution.harness.exchange_coordinator import ExchangeCoordinator
+from gryphon.execution.harness.harness import Harness
+from gryphon.execution.lib import auditing
+from gryphon.lib.forex import FXSnapshot
+from gryphon.lib.money import Money
+
+
+@mock.patch('gryphon.execution.harness.harness.ExchangeCoordinator')
+@mock.patch('gryphon.execution.harness.harness.exchange_factory')
+class TestLazyCoordinators(unittest.TestCase):
+    def test_no_coordinators_up_front(self, mock_factory, mock_coordinator):
+        harness = Harness(None, None)
+
+        harness.exchanges.should.equal([])
+        mock_coordinator.called.should.equal(False)
+
+    def test_created_on_first_access(self, mock_factory, mock_coordinator):
+        harness = Harness(None, None)
+
+        coordinator = harness.bitstamp_btc_usd
+
+        harness.bitstamp_btc_usd.should.be(coordinator)
+        harness.exchange_from_key('BITSTAMP_BTC_USD').should.be(coordinator)
+        harness.exchanges.should.equal([coordinator])
+
+        mock_factory.get_api_wrapper_class_by_name.assert_called_once_with(
+            'bitstamp_btc_usd',
+        )
+
+    def test_unknown_exchange(self, mock_factory, mock_coordinator):
+        harness = Harness(None, None)
+
+        harness.exchange_from_key.when.called_with('nope_btc_usd').should.throw(KeyError)
+        getattr.when.called_with(harness, 'nope_btc_usd').should.throw(AttributeError)
+
+
+@mock.patch('gryphon.execution.harness.harness.ExchangeCoordinator')
+@mock.patch('gryphon.execution.harness.harness.exchange_factory')
+class TestTickScheduler(unittest.TestCase):
+    def setUp(self):
+        self.harness = Harness(None, None)
+        self.harness.strategy = mock.Mock(tick_sleep=5)
+
+    def test_coordinator_targets(self, mock_factory, mock_coordinator):
+        bitstamp = mock.Mock(exchange_wrapper=mock.Mock(max_tick_speed=2))
+        bitstamp.name = 'BITSTAMP_BTC_USD'
+        self.harness._coordinators['bitstamp_btc_usd'] = bitstamp
+
+        self.harness.strategy.target_exchanges = [bitstamp, 'kraken_btc_eur']
+        mock_coordinator.return_value.exchange_wrapper.max_tick_speed = 1
+
+        scheduler = self.harness.tick_scheduler
+
+        scheduler.channels.should.equal([
+            'bitstamp_btc_usd_orderbook_updates',
+            'kraken_btc_eur_orderbook_updates',
+        ])
+
+        scheduler.min_interval.should.equal(2)
+
+    @mock.patch('gryphon.execution.harness.harness.logger')
+    def test_no_targets_warns(self, mock_logger, mock_factory, mock_coordinator):
+        self.harness.strategy.target_exchanges = []
+
+        self.harness.tick_scheduler.channels.should.equal([])
+
+        mock_logger.warning.call_count.should.equal(1)
+
+
+class TestParallelConsolidation(unittest.TestCase):
+    def setUp(self):
+        self.calls = mock.Mock()
+
+        self.harness = Harness.__new__(Harness)
+        self.harness.parallel_consolidation = True
+        self.harness._coordinators = OrderedDict([
+            (
+                'bitstamp_btc_usd',
+                self.mock_exchange('BITSTAMP_BTC_USD', ['1'], [{'id': '2'}], ['1']),
+            ),
+            (
+                'kraken_btc_eur',
+                self.mock_exchange('KRAKEN_BTC_EUR', [], [{'id': '3'}], []),
+            ),
+        ])
+
+    def mock_exchange(self, name, eaten_order_ids, current_orders, detail_order_ids):
+        exchange = mock.Mock()
+        exchange.name = name
+        exchange.is_active = True
+
+        exchange.prepare_accounting.return_value = (
+            eaten_order_ids,
+            current_orders,
+            {o['id']: 'db order %s' % o['id'] for o in current_orders},
+            detail_order_ids,
+        )
+
+        exchange.order_details_resp.return_value = {'1': 'details'}
+
+        self.calls.attach_mock(exchange, name)
+
+        return exchange
+
+    def test_requests_are_sent_before_responses_are_read(self):
+        self.harness.consolidate_ledgers()
+
+        call_names = [c[0] for c in self.calls.mock_calls]
+
+        call_names[:4].should.equal([
+            'BITSTAMP_BTC_USD.open_orders_req',
+            'KRAKEN_BTC_EUR.open_orders_req',
+            'BITSTAMP_BTC_USD.open_orders_resp',
+            'KRAKEN_BTC_EUR.open_orders_resp',
+        ])
+
+        call_names.index('BITSTAMP_BTC_USD.order_details_req').should.be.lower_than(
+            call_names.index('BITSTAMP_BTC_USD.order_details_resp'),
+        )
+
+        call_names.index('BITSTAMP_BTC_USD.order_details_req').should.be.lower_than(
+            call_names.index('BITSTAMP_BTC_USD.run_accounting'),
+        )
+
+    def test_order_details_only_requested_when_needed(self):
+        bitstamp, kraken = self.harness.exchanges
+
+        current_orders = self.harness.consolidate_ledgers()
+
+        bitstamp.order_details_req.assert_called_once_with(['1'])
+        kraken.order_details_req.called.should.equal(False)
+
+        bitstamp.run_accounting.assert_called_once_with(
+            ['1'],
+            [{'id': '2'}],
+            {'2': 'db order 2'},
+            {'1': 'details'},
+        )
+
+        kraken.run_accounting.assert_called_once_with(
+            [],
+            [{'id': '3'}],
+            {'3': 'db order 3'},
+            None,
+        )
+
+        current_orders.should.equal({
+            'BITSTAMP_BTC_USD': [{'id': '2'}],
+            'KRAKEN_BTC_EUR': [{'id': '3'}],
+        })
+
+
+class TestPrepareAccounting(unittest.TestCase):
+    def setUp(self):
+        self.coordinator = ExchangeCoordinator(mock.Mock(), mock.Mock())
+
+        self.db_orders = [
+            mock.Mock(exchange_order_id='2', volume_remaining=Money('1', 'BTC')),
+            mock.Mock(exchange_order_id='3', volume_remaining=Money('1', 'BTC')),
+        ]
+
+        for order in self.db_orders:
+            order.was_partially_eaten.return_value = (mock.Mock(), mock.MagicMock())
+
+        self.current_orders = [
+            {'id': '2', 'volume_remaining': Money('0.5', 'BTC')},
+            {'id': '3', 'volume_remaining': Money('1', 'BTC')},
+        ]
+
+        self.coordinator._get_current_orders = mock.Mock(
+            return_value=(['1'], self.current_orders),
+        )
+
+        self.coordinator._get_orders_by_order_ids = mock.Mock(
+            return_value=self.db_orders,
+        )
+
+    def test_db_orders_loaded_once(self):
+        eaten_order_ids, current_orders, current_db_orders, detail_order_ids = \
+            self.coordinator.prepare_accounting([])
+
+        detail_order_ids.should.equal(['1', '2'])
+        current_db_orders.should.equal({'2': self.db_orders[0], '3': self.db_orders[1]})
+
+        self.coordinator._get_orders_by_order_ids.assert_called_once_with(['2', '3'])
+
+        self.coordinator._save_order = mock.Mock()
+        self.coordinator.update_position = mock.Mock()
+        self.coordinator.harness = mock.Mock()
+
+        self.coordinator.run_accounting(
+            [],
+            current_orders,
+            current_db_orders,
+            {'2': 'details'},
+        )
+
+        self.db_orders[0].was_partially_eaten.assert_called_once_with('details')
+        self.db_orders[1].was_partially_eaten.called.should.equal(False)
+        self.coordinator._get_orders_by_order_ids.call_count.should.equal(1)
+
+
+@mock.patch('gryphon.execution.harness.harness.DatumRecorder')
+class TestParallelAudits(unittest.TestCase):
+    def setUp(self):
+        self.calls = mock.Mock()
+
+        self.harness = Harness.__new__(Harness)
+        self.harness.parallel_audits = True
+        self.harness.audit_types = auditing.ALL_AUDITS
+        self.harness._audit_executor = None
+        self.harness.strategy = mock.Mock(target_exchanges=[])
+
+        self.bitstamp = self.mock_exchange('BITSTAMP_BTC_USD')
+        self.kraken = self.mock_exchange('KRAKEN_BTC_EUR')
+
+        self.harness._coordinators = OrderedDict([
+            ('bitstamp_btc_usd', self.bitstamp),
+            ('kraken_btc_eur', self.kraken),
+        ])
+
+    def mock_exchange(self, name):
+        exchange = mock.Mock()
+        exchange.name = name
+        exchange.is_active = True
+        exchange.is_tradable = True
+
+        exchange.exchange_wrapper.get_order_audit_data.return_value = {'1': name}
+        exchange.exchange_wrapper.get_balance.return_value = {'BTC': name}
+
+        self.calls.attach_mock(exchange, name)
+
+        return exchange
+
+    def test_audits_get_prefetched_data(self, mock_recorder):
+        self.harness.full_audit(wind_down=False)
+
+        for exchange in [self.bitstamp, self.kraken]:
+            audit_data = exchange.audit.call_args[1]['audit_data']
+
+            audit_data.order_audit_data.should.equal({'1': exchange.name})
+            audit_data.exchange_balance.should.equal({'BTC': exchange.name})
+
+        mock_recorder.return_value.record.call_count.should.equal(2)
+        self.harness.audit_executor.should.be(self.harness._audit_executor)
+
+    def test_pre_audit_before_fetching(self, mock_recorder):
+        self.harness.full_audit(wind_down=False)
+
+        call_names = [c[0] for c in self.calls.mock_calls]
+
+        last_pre_audit = call_names.index('KRAKEN_BTC_EUR.exchange_wrapper.pre_audit')
+
+        last_pre_audit.should.be.lower_than(call_names.index('BITSTAMP_BTC_USD.audit'))
+
+        call_names.index('BITSTAMP_BTC_USD.audit').should.be.lower_than(
+            call_names.index('KRAKEN_BTC_EUR.audit'),
+        )
+
+    def test_position_tracker_reconciled_once(self, mock_recorder):
+        self.harness.audit_types = auditing.ALL_AUDITS + [auditing.POSITION_CACHE_AUDIT]
+
+        self.harness.full_audit(wind_down=False)
+
+        self.harness.strategy.position_tracker.reconcile.assert_called_once_with()
+
+    def test_position_tracker_not_reconciled_without_position_audit(self, mock_recorder):
+        self.harness.full_audit(wind_down=False)
+
+        self.harness.strategy.position_tracker.reconcile.called.should.equal(False)
+
+    def test_failed_fetch_falls_back(self, mock_recorder):
+        self.kraken.exchange_wrapper.get_balance.side_effect = Exception('timeout')
+
+        self.harness.full_audit(wind_down=False)
+
+        audit_data = self.kraken.audit.call_args[1]['audit_data']
+
+        audit_data.order_audit_data.should.equal(None)
+        audit_data.exchange_balance.should.equal(None)
+
+
+@mock.patch('gryphon.execution.harness.harness.DatumRecorder')
+@mock.patch('gryphon.lib.forex.USDCurrencyConverter._all_rates')
+class TestFXSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.harness = Harness.__new__(Harness)
+        self.harness._fx_snapshot = None
+        self.harness.pinned_fx_snapshot = None
+
+    def test_reused_within_a_tick(self, mock_rates, mock_recorder):
+        snapshot = self.harness.fx_snapshot
+
+        self.harness.fx_snapshot.should.be(snapshot)
+
+    def test_not_fetched_until_needed(self, mock_rates, mock_recorder):
+        snapshot = self.harness.fx_snapshot
+
+        Money('1', 'USD').to('USD', fx_snapshot=snapshot)
+        mock_rates.called.should.equal(False)
+
+        mock_rates.return_value = {'USD': Decimal('1'), 'CAD': Decimal('2')}
+
+        Money('1', 'USD').to('CAD', fx_snapshot=snapshot).should.equal(Money('2', 'CAD'))
+        mock_rates.call_count.should.equal(1)
+
+    @mock.patch('gryphon.lib.forex.USDCurrencyConverter.rate')
+    def test_misses_recorded(self, mock_rate, mock_rates, mock_recorder):
+        mock_rates.return_value = {'USD': Decimal('1')}
+        mock_rate.return_value = Decimal('2')
+
+        self.harness.fx_snapshot.rate('CAD')
+        self.harness.discard_fx_snapshot()
+
+        mock_recorder.return_value.record.assert_called_once_with(
+            'FX_SNAPSHOT_MISSES',
+            numeric_value=1,
+        )
+
+        self.harness._fx_snapshot.should.equal(None)
+
+    def test_staleness_recorded(self, mock_rates, mock_recorder):
+        stale_snapshot = FXSnapshot({'USD': Decimal('1')}, timestamp=0)
+        self.harness._fx_snapshot = stale_snapshot
+
+        self.harness.fx_snapshot.shouldnt.be(stale_snapshot)
+
+        record_args = mock_recorder.return_value.record.call_args
+        record_args[0].should.equal(('FX_SNAPSHOT_STALE_AGE',))
+        record_args[1]['numeric_value'].should.be.greater_than(60)
+
+    def test_pinned(self, mock_rates, mock_recorder):
+        pinned = FXSnapshot({'USD': Decimal('1')}, timestamp=0, pinned=True)
+        self.harness.pinned_fx_snapshot = pinned
+
+        self.harness.fx_snapshot.should.be(pinned)
+        mock_recorder.return_value.record.called.should.equal(False)
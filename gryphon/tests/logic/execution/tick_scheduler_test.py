@@ -0,0 +1,87 @@
+import pyximport; pyximport.install()
+
+import time
+import unittest
+import mock
+import sure
+
+from gryphon.execution.lib.tick_scheduler import TickScheduler
+
+
+class TestTickScheduler(unittest.TestCase):
+    def setUp(self):
+        self.pubsub = mock.Mock()
+        self.pubsub.get_message.return_value = None
+
+        self.redis_client = mock.Mock()
+        self.redis_client.pubsub.return_value = self.pubsub
+
+        self.scheduler = TickScheduler(
+            ['BITSTAMP_BTC_USD', 'KRAKEN_BTC_EUR'],
+            min_interval=0.05,
+            max_interval=0.3,
+            redis_client=self.redis_client,
+        )
+
+    def test_subscribes_to_target_exchanges(self):
+        self.scheduler.wait_for_next_tick(time.time() - 1)
+
+        self.pubsub.subscribe.assert_called_once_with(
+            'bitstamp_btc_usd_orderbook_updates',
+            'kraken_btc_eur_orderbook_updates',
+        )
+
+    def test_wakes_on_update(self):
+        self.pubsub.get_message.side_effect = [{'data': '1'}, None]
+
+        start = time.time()
+        woken_by_update = self.scheduler.wait_for_next_tick(start)
+
+        woken_by_update.should.equal(True)
+        (time.time() - start).should.be.lower_than(0.3)
+        self.scheduler.update_count.should.equal(1)
+
+    def test_min_interval(self):
+        self.pubsub.get_message.side_effect = [{'data': '1'}, None]
+
+        start = time.time()
+        self.scheduler.wait_for_next_tick(start)
+
+        (time.time() - start).should.be.greater_than_or_equal_to(0.05)
+
+    def test_drains_queued_updates(self):
+        self.pubsub.get_message.side_effect = [{'data': '1'}, {'data': '2'}, None]
+
+        self.scheduler.wait_for_next_tick(time.time())
+
+        self.pubsub.get_message.call_count.should.equal(3)
+
+    def test_timer_fallback(self):
+        start = time.time()
+        woken_by_update = self.scheduler.wait_for_next_tick(start)
+
+        woken_by_update.should.equal(False)
+        (time.time() - start).should.be.greater_than_or_equal_to(0.3)
+        self.scheduler.timer_count.should.equal(1)
+
+    def test_redis_unavailable(self):
+        self.redis_client.pubsub.side_effect = Exception('Connection refused')
+
+        start = time.time()
+        self.scheduler.wait_for_next_tick(start).should.equal(False)
+
+        (time.time() - start).should.be.greater_than_or_equal_to(0.3)
+
+    def test_lost_subscription(self):
+        self.pubsub.get_message.side_effect = Exception('Connection reset')
+
+        self.scheduler.wait_for_next_tick(time.time()).should.equal(False)
+
+        self.scheduler.pubsub.should.equal(None)
+        self.pubsub.close.called.should.equal(True)
+
+    def test_should_stop(self):
+        start = time.time()
+        self.scheduler.wait_for_next_tick(start, should_stop=lambda: True)
+
+        (time.time() - start).should.be.lower_than(0.3)
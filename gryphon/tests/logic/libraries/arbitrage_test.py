@@ -12,11 +12,13 @@ import pyximport; pyximport.install()
 import gryphon.lib; gryphon.lib.prepare()
 
 import unittest
+import mock
 import sure
 
 from cdecimal import Decimal, ROUND_TRUNC
 
 from gryphon.lib import arbitrage
+from gryphon.lib.forex import FXSnapshot
 from gryphon.lib.models.emeraldhavoc.orderbook import Orderbook
 from gryphon.lib.money import Money
 from gryphon.lib.exchange.bitstamp_btc_usd import BitstampBTCUSDExchange
@@ -254,6 +256,30 @@ class TestArbLib(unittest.TestCase):
         result.volume.should.equal(Money('1', 'ETH'))
         result.revenue.should.equal(Money('1', 'BTC'))
 
+    def test_basic_different_price_currencies(self):
+        """
+        The same as test_basic, but OB2 is priced in CAD at 2 CAD to the USD.
+        """
+        fx_snapshot = FXSnapshot({'USD': Decimal('1'), 'CAD': Decimal('2')})
+
+        ex = self.bitstamp
+        ex.currency = 'CAD'
+        volume = Money('1', 'BTC')
+
+        cad_ob = {
+            'bids': [Order(Money('1200', 'CAD'), volume, ex, Consts.BID)],
+            'asks': [Order(Money('1202', 'CAD'), volume, ex, Consts.ASK)],
+        }
+
+        result = arbitrage.detect_cross(
+            self.basic_ob_1(),
+            cad_ob,
+            fx_snapshot=fx_snapshot,
+        )
+
+        result.volume.should.equal(Money('1', 'BTC'))
+        result.revenue.should.equal(Money('1', 'USD'))
+
     def test_basic_crypto_crypto_unprofitable(self):
         """
         OB1 has a bid at 600 and OB2 has an ask at 599, both at 1btc. These should cross
@@ -833,3 +859,55 @@ class TestArbLib(unittest.TestCase):
         crosses[-1].volume.should.equal(Money('1', 'BTC'))
         crosses[-1].revenue.should.equal(Money('0.75', 'USD'))
 
+    def test_scanner_prunes_pairs(self):
+        """
+        basic_ob_1 and basic_ob_2 only cross in one direction, and neither crosses
+        itself, so only one directional walk should be needed.
+        """
+        orderbooks = [self.basic_ob_2(), self.basic_ob_1()]
+
+        with mock.patch.object(
+                arbitrage,
+                'detect_directional_cross',
+                wraps=arbitrage.detect_directional_cross) as patched_detect:
+            crosses = arbitrage.detect_crosses_between_many_orderbooks(orderbooks)
+
+        len(crosses).should.equal(1)
+        patched_detect.call_count.should.equal(1)
+
+    def test_scanner_incremental_update(self):
+        scanner = arbitrage.CrossScanner()
+
+        scanner.update_orderbook('bitstamp', self.basic_ob_2())
+        scanner.update_orderbook('itbit', self.basic_ob_1())
+
+        len(scanner.crosses()).should.equal(1)
+
+        # Move itbit's asks above bitstamp's best bid.
+        no_cross_ob = self.basic_ob_1()
+        no_cross_ob['asks'] = no_cross_ob['asks'][1:]
+
+        with mock.patch.object(
+                arbitrage,
+                'detect_directional_cross',
+                wraps=arbitrage.detect_directional_cross) as patched_detect:
+            scanner.update_orderbook('itbit', no_cross_ob)
+
+        scanner.crosses().should.equal([])
+        patched_detect.call_count.should.equal(0)
+
+        scanner.update_orderbook('itbit', self.basic_ob_1())
+        scanner.crosses()[0].revenue.should.equal(Money('1', 'USD'))
+
+        scanner.remove_orderbook('itbit')
+        scanner.crosses().should.equal([])
+
+    def test_scanner_mismatched_volume_currencies(self):
+        scanner = arbitrage.CrossScanner()
+
+        scanner.update_orderbook('bitstamp', self.basic_ob_2())
+
+        scanner.update_orderbook.when.called_with(
+            'itbit',
+            self.basic_ob_1(vol_currency='ETH'),
+        ).should.throw(arbitrage.MismatchedVolumeCurrenciesError)
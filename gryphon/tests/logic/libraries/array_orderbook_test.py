@@ -0,0 +1,124 @@
+"""
+Tests that the metrics give the same answers for an ArrayOrderbook as they do for the
+same orderbook in the plain dict-of-lists format.
+"""
+
+import pyximport; pyximport.install()
+
+import unittest
+import sure
+
+from gryphon.lib.array_orderbook import ArrayOrderbook
+from gryphon.lib.exchange.bitstamp_btc_usd import BitstampBTCUSDExchange
+from gryphon.lib.exchange.consts import Consts
+from gryphon.lib.exchange.exchange_order import Order
+from gryphon.lib.metrics import midpoint as midpoint_lib
+from gryphon.lib.metrics import orderbook_strength
+from gryphon.lib.metrics import quote as quote_lib
+from gryphon.lib.metrics import volume_available
+from gryphon.lib.money import Money
+
+
+class TestArrayOrderbook(unittest.TestCase):
+    def setUp(self):
+        self.exchange = BitstampBTCUSDExchange()
+
+        bids = [
+            ('604.31', '4.206'),
+            ('604.30', '3'),
+            ('604.25', '2.765'),
+            ('604.24', '3.439'),
+            ('604.00', '1.82278003'),
+            ('603.98', '4.83394284'),
+        ]
+
+        asks = [
+            ('605.37', '0.82039084'),
+            ('605.41', '1.07069908'),
+            ('605.47', '1.01762788'),
+            ('605.50', '10'),
+            ('606.19', '16.932'),
+        ]
+
+        self.bids = [self.order(p, v, Consts.BID) for p, v in bids]
+        self.asks = [self.order(p, v, Consts.ASK) for p, v in asks]
+
+        self.dict_book = {'bids': self.bids, 'asks': self.asks}
+        self.array_book = ArrayOrderbook(list(self.bids), list(self.asks))
+
+    def order(self, price, volume, order_type):
+        return Order(Money(price, 'USD'), Money(volume, 'BTC'), self.exchange, order_type)
+
+    def test_is_an_orderbook(self):
+        self.array_book['bids'].should.equal(self.bids)
+        self.array_book['asks'].should.equal(self.asks)
+        self.array_book.get('asks').should.equal(self.asks)
+
+    def test_price_quote(self):
+        for mode in [Consts.BID, Consts.ASK]:
+            for volume in ['0', '0.5', '0.82039084', '1', '5', '13.6']:
+                volume = Money(volume, 'BTC')
+
+                quote_lib.price_quote_from_orderbook(
+                    self.array_book,
+                    mode,
+                    volume,
+                ).should.equal(
+                    quote_lib.price_quote_from_orderbook(self.dict_book, mode, volume),
+                )
+
+    def test_price_quote_not_enough_liquidity(self):
+        quote_lib.price_quote_from_orderbook.when.called_with(
+            self.array_book,
+            Consts.BID,
+            Money('100', 'BTC'),
+        ).should.throw(Exception, 'not enough liquidity')
+
+    def test_midpoint(self):
+        depth = Money('5', 'BTC')
+
+        midpoint_lib.get_midpoint_from_orderbook(self.array_book, depth).should.equal(
+            midpoint_lib.get_midpoint_from_orderbook(self.dict_book, depth),
+        )
+
+    def test_volume_available_at_price(self):
+        for mode in [Consts.BID, Consts.ASK]:
+            for price in ['600', '604.25', '604.26', '605.41', '605.5', '700']:
+                price = Money(price, 'USD')
+
+                volume_available.volume_available_at_price(
+                    mode,
+                    price,
+                    self.array_book,
+                ).should.equal(
+                    volume_available.volume_available_at_price(
+                        mode,
+                        price,
+                        self.dict_book,
+                    ),
+                )
+
+    def test_strength_at_slippages(self):
+        slippages = [Money(s, 'USD') for s in ['0.01', '0.1', '0.5', '1', '5']]
+
+        for mode in [Consts.BID, Consts.ASK]:
+            orderbook_strength.orderbook_strength_at_slippages(
+                self.array_book,
+                mode,
+                slippages,
+            ).should.equal(
+                orderbook_strength.orderbook_strength_at_slippages(
+                    self.dict_book,
+                    mode,
+                    slippages,
+                ),
+            )
+
+    def test_assigning_a_side_rebuilds_it(self):
+        self.array_book['asks'] = self.asks[2:]
+
+        quote_lib.price_quote_from_orderbook(
+            self.array_book,
+            Consts.BID,
+            Money('1', 'BTC'),
+        )['price_for_order'].should.equal(Money('605.47', 'USD'))
@@ -0,0 +1,131 @@
+import pyximport; pyximport.install()
+
+from itertools import combinations
+import random
+import unittest
+import sure
+import mock
+
+from cdecimal import Decimal
+
+from gryphon.lib import deposit_matching
+from gryphon.lib.models.exchange import Exchange
+from gryphon.lib.models.transaction import Transaction
+from gryphon.lib.money import Money
+
+
+def exhaustive_match(amounts, target, tolerance):
+    """
+    The search Exchange.deposit_landed used to do.
+    """
+    for size in range(1, len(amounts) + 1):
+        for combination in combinations(range(len(amounts)), size):
+            total = sum(amounts[i] for i in combination)
+
+            if abs(total - target) <= tolerance:
+                return combination
+
+    return None
+
+
+class TestDepositMatching(unittest.TestCase):
+    def test_single(self):
+        amounts = [Decimal('1'), Decimal('2.5'), Decimal('3')]
+
+        match, stats = deposit_matching.find_matching_subset(amounts, Decimal('2.5'))
+
+        match.should.equal((1,))
+
+    def test_smallest_combination_first(self):
+        amounts = [Decimal('1'), Decimal('2'), Decimal('3')]
+
+        match, stats = deposit_matching.find_matching_subset(amounts, Decimal('3'))
+
+        match.should.equal((2,))
+
+    def test_tolerance(self):
+        amounts = [Decimal('1.001'), Decimal('2.002')]
+
+        match, stats = deposit_matching.find_matching_subset(
+            amounts,
+            Decimal('3'),
+            Decimal('0.01'),
+        )
+
+        match.should.equal((0, 1))
+
+    def test_no_match(self):
+        amounts = [Decimal('1'), Decimal('2')]
+
+        match, stats = deposit_matching.find_matching_subset(amounts, Decimal('4'))
+
+        match.should.equal(None)
+        stats.budget_exceeded.should.equal(False)
+
+    def test_matches_exhaustive_search(self):
+        rand = random.Random(0)
+
+        for trial in range(200):
+            amounts = [
+                Decimal(rand.randint(1, 5000)) / 100
+                for i in range(rand.randint(0, 9))
+            ]
+
+            if amounts and rand.random() < 0.7:
+                picks = rand.sample(amounts, rand.randint(1, len(amounts)))
+                target = sum(picks)
+            else:
+                target = Decimal(rand.randint(1, 20000)) / 100
+
+            tolerance = rand.choice([Decimal('0'), Decimal('0.01'), Decimal('0.5')])
+
+            match, stats = deposit_matching.find_matching_subset(
+                amounts,
+                target,
+                tolerance,
+            )
+
+            match.should.equal(exhaustive_match(amounts, target, tolerance))
+
+    def test_time_budget(self):
+        amounts = [Decimal(2 ** i) for i in range(20)]
+
+        match, stats = deposit_matching.find_matching_subset(
+            amounts,
+            Decimal('0.5'),
+            time_budget=-1,
+        )
+
+        match.should.equal(None)
+        stats.budget_exceeded.should.equal(True)
+
+
+class TestDepositLanded(unittest.TestCase):
+    def deposit(self, amount, fee=None):
+        deposit = mock.Mock()
+        deposit.amount = Money(amount, 'BTC')
+        deposit.fee = Money(fee, 'BTC') if fee else None
+        deposit.transaction_id = 1
+
+        return deposit
+
+    @mock.patch('gryphon.lib.models.exchange.DatumRecorder')
+    def test_deposit_landed(self, mock_recorder):
+        exchange = Exchange('TEST')
+        deposits = [self.deposit('1'), self.deposit('2', fee='0.1'), self.deposit('3')]
+
+        with mock.patch.object(Exchange, 'pending_deposits', return_value=deposits):
+            exchange.deposit_landed(Money('1.9', 'BTC')).should.equal(True)
+            exchange.deposit_landed(Money('10', 'BTC')).should.equal(False)
+
+        record = mock_recorder.return_value.record
+        record.call_count.should.equal(2)
+
+        args, kwargs = record.call_args
+        args[0].should.equal('DEPOSIT_MATCH_TIME_TEST')
+        kwargs['meta_data']['pending_deposits'].should.equal(3)
+        kwargs['meta_data']['budget_exceeded'].should.equal(False)
+
+        deposits[1].complete.assert_called_once_with()
+        deposits[0].complete.called.should.equal(False)
+        deposits[2].complete.called.should.equal(False)
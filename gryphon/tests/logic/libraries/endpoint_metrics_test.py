@@ -0,0 +1,112 @@
+import pyximport; pyximport.install()
+
+import datetime
+import unittest
+import sure
+import mock
+
+from gryphon.execution.lib import tick_profiling
+from gryphon.lib.exchange import endpoint_metrics
+from gryphon.lib.exchange import exceptions
+from gryphon.lib.exchange.bitstamp_btc_usd import BitstampBTCUSDExchange
+
+
+class TestEndpointMetrics(unittest.TestCase):
+    def setUp(self):
+        endpoint_metrics.drain_endpoint_stats()
+
+    def tearDown(self):
+        endpoint_metrics.drain_endpoint_stats()
+        tick_profiling.endpoint_histograms.clear()
+
+    def test_endpoint_stats(self):
+        stats = endpoint_metrics.EndpointStats()
+
+        stats.record(0.02)
+        stats.record(0.3)
+        stats.record(20, error=True)
+        stats.record(None, error=True)
+
+        stats.count.should.equal(4)
+        stats.error_count.should.equal(2)
+        stats.max_latency.should.equal(20)
+        stats.histogram[0].should.equal(1)
+        stats.histogram[3].should.equal(1)
+        stats.histogram[-1].should.equal(1)
+        stats.mean_latency.should.equal((0.02 + 0.3 + 20) / 3)
+
+    def test_drain(self):
+        endpoint_metrics.record_endpoint_call('BITSTAMP_BTC_USD', 'get_ticker', 0.1)
+        endpoint_metrics.record_endpoint_call('BITSTAMP_BTC_USD', 'get_ticker', 0.3)
+
+        stats = endpoint_metrics.drain_endpoint_stats()
+
+        stats[('BITSTAMP_BTC_USD', 'get_ticker')].count.should.equal(2)
+        endpoint_metrics.drain_endpoint_stats().should.equal({})
+
+    def test_req_tags_future(self):
+        session = mock.MagicMock()
+        exchange = BitstampBTCUSDExchange(session=session)
+
+        future = exchange.req('get', '/ticker/', no_auth=True, endpoint='get_ticker')
+
+        future.endpoint.should.equal('get_ticker')
+        session.get.call_args[1].shouldnt.have.key('endpoint')
+
+    def test_resp_records_latency(self):
+        exchange = BitstampBTCUSDExchange()
+
+        req = mock.MagicMock()
+        req.endpoint = 'get_ticker'
+        req.result.return_value.text = '{}'
+        req.result.return_value.json.return_value = {}
+        req.result.return_value.elapsed = datetime.timedelta(seconds=0.25)
+
+        exchange.resp(req)
+
+        stats = endpoint_metrics.drain_endpoint_stats()
+        ticker_stats = stats[(exchange.name, 'get_ticker')]
+
+        ticker_stats.count.should.equal(1)
+        ticker_stats.error_count.should.equal(0)
+        ticker_stats.mean_latency.should.equal(0.25)
+
+    def test_resp_records_errors(self):
+        exchange = BitstampBTCUSDExchange()
+
+        req = mock.MagicMock()
+        req.endpoint = 'get_ticker'
+        req.result.return_value.text = 'not json'
+        req.result.return_value.json.side_effect = ValueError
+        req.result.return_value.elapsed = datetime.timedelta(seconds=1)
+
+        exchange.resp.when.called_with(req).should.throw(
+            exceptions.ExchangeAPIFailureException,
+        )
+
+        stats = endpoint_metrics.drain_endpoint_stats()
+
+        stats[(exchange.name, 'get_ticker')].error_count.should.equal(1)
+
+    @mock.patch.object(tick_profiling, 'ENDPOINT_LATENCY_SAMPLE_SIZE', 3)
+    @mock.patch.object(tick_profiling, 'DatumRecorder')
+    def test_record_histogram(self, recorder):
+        endpoint_metrics.record_endpoint_call('BITSTAMP_BTC_USD', 'get_ticker', 0.02)
+        endpoint_metrics.record_endpoint_call('BITSTAMP_BTC_USD', 'get_ticker', 0.3)
+        tick_profiling.record_endpoint_data('arb')
+
+        recorder.return_value.record.called.should.equal(False)
+
+        endpoint_metrics.record_endpoint_call('BITSTAMP_BTC_USD', 'get_ticker', 20)
+        tick_profiling.record_endpoint_data('arb')
+
+        recorder.return_value.record.assert_called_once_with(
+            'ARB_API_LATENCY_HISTOGRAM_BITSTAMP_BTC_USD_GET_TICKER',
+            numeric_value=20,
+            meta_data={
+                'bucket_bounds': list(endpoint_metrics.LATENCY_BUCKETS),
+                'bucket_counts': [1, 0, 0, 1, 0, 0, 0, 0, 1],
+            },
+        )
+
+        tick_profiling.endpoint_histograms.should.equal({})
@@ -0,0 +1,63 @@
+import pyximport; pyximport.install()
+
+import unittest
+import sure
+import mock
+
+from gryphon.lib.exchange import exchange_factory
+from gryphon.lib.exchange import session_pool
+from gryphon.lib.exchange.consts import Consts
+from gryphon.lib.models.order import Order
+from gryphon.lib.money import Money
+
+
+class TestSharedExchanges(unittest.TestCase):
+    def setUp(self):
+        self.patches = [
+            mock.patch.object(exchange_factory, '_shared_exchanges', {}),
+            mock.patch.object(session_pool, '_sessions', {}),
+        ]
+
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+
+    def test_one_wrapper_per_exchange(self):
+        exchange = exchange_factory.shared_exchange_from_key('bitstamp_btc_usd')
+
+        exchange_factory.shared_exchange_from_key('BITSTAMP_BTC_USD')\
+            .should.be(exchange)
+
+        exchange_factory.shared_exchange_from_key('gemini_btc_usd')\
+            .shouldnt.be(exchange)
+
+        exchange_factory.make_exchange_from_key('bitstamp_btc_usd')\
+            .shouldnt.be(exchange)
+
+    def test_no_session_until_used(self):
+        exchange_factory.shared_exchange_from_key('bitstamp_btc_usd')
+
+        session_pool._sessions.should.equal({})
+
+    def test_orders_share_wrappers(self):
+        orders = [
+            Order(
+                'Test',
+                Consts.BID,
+                Money('1', 'BTC'),
+                Money('100', 'USD'),
+                exchange_factory.make_exchange_from_key('bitstamp_btc_usd'),
+                None,
+            )
+            for i in range(2)
+        ]
+
+        # Orders loaded from the database only have the exchange name.
+        for order in orders:
+            del order._exchange
+
+        orders[0].exchange.should.be(orders[1].exchange)
+        orders[0].exchange.name.should.equal('BITSTAMP_BTC_USD')
@@ -0,0 +1,365 @@
+import pyximport; pyximport.install()
+import gryphon.lib; gryphon.lib.prepare()
+
+from datetime import datetime, timedelta
+import unittest
+import sure
+
+import pytz
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from gryphon.lib import assets
+from gryphon.lib.exchange.bitstamp_btc_usd import BitstampBTCUSDExchange
+from gryphon.lib.models.base import Base
+from gryphon.lib.models.datum import Datum
+from gryphon.lib.models.exchange import Exchange as ExchangeData
+from gryphon.lib.models.exchange import Position
+from gryphon.lib.models.ledger_checkpoint import LedgerCheckpoint
+from gryphon.lib.models.order import Order
+from gryphon.lib.models.trade import Trade
+from gryphon.lib.models.transaction import Transaction
+from gryphon.lib.money import Money
+
+
+def separate_query_ledger_balance(db, start_time=None, end_time=None, include_pending=False, exchange_names=[]):
+    """
+    The ledger balance the way it was calculated before, with one query per field.
+    """
+    exchange_ids = [
+        db.query(ExchangeData).filter(ExchangeData.name == name).one().exchange_id
+        for name in exchange_names
+    ]
+
+    trade_kwargs = {
+        'start_time': start_time,
+        'end_time': end_time,
+        'exchange_names': exchange_names,
+    }
+
+    transaction_kwargs = {
+        'start_time': start_time,
+        'end_time': end_time,
+        'include_pending': include_pending,
+        'exchange_ids': exchange_ids,
+    }
+
+    positive_position = sum([
+        assets.trade_position_query(
+            db, Trade._volume, Trade._volume_currency, Trade.BID, **trade_kwargs
+        ),
+        assets.trade_position_query(
+            db, Trade._price, Trade._price_currency, Trade.ASK, **trade_kwargs
+        ),
+        assets.transaction_position_query(
+            db,
+            Transaction._amount,
+            Transaction._amount_currency,
+            Transaction.DEPOSIT,
+            **transaction_kwargs
+        ),
+    ], Position())
+
+    negative_position = sum([
+        assets.trade_position_query(
+            db, Trade._price, Trade._price_currency, Trade.BID, **trade_kwargs
+        ),
+        assets.trade_position_query(
+            db, Trade._volume, Trade._volume_currency, Trade.ASK, **trade_kwargs
+        ),
+        assets.trade_position_query(
+            db, Trade._fee, Trade._fee_currency, **trade_kwargs
+        ),
+        assets.transaction_position_query(
+            db,
+            Transaction._amount,
+            Transaction._amount_currency,
+            Transaction.WITHDRAWL,
+            **transaction_kwargs
+        ),
+        assets.transaction_position_query(
+            db, Transaction._fee, Transaction._fee_currency, **transaction_kwargs
+        ),
+    ], Position())
+
+    return positive_position - negative_position
+
+
+class TestLedgerBalance(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine('sqlite://')
+        Base.metadata.create_all(engine)
+
+        self.db = sessionmaker(bind=engine)()
+        self.day = datetime(2018, 6, 1, tzinfo=pytz.utc)
+
+        self.bitstamp = ExchangeData(u'BITSTAMP_BTC_USD')
+        self.kraken = ExchangeData(u'KRAKEN_BTC_EUR')
+        self.db.add_all([self.bitstamp, self.kraken])
+
+        self.add_transaction(
+            self.bitstamp,
+            Transaction.DEPOSIT,
+            Money('10000', 'USD'),
+            self.day,
+        )
+
+        self.add_transaction(
+            self.bitstamp,
+            Transaction.DEPOSIT,
+            Money('5', 'BTC'),
+            self.day + timedelta(hours=1),
+            fee=Money('0.125', 'BTC'),
+        )
+
+        self.add_trade(Trade.BID, '600', '1', '1.5', self.day + timedelta(hours=2))
+        self.add_trade(Trade.ASK, '610', '2', '1.5', self.day + timedelta(hours=3))
+        self.add_trade(
+            Trade.ASK,
+            '620',
+            '0.25',
+            '0.5',
+            self.day + timedelta(days=1, minutes=30),
+        )
+
+        self.add_transaction(
+            self.bitstamp,
+            Transaction.WITHDRAWL,
+            Money('1000', 'USD'),
+            self.day + timedelta(days=1, hours=1),
+            fee=Money('5', 'USD'),
+        )
+
+        self.add_transaction(
+            self.bitstamp,
+            Transaction.WITHDRAWL,
+            Money('1', 'BTC'),
+            self.day + timedelta(days=1, hours=2),
+            status=Transaction.IN_TRANSIT,
+        )
+
+        self.add_transaction(
+            self.kraken,
+            Transaction.DEPOSIT,
+            Money('500', 'EUR'),
+            self.day,
+        )
+
+        self.db.commit()
+
+    def tearDown(self):
+        self.db.close()
+
+    def add_trade(self, trade_type, price, fee, volume, time_created):
+        order = Order(
+            u'Multi',
+            trade_type,
+            Money(volume, 'BTC'),
+            Money(price, 'USD'),
+            BitstampBTCUSDExchange(),
+            None,
+        )
+
+        # Trades store the total price of the trade.
+        trade = Trade(
+            trade_type,
+            Money(price, 'USD') * Money(volume, 'BTC').amount,
+            Money(fee, 'USD'),
+            Money(volume, 'BTC'),
+            None,
+            order,
+        )
+
+        trade.time_created = time_created
+        self.db.add_all([order, trade])
+
+    def add_transaction(self, exchange_data, transaction_type, amount, time_completed, fee=None, status=Transaction.COMPLETED):
+        transaction = Transaction(
+            transaction_type,
+            status,
+            amount,
+            exchange_data,
+            {},
+            fee=fee,
+        )
+
+        transaction.time_created = time_completed
+        transaction.time_completed = time_completed
+        self.db.add(transaction)
+
+    def test_current_balance(self):
+        balance = assets.ledger_balance(self.db, exchange_names=['BITSTAMP_BTC_USD'])
+
+        balance.should.equal(Position({
+            'USD': Money('9000', 'USD') - Money('900', 'USD') + Money('915', 'USD')
+                + Money('310', 'USD') - Money('3.25', 'USD') - Money('5', 'USD'),
+            'BTC': Money('5', 'BTC') - Money('0.125', 'BTC') + Money('1.5', 'BTC')
+                - Money('1.5', 'BTC') - Money('0.5', 'BTC'),
+        }))
+
+    def test_matches_separate_queries(self):
+        day_end = self.day + timedelta(days=1)
+
+        for kwargs in [
+                {},
+                {'include_pending': True},
+                {'end_time': day_end},
+                {'start_time': day_end},
+                {'start_time': day_end, 'include_pending': True},
+                {'exchange_names': ['BITSTAMP_BTC_USD']},
+                {'exchange_names': ['KRAKEN_BTC_EUR']},
+                {'exchange_names': ['BITSTAMP_BTC_USD', 'KRAKEN_BTC_EUR']},
+                ]:
+            assets.ledger_balance(self.db, **kwargs).should.equal(
+                separate_query_ledger_balance(self.db, **kwargs),
+            )
+
+    def test_keeps_currencies_that_net_out(self):
+        balance = assets.ledger_balance(
+            self.db,
+            end_time=self.day + timedelta(hours=3),
+            exchange_names=['BITSTAMP_BTC_USD'],
+        )
+
+        balance.keys().should.contain('BTC')
+        balance['BTC'].should.equal(Money('5', 'BTC') - Money('0.125', 'BTC'))
+
+        balance = assets.ledger_balance(
+            self.db,
+            start_time=self.day + timedelta(hours=1, minutes=30),
+            end_time=self.day + timedelta(hours=3),
+            exchange_names=['BITSTAMP_BTC_USD'],
+        )
+
+        balance.keys().should.contain('BTC')
+        balance['BTC'].should.equal(Money('0', 'BTC'))
+
+    def test_checkpoints(self):
+        day_end = self.day + timedelta(days=1)
+        names = ['BITSTAMP_BTC_USD', 'KRAKEN_BTC_EUR']
+
+        checkpoint = assets.create_ledger_checkpoint(
+            self.db,
+            u'BITSTAMP_BTC_USD',
+            day_end,
+        )
+
+        self.db.commit()
+
+        checkpoint.balance.should.equal(assets.ledger_balance(
+            self.db,
+            end_time=day_end,
+            exchange_names=['BITSTAMP_BTC_USD'],
+        ))
+
+        assets.ledger_balance(
+            self.db,
+            exchange_names=names,
+            use_checkpoints=True,
+        ).should.equal(assets.ledger_balance(self.db, exchange_names=names))
+
+        # The checkpoint is from after end_time, so it isn't used.
+        assets.ledger_balance(
+            self.db,
+            end_time=self.day + timedelta(hours=2),
+            exchange_names=names,
+            use_checkpoints=True,
+        ).should.equal(assets.ledger_balance(
+            self.db,
+            end_time=self.day + timedelta(hours=2),
+            exchange_names=names,
+        ))
+
+    def test_checkpoints_are_used(self):
+        day_end = self.day + timedelta(days=1)
+
+        checkpoint = LedgerCheckpoint(
+            u'BITSTAMP_BTC_USD',
+            day_end,
+            Position({'USD': Money('1', 'USD')}),
+        )
+
+        self.db.add(checkpoint)
+        self.db.commit()
+
+        balance = assets.ledger_balance(
+            self.db,
+            exchange_names=['BITSTAMP_BTC_USD'],
+            use_checkpoints=True,
+        )
+
+        balance.should.equal(Position({
+            'USD': Money('1', 'USD') - Money('5', 'USD') - Money('1000', 'USD')
+                + Money('310', 'USD') - Money('0.25', 'USD'),
+            'BTC': Money('-0.5', 'BTC'),
+        }))
+
+        # Checkpoints are kept separately for include_pending.
+        LedgerCheckpoint.nearest(
+            self.db,
+            u'BITSTAMP_BTC_USD',
+            include_pending=True,
+        ).should.equal(None)
+
+    def test_pending_checkpoint_waits_for_in_transit_transactions(self):
+        assets.create_ledger_checkpoint(
+            self.db,
+            u'BITSTAMP_BTC_USD',
+            self.day + timedelta(days=2),
+            include_pending=True,
+        ).should.equal(None)
+
+        checkpoint = assets.create_ledger_checkpoint(
+            self.db,
+            u'BITSTAMP_BTC_USD',
+            self.day + timedelta(days=1),
+            include_pending=True,
+        )
+
+        checkpoint.should_not.equal(None)
+
+    def test_daily_checkpoints(self):
+        names = ['BITSTAMP_BTC_USD']
+        settled_time = self.day + timedelta(days=3)
+
+        checkpoints = assets.create_daily_ledger_checkpoints(
+            self.db,
+            u'BITSTAMP_BTC_USD',
+            settled_time,
+        )
+
+        self.db.commit()
+
+        [c.checkpoint_time.replace(tzinfo=pytz.utc) for c in checkpoints].should.equal([
+            self.day + timedelta(days=1),
+            self.day + timedelta(days=2),
+            self.day + timedelta(days=3),
+        ])
+
+        for checkpoint in checkpoints:
+            checkpoint.balance.should.equal(assets.ledger_balance(
+                self.db,
+                end_time=checkpoint.checkpoint_time.replace(tzinfo=pytz.utc),
+                exchange_names=names,
+            ))
+
+        # Nothing left to checkpoint until more days are settled.
+        assets.create_daily_ledger_checkpoints(
+            self.db,
+            u'BITSTAMP_BTC_USD',
+            settled_time,
+        ).should.equal([])
+
+        # The in-transit withdrawal on the second day holds back pending checkpoints.
+        pending_checkpoints = assets.create_daily_ledger_checkpoints(
+            self.db,
+            u'BITSTAMP_BTC_USD',
+            settled_time,
+            include_pending=True,
+        )
+
+        len(pending_checkpoints).should.equal(1)
+        pending_checkpoints[0].checkpoint_time.replace(tzinfo=pytz.utc).should.equal(
+            self.day + timedelta(days=1),
+        )
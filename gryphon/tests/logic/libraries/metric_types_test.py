@@ -0,0 +1,41 @@
+import pyximport; pyximport.install()
+
+import unittest
+import sure
+
+from gryphon.lib.models.atlaszero import metric_types
+from gryphon.lib.models.atlaszero.metric_types import MetricTypeException
+
+
+class TestMetricTypes(unittest.TestCase):
+    def test_by_name(self):
+        metric_types.get_metric_type_int('revenue-gryphon-trades-1hr').should.equal(1)
+
+    def test_by_int(self):
+        metric_types.get_metric_type_int(5652).should.equal(5652)
+
+    def test_unknown(self):
+        metric_types.get_metric_type_int.when.called_with('not-a-metric')\
+            .should.throw(MetricTypeException)
+
+        metric_types.get_metric_type_int.when.called_with(100000)\
+            .should.throw(MetricTypeException)
+
+    def test_reverse_index(self):
+        metric_types.metric_type_names[1].should.equal('revenue-gryphon-trades-1hr')
+
+        len(metric_types.metric_type_names).should.equal(
+            len(metric_types.metric_types_map),
+        )
+
+    def test_bulk(self):
+        metric_types.get_metric_type_ints(['test', 1, 'volume-bitstamp-trades-1hr'])\
+            .should.equal([0, 1, 135])
+
+    def test_bulk_unknown(self):
+        metric_types.get_metric_type_ints.when.called_with(['test', 'a', 'b'])\
+            .should.throw(MetricTypeException, "['a', 'b']")
+
+    def test_duplicate_ints(self):
+        metric_types.build_metric_type_names.when.called_with({'a': 1, 'b': 1})\
+            .should.throw(MetricTypeException)
@@ -8,6 +8,7 @@ import mock
 from mock import patch
 from decimal import Decimal
 
+from gryphon.lib.forex import FXSnapshot
 from gryphon.lib.money import Money
 from gryphon.lib.test_helper import *
 
@@ -46,6 +47,33 @@ class TestMoney():
         expected_usd = Money(80, "USD")
         m.to("USD", exchange_rate_to_usd=rate_to_usd).should.equal(expected_usd)
 
+    def test_currency_conversion_with_fx_snapshot(self):
+        snapshot = FXSnapshot({'USD': Decimal('1'), 'CAD': Decimal('2')})
+
+        Money(100, "CAD").to("USD", fx_snapshot=snapshot).should.equal(Money(50, "USD"))
+        Money(50, "USD").to("CAD", fx_snapshot=snapshot).should.equal(Money(100, "CAD"))
+
+    @patch('gryphon.lib.forex.USDCurrencyConverter.rate')
+    def test_fx_snapshot_miss(self, patched_rate):
+        patched_rate.return_value = Decimal('0.8')
+        snapshot = FXSnapshot({'USD': Decimal('1')})
+
+        snapshot.rate('EUR').should.equal(Decimal('0.8'))
+        snapshot.rate('EUR').should.equal(Decimal('0.8'))
+
+        snapshot.miss_count.should.equal(1)
+        patched_rate.call_count.should.equal(1)
+
+    def test_pinned_fx_snapshot(self):
+        snapshot = FXSnapshot({'USD': Decimal('1')}, timestamp=0, pinned=True)
+
+        snapshot.is_stale().should.equal(False)
+        snapshot.rate.when.called_with('EUR').should.throw(KeyError)
+
+    def test_fx_snapshot_staleness(self):
+        FXSnapshot({}, timestamp=0).is_stale().should.equal(True)
+        FXSnapshot({}).is_stale().should.equal(False)
+
     def test_thousands_commas_in_numbers(self):
         m_as_int = Money(1000, "USD")
 
@@ -0,0 +1,297 @@
+import pyximport; pyximport.install()
+import gryphon.lib; gryphon.lib.prepare()
+
+from datetime import datetime, timedelta
+import unittest
+import sure
+
+from cdecimal import Decimal
+import pytz
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from gryphon.lib import orderbook_history
+from gryphon.lib.models.emeraldhavoc.base import EmeraldHavocBase
+from gryphon.lib.models.emeraldhavoc.orderbook_segment import OrderbookSegment
+
+START = 1514764800  # 2018-01-01 00:00:00 UTC.
+
+
+def book(bids, asks):
+    return {
+        'bids': [[str(p), str(v), 'x'] for p, v in bids],
+        'asks': [[str(p), str(v), 'x'] for p, v in asks],
+    }
+
+
+def levels(side):
+    return [[Decimal(str(p)), Decimal(str(v))] for p, v in side]
+
+
+BOOKS = [
+    ([(100, 1), (99.5, 2)], [(101, 1.5), (102, 3)]),
+    ([(100, 1.25), (99.5, 2)], [(101, 1.5), (102, 3)]),
+    ([(99.5, 2)], [(100.5, 0.1), (101, 1.5), (102, 3)]),
+    ([(99.5, 2), (99, 4)], [(101, 1.5)]),
+]
+
+
+class TestOrderbookHistory(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine('sqlite://')
+        EmeraldHavocBase.metadata.create_all(engine)
+        self.db = sessionmaker(bind=engine)()
+
+    def tearDown(self):
+        self.db.close()
+
+    def write_books(self, writer, exchange=u'BITSTAMP_BTC_USD', start=START, step=1):
+        books = [
+            (start + i * step, book(bids, asks))
+            for i, (bids, asks) in enumerate(BOOKS)
+        ]
+
+        writer.write(self.db, exchange, books)
+
+    def test_encode_decode(self):
+        books = [
+            orderbook_history.normalise_book(START + i, book(bids, asks))
+            for i, (bids, asks) in enumerate(BOOKS)
+        ]
+
+        data = orderbook_history.encode_segment(books)
+        decoded = list(orderbook_history.iter_segment_books(data))
+
+        len(decoded).should.equal(len(BOOKS))
+
+        for (timestamp, bids, asks), (expected_bids, expected_asks) in zip(decoded, BOOKS):
+            bids.should.equal(levels(expected_bids))
+            asks.should.equal(levels(expected_asks))
+
+        [b[0] for b in decoded].should.equal([START + i for i in range(len(BOOKS))])
+
+    def test_normalise_merges_and_sorts(self):
+        timestamp, bids, asks = orderbook_history.normalise_book(START, {
+            'bids': [['99', '1'], ['100', '1'], ['99', '0.5'], ['98', '0']],
+            'asks': [['102', '1'], ['101', '2']],
+        })
+
+        bids.should.equal([(Decimal('100'), Decimal('1')), (Decimal('99'), Decimal('1.5'))])
+        asks.should.equal([(Decimal('101'), Decimal('2')), (Decimal('102'), Decimal('1'))])
+
+    def test_bad_header(self):
+        orderbook_history.iter_segment_books('GOB\x01').next.when.called_with()\
+            .should.throw(orderbook_history.OrderbookHistoryException)
+
+    def test_segments_split_on_keyframe_interval(self):
+        writer = orderbook_history.OrderbookHistoryWriter(keyframe_interval=3)
+        self.write_books(writer)
+
+        segments = self.db.query(OrderbookSegment)\
+            .order_by(OrderbookSegment.start_time)\
+            .all()
+
+        [s.book_count for s in segments].should.equal([3, 1])
+        segments[0].start_time.should.equal(datetime(2018, 1, 1))
+        segments[0].end_time.should.equal(datetime(2018, 1, 1, 0, 0, 2))
+
+    def test_segments_split_on_partition(self):
+        writer = orderbook_history.OrderbookHistoryWriter()
+        self.write_books(writer, start=START + 3599)
+
+        [s.book_count for s in self.db.query(OrderbookSegment).all()]\
+            .should.equal([1, 3])
+
+    def test_orderbook_at(self):
+        writer = orderbook_history.OrderbookHistoryWriter(keyframe_interval=2)
+        self.write_books(writer, step=10)
+
+        orderbook_history.orderbook_at(
+            self.db,
+            u'BITSTAMP_BTC_USD',
+            datetime(2017, 12, 31, 23, 59),
+        ).should.equal(None)
+
+        ob = orderbook_history.orderbook_at(
+            self.db,
+            u'BITSTAMP_BTC_USD',
+            datetime(2018, 1, 1, 0, 0, 25),
+        )
+
+        ob.timestamp.should.equal(datetime(2018, 1, 1, 0, 0, 20))
+        ob.bids.should.equal(levels(BOOKS[2][0]))
+        ob.asks.should.equal(levels(BOOKS[2][1]))
+
+        # Exactly on a book's timestamp, and with an aware datetime.
+        ob = orderbook_history.orderbook_at(
+            self.db,
+            u'BITSTAMP_BTC_USD',
+            datetime(2018, 1, 1, 0, 0, 10, tzinfo=pytz.utc),
+        )
+
+        ob.bids.should.equal(levels(BOOKS[1][0]))
+
+        orderbook_history.orderbook_at(
+            self.db,
+            u'KRAKEN_BTC_EUR',
+            datetime(2018, 1, 1, 0, 0, 25),
+        ).should.equal(None)
+
+    def test_iter_orderbooks(self):
+        writer = orderbook_history.OrderbookHistoryWriter(keyframe_interval=2)
+        self.write_books(writer, step=10)
+        self.write_books(writer, exchange=u'KRAKEN_BTC_EUR', step=10)
+
+        obs = list(orderbook_history.iter_orderbooks(
+            self.db,
+            u'BITSTAMP_BTC_USD',
+            datetime(2018, 1, 1, 0, 0, 10),
+            datetime(2018, 1, 1, 0, 0, 20),
+        ))
+
+        [ob.timestamp for ob in obs].should.equal([
+            datetime(2018, 1, 1) + timedelta(seconds=10),
+            datetime(2018, 1, 1) + timedelta(seconds=20),
+        ])
+
+        [ob.exchange for ob in obs].should.equal([u'BITSTAMP_BTC_USD'] * 2)
+        obs[1].asks.should.equal(levels(BOOKS[2][1]))
+
+        obs = list(orderbook_history.iter_orderbooks(
+            self.db,
+            u'KRAKEN_BTC_EUR',
+            datetime(2018, 1, 1),
+            datetime(2018, 1, 2),
+            segments_per_query=1,
+        ))
+
+        len(obs).should.equal(len(BOOKS))
+        obs[-1].bids.should.equal(levels(BOOKS[-1][0]))
+
+    def test_appends_to_open_segment(self):
+        writer = orderbook_history.OrderbookHistoryWriter(keyframe_interval=3)
+
+        for i, (bids, asks) in enumerate(BOOKS):
+            writer.write(self.db, u'BITSTAMP_BTC_USD', [(START + i, book(bids, asks))])
+
+        segments = self.db.query(OrderbookSegment)\
+            .order_by(OrderbookSegment.start_time)\
+            .all()
+
+        [s.book_count for s in segments].should.equal([3, 1])
+        segments[0].end_time.should.equal(datetime(2018, 1, 1, 0, 0, 2))
+
+        obs = list(orderbook_history.iter_orderbooks(
+            self.db,
+            u'BITSTAMP_BTC_USD',
+            datetime(2018, 1, 1),
+            datetime(2018, 1, 2),
+        ))
+
+        [ob.bids for ob in obs].should.equal([levels(bids) for bids, asks in BOOKS])
+
+    def test_rolled_back_write(self):
+        writer = orderbook_history.OrderbookHistoryWriter()
+
+        writer.write(self.db, u'BITSTAMP_BTC_USD', [(START, book(*BOOKS[0]))])
+        self.db.commit()
+
+        writer.write(self.db, u'BITSTAMP_BTC_USD', [(START + 1, book(*BOOKS[1]))])
+        self.db.rollback()
+
+        writer.write(self.db, u'BITSTAMP_BTC_USD', [(START + 1, book(*BOOKS[1]))])
+        self.db.commit()
+
+        segment = self.db.query(OrderbookSegment).one()
+
+        segment.book_count.should.equal(2)
+        len(list(orderbook_history.iter_segment_books(segment.data))).should.equal(2)
+
+    def segment_timestamps(self):
+        segments = self.db.query(OrderbookSegment)\
+            .order_by(OrderbookSegment.start_time)\
+            .all()
+
+        return [
+            [b[0] - START for b in orderbook_history.iter_segment_books(s.data)]
+            for s in segments
+        ]
+
+    def test_late_book_goes_into_covering_segment(self):
+        writer = orderbook_history.OrderbookHistoryWriter(keyframe_interval=2)
+        books = [(START + i, book(*BOOKS[0])) for i in [0, 10, 20, 30]]
+
+        writer.write(self.db, u'BITSTAMP_BTC_USD', books)
+        writer.write(self.db, u'BITSTAMP_BTC_USD', [(START + 5, book(*BOOKS[1]))])
+
+        self.segment_timestamps().should.equal([[0, 5, 10], [20, 30]])
+
+        ob = orderbook_history.orderbook_at(
+            self.db,
+            u'BITSTAMP_BTC_USD',
+            datetime(2018, 1, 1, 0, 0, 7),
+        )
+
+        ob.bids.should.equal(levels(BOOKS[1][0]))
+
+        obs = list(orderbook_history.iter_orderbooks(
+            self.db,
+            u'BITSTAMP_BTC_USD',
+            datetime(2018, 1, 1),
+            datetime(2018, 1, 2),
+        ))
+
+        [ob.timestamp.second for ob in obs].should.equal([0, 5, 10, 20, 30])
+
+    def test_late_books_in_gaps(self):
+        writer = orderbook_history.OrderbookHistoryWriter(keyframe_interval=2)
+
+        writer.write(self.db, u'BITSTAMP_BTC_USD', [(START + 10, book(*BOOKS[0]))])
+        writer.write(self.db, u'BITSTAMP_BTC_USD', [(START + 3600, book(*BOOKS[0]))])
+
+        # Before every segment, after one with room, and after a segment in an
+        # earlier partition.
+        writer.write(self.db, u'BITSTAMP_BTC_USD', [
+            (START + 5, book(*BOOKS[1])),
+            (START + 15, book(*BOOKS[1])),
+            (START + 3599, book(*BOOKS[1])),
+        ])
+
+        self.segment_timestamps().should.equal([[5], [10, 15], [3599], [3600]])
+
+    def test_late_and_new_books_in_one_batch(self):
+        writer = orderbook_history.OrderbookHistoryWriter()
+
+        writer.write(self.db, u'BITSTAMP_BTC_USD', [(START + 10, book(*BOOKS[0]))])
+        writer.write(self.db, u'BITSTAMP_BTC_USD', [
+            (START + 20, book(*BOOKS[1])),
+            (START + 10.5, book(*BOOKS[1])),
+        ])
+
+        self.segment_timestamps().should.equal([[10, 10.5, 20]])
+
+    def test_bounds_keep_microseconds(self):
+        writer = orderbook_history.OrderbookHistoryWriter()
+
+        writer.write(self.db, u'BITSTAMP_BTC_USD', [
+            (START + 0.1, book(*BOOKS[0])),
+            (START + 0.4, book(*BOOKS[1])),
+            (START + 0.7, book(*BOOKS[2])),
+        ])
+
+        segment = self.db.query(OrderbookSegment).one()
+
+        segment.start_time.should.equal(datetime(2018, 1, 1, 0, 0, 0, 100000))
+        segment.end_time.should.equal(datetime(2018, 1, 1, 0, 0, 0, 700000))
+
+        # MySQL's DATETIME drops fractional seconds unless it's given a precision.
+        for column in [OrderbookSegment.start_time, OrderbookSegment.end_time]:
+            column.type.fsp.should.equal(6)
+
+        ob = orderbook_history.orderbook_at(
+            self.db,
+            u'BITSTAMP_BTC_USD',
+            datetime(2018, 1, 1, 0, 0, 0, 500000),
+        )
+
+        ob.bids.should.equal(levels(BOOKS[1][0]))
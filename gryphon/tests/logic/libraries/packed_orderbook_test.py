@@ -0,0 +1,216 @@
+import pyximport; pyximport.install()
+
+import unittest
+import sure
+import mock
+
+from cdecimal import Decimal
+
+from gryphon.lib.exchange import exceptions
+from gryphon.lib.exchange.bitstamp_btc_usd import BitstampBTCUSDExchange
+from gryphon.lib.exchange.exchange_order import Order
+from gryphon.lib.money import Money
+from gryphon.lib.packed_orderbook import pack_orderbook, pack_orderbook_views
+from gryphon.lib.packed_orderbook import PackedOrderbook, PackedOrderbookException
+
+
+class TestPackedOrderbook(unittest.TestCase):
+    def setUp(self):
+        self.orderbook = {
+            'bids': [['249.5', '1.25', ''], ['250', '0.00000001', '']],
+            'asks': [['251.01', '3', ''], ['252', 2.5, '']],
+        }
+
+    def test_round_trip(self):
+        packed = PackedOrderbook(pack_orderbook(self.orderbook, 1500000000.5, 7))
+
+        packed.timestamp.should.equal(1500000000.5)
+        packed.sequence.should.equal(7)
+        packed.bid_depth.should.equal(2)
+        packed.ask_depth.should.equal(2)
+
+        list(packed.bids()).should.equal([
+            (Decimal('250'), Decimal('0.00000001')),
+            (Decimal('249.5'), Decimal('1.25')),
+        ])
+
+        list(packed.asks()).should.equal([
+            (Decimal('251.01'), Decimal('3')),
+            (Decimal('252'), Decimal('2.5')),
+        ])
+
+    def test_scales(self):
+        packed = PackedOrderbook(pack_orderbook(self.orderbook, 0))
+
+        packed.price_scale.should.equal(2)
+        packed.volume_scale.should.equal(8)
+
+    def test_empty(self):
+        packed = PackedOrderbook(pack_orderbook({'bids': [], 'asks': []}, 0))
+
+        list(packed.bids()).should.equal([])
+        list(packed.asks()).should.equal([])
+
+    def test_bad_header(self):
+        PackedOrderbook.when.called_with('None').should.throw(PackedOrderbookException)
+
+    def test_truncated(self):
+        data = pack_orderbook(self.orderbook, 0)
+
+        PackedOrderbook.when.called_with(data[:-1]).should.throw(
+            PackedOrderbookException,
+        )
+
+    def test_too_precise(self):
+        orderbook = {'bids': [['1.0000000000000000001', '1']], 'asks': []}
+
+        pack_orderbook.when.called_with(orderbook, 0).should.throw(
+            PackedOrderbookException,
+        )
+
+    def test_views(self):
+        views = pack_orderbook_views(self.orderbook, 0, depths=(1,))
+
+        full = PackedOrderbook(views[None])
+        top = PackedOrderbook(views[1])
+
+        full.bid_depth.should.equal(2)
+        top.bid_depth.should.equal(1)
+        top.ask_depth.should.equal(1)
+
+        list(top.bids()).should.equal([(Decimal('250'), Decimal('0.00000001'))])
+        list(top.asks()).should.equal([(Decimal('251.01'), Decimal('3'))])
+
+    def test_total_volume(self):
+        packed = PackedOrderbook(pack_orderbook(self.orderbook, 0))
+
+        packed.total_bid_volume().should.equal(Decimal('1.25000001'))
+        packed.total_ask_volume().should.equal(Decimal('5.5'))
+
+
+class TestPackedCachedOrderbook(unittest.TestCase):
+    def setUp(self):
+        self.exchange = BitstampBTCUSDExchange()
+
+        self.orderbook = {
+            'bids': [['250', '1', ''], ['249', '1', ''], ['248', '1', '']],
+            'asks': [['251', '1', ''], ['252', '1', ''], ['253', '1', '']],
+        }
+
+    def test_parse_packed_orderbook(self):
+        packed = PackedOrderbook(pack_orderbook(self.orderbook, 0))
+
+        result = self.exchange.parse_packed_orderbook(packed)
+
+        result['bids'].should.equal([
+            Order(Money('250', 'USD'), Money('1', 'BTC'), self.exchange, Order.BID),
+            Order(Money('249', 'USD'), Money('1', 'BTC'), self.exchange, Order.BID),
+            Order(Money('248', 'USD'), Money('1', 'BTC'), self.exchange, Order.BID),
+        ])
+
+        len(result['asks']).should.equal(3)
+        result['asks'][0].price.should.equal(Money('251', 'USD'))
+
+    def test_volume_limit(self):
+        packed = PackedOrderbook(pack_orderbook(self.orderbook, 0))
+
+        result = self.exchange.parse_packed_orderbook(packed, Money('1.5', 'BTC'))
+
+        len(result['bids']).should.equal(2)
+        len(result['asks']).should.equal(2)
+
+    @mock.patch('gryphon.lib.exchange.exchange_api_wrapper.Delorean')
+    def test_cache_prefers_packed(self, mock_delorean):
+        mock_delorean.return_value.epoch = 1000
+        self.exchange._redis = mock.MagicMock()
+        self.exchange._redis.get.return_value = pack_orderbook(self.orderbook, 995)
+
+        result = self.exchange._get_orderbook_from_cache()
+
+        self.exchange._redis.get.assert_called_once_with('bitstamp_btc_usd_orderbook_packed')
+        result['time_fetched'].should.equal(995.0)
+        len(result['bids']).should.equal(3)
+
+    @mock.patch('gryphon.lib.exchange.exchange_api_wrapper.Delorean')
+    def test_stale_packed_orderbook(self, mock_delorean):
+        mock_delorean.return_value.epoch = 1000
+        self.exchange._redis = mock.MagicMock()
+        self.exchange._redis.get.return_value = pack_orderbook(self.orderbook, 900)
+
+        self.exchange._get_orderbook_from_cache.when.called_with().should.throw(
+            exceptions.CachedOrderbookFailure,
+        )
+
+    def test_depth(self):
+        packed = PackedOrderbook(pack_orderbook(self.orderbook, 0))
+
+        result = self.exchange.parse_packed_orderbook(packed, depth=1)
+
+        len(result['bids']).should.equal(1)
+        len(result['asks']).should.equal(1)
+
+    def test_parse_orderbook_depth(self):
+        result = self.exchange.parse_orderbook(self.orderbook, cached_orders=True, depth=2)
+
+        len(result['bids']).should.equal(2)
+        result['bids'][0].price.should.equal(Money('250', 'USD'))
+        len(result['asks']).should.equal(2)
+
+    @mock.patch('gryphon.lib.exchange.exchange_api_wrapper.Delorean')
+    def test_cache_uses_smallest_view(self, mock_delorean):
+        mock_delorean.return_value.epoch = 1000
+        self.exchange._redis = mock.MagicMock()
+        self.exchange._redis.get.return_value = pack_orderbook(self.orderbook, 995)
+
+        result = self.exchange._get_orderbook_from_cache(depth=10)
+
+        self.exchange._redis.get.assert_called_once_with(
+            'bitstamp_btc_usd_orderbook_packed_25',
+        )
+
+        len(result['bids']).should.equal(3)
+
+    @mock.patch('gryphon.lib.exchange.exchange_api_wrapper.Delorean')
+    def test_cache_skips_view_without_enough_volume(self, mock_delorean):
+        mock_delorean.return_value.epoch = 1000
+
+        orderbook = {
+            'bids': [[str(250 - i), '1', ''] for i in range(200)],
+            'asks': [[str(251 + i), '1', ''] for i in range(200)],
+        }
+
+        views = pack_orderbook_views(orderbook, 995)
+
+        redis_keys = {
+            'bitstamp_btc_usd_orderbook_packed': views[None],
+            'bitstamp_btc_usd_orderbook_packed_25': views[25],
+            'bitstamp_btc_usd_orderbook_packed_100': views[100],
+        }
+
+        self.exchange._redis = mock.MagicMock()
+        self.exchange._redis.get.side_effect = redis_keys.get
+
+        result = self.exchange._get_orderbook_from_cache(Money('50', 'BTC'))
+
+        self.exchange._redis.get.call_args_list.should.equal([
+            mock.call('bitstamp_btc_usd_orderbook_packed_25'),
+            mock.call('bitstamp_btc_usd_orderbook_packed_100'),
+        ])
+
+        len(result['bids']).should.equal(51)
+
+    @mock.patch('gryphon.lib.exchange.exchange_api_wrapper.Delorean')
+    def test_cache_falls_back_to_full_packed_book(self, mock_delorean):
+        mock_delorean.return_value.epoch = 1000
+
+        redis_keys = {
+            'bitstamp_btc_usd_orderbook_packed': pack_orderbook(self.orderbook, 995),
+            'bitstamp_btc_usd_orderbook_packed_25': 'None',
+        }
+
+        self.exchange._redis = mock.MagicMock()
+        self.exchange._redis.get.side_effect = redis_keys.get
+
+        result = self.exchange._get_orderbook_from_cache(depth=2)
+
+        len(result['bids']).should.equal(2)
@@ -0,0 +1,92 @@
+import pyximport; pyximport.install()
+
+import json
+import unittest
+import sure
+import mock
+
+from gryphon.lib.exchange.consts import Consts
+from gryphon.lib.gryphonfury import positions
+from gryphon.lib.models.exchange import Position
+from gryphon.lib.money import Money
+
+
+@mock.patch('gryphon.lib.gryphonfury.positions.commit_mysql_session')
+@mock.patch('gryphon.lib.gryphonfury.positions.fast_position')
+class TestPositionTracker(unittest.TestCase):
+    def setUp(self):
+        self.db = mock.MagicMock()
+        self.latest_checkpoint = self.db.query.return_value.filter.return_value\
+            .order_by.return_value.first
+        self.latest_checkpoint.return_value = None
+
+        self.last_trade_id = self.db.query.return_value.join.return_value\
+            .filter.return_value.scalar
+        self.last_trade_id.return_value = 41
+
+        self.tracker = positions.PositionTracker(self.db, 'MULTI')
+
+    def position_change(self, volume):
+        return Position({'BTC': Money(volume, 'BTC'), 'USD': Money('-1000', 'USD')})
+
+    def test_seeded_once(self, mock_fast_position, mock_commit):
+        mock_fast_position.return_value = Money('2', 'BTC')
+
+        self.tracker.position.should.equal(Money('2', 'BTC'))
+        self.tracker.position.should.equal(Money('2', 'BTC'))
+
+        mock_fast_position.call_count.should.equal(1)
+
+    def test_seeded_from_checkpoint(self, mock_fast_position, mock_commit):
+        self.latest_checkpoint.return_value = mock.Mock(
+            numeric_value=Money('3', 'BTC').amount,
+            meta_data=json.dumps({'trade_id': 41}),
+        )
+
+        mock_fast_position.return_value = Money('-1', 'BTC')
+
+        self.tracker.position.should.equal(Money('2', 'BTC'))
+
+        mock_fast_position.call_args[1]['after_trade_id'].should.equal(41)
+
+    def test_checkpoint_without_trade_id_not_used(self, mock_fast_position, mock_commit):
+        self.latest_checkpoint.return_value = mock.Mock(
+            numeric_value=Money('3', 'BTC').amount,
+            meta_data=json.dumps({}),
+        )
+
+        mock_fast_position.return_value = Money('2', 'BTC')
+
+        self.tracker.position.should.equal(Money('2', 'BTC'))
+
+        mock_fast_position.call_args[1].should_not.have.key('after_trade_id')
+
+    def test_apply(self, mock_fast_position, mock_commit):
+        mock_fast_position.return_value = Money('2', 'BTC')
+        self.tracker.seed()
+
+        self.tracker.apply('MULTI', self.position_change('0.5'))
+        self.tracker.apply('OTHER', self.position_change('10'))
+
+        self.tracker.position.should.equal(Money('2.5', 'BTC'))
+        mock_fast_position.call_count.should.equal(1)
+
+    def test_apply_before_seed(self, mock_fast_position, mock_commit):
+        self.tracker.apply('MULTI', self.position_change('0.5'))
+
+        self.tracker.is_seeded.should.equal(False)
+
+    def test_reconcile(self, mock_fast_position, mock_commit):
+        mock_fast_position.return_value = Money('2', 'BTC')
+        self.tracker.seed()
+        self.tracker.apply('MULTI', self.position_change('0.5'))
+
+        drift = self.tracker.reconcile()
+
+        drift.should.equal(Money('-0.5', 'BTC'))
+        self.tracker.position.should.equal(Money('2', 'BTC'))
+
+        checkpoint = self.db.add.call_args[0][0]
+        checkpoint.datum_type.should.equal('POSITION_CHECKPOINT_MULTI_BTC')
+        checkpoint.numeric_value.should.equal(Money('2', 'BTC').amount)
+        json.loads(checkpoint.meta_data).should.equal({'trade_id': 41})
@@ -0,0 +1,84 @@
+import pyximport; pyximport.install()
+
+import unittest
+import sure
+import mock
+
+from requests_toolbelt.cookies.forgetful import ForgetfulCookieJar
+
+from gryphon.lib.exchange import session_pool
+from gryphon.lib.exchange.bitstamp_btc_usd import BitstampBTCUSDExchange
+from gryphon.lib.exchange.bitstamp_eth_usd import BitstampETHUSDExchange
+from gryphon.lib.exchange.gemini_btc_usd import GeminiBTCUSDExchange
+from gryphon.lib.exchange.gemini_eth_usd import GeminiETHUSDExchange
+
+
+class TestSessionPool(unittest.TestCase):
+    def setUp(self):
+        self.patches = [
+            mock.patch.object(session_pool, '_sessions', {}),
+            mock.patch.object(session_pool, '_executor', None),
+            mock.patch.dict(session_pool._settings),
+        ]
+
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+
+    def test_one_session_per_host(self):
+        session = session_pool.get_session('https://api.gemini.com/v1')
+
+        session_pool.get_session('https://api.gemini.com/v1/book').should.be(session)
+        session_pool.get_session('https://api.kraken.com/0').shouldnt.be(session)
+
+    def test_shared_executor(self):
+        gemini = session_pool.get_session('https://api.gemini.com/v1')
+        kraken = session_pool.get_session('https://api.kraken.com/0')
+
+        gemini.executor.should.be(kraken.executor)
+
+    def test_connections_per_host(self):
+        session_pool.configure(connections_per_host=3)
+
+        session = session_pool.get_session('https://api.gemini.com/v1')
+        adapter = session.get_adapter('https://api.gemini.com/v1')
+
+        adapter._pool_maxsize.should.equal(3)
+        adapter._pool_block.should.equal(True)
+
+    def test_configure_after_use(self):
+        session_pool.get_session('https://api.gemini.com/v1')
+
+        session_pool.configure.when.called_with(max_workers=5).should.throw(
+            session_pool.SessionPoolException,
+        )
+
+    def test_configure_without_changes_after_use(self):
+        session_pool.get_session('https://api.gemini.com/v1')
+
+        session_pool.configure()
+        session_pool.configure(max_workers=session_pool.DEFAULT_MAX_WORKERS)
+
+    def test_cookie_jar_class(self):
+        session = session_pool.get_session(
+            'https://www.bitstamp.net/api/v2/',
+            cookie_jar_class=ForgetfulCookieJar,
+        )
+
+        session.cookies.should.be.a(ForgetfulCookieJar)
+        session_pool.get_session('https://www.bitstamp.net/').shouldnt.be(session)
+
+    def test_wrappers_share_sessions(self):
+        GeminiBTCUSDExchange().session.should.be(GeminiETHUSDExchange().session)
+        BitstampBTCUSDExchange().session.should.be(BitstampETHUSDExchange().session)
+
+        BitstampBTCUSDExchange().session.cookies.should.be.a(ForgetfulCookieJar)
+
+    def test_given_session(self):
+        session = mock.MagicMock()
+
+        GeminiBTCUSDExchange(session=session).session.should.be(session)
+        session_pool._sessions.should.equal({})
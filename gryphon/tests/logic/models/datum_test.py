@@ -0,0 +1,86 @@
+import pyximport; pyximport.install()
+
+import unittest
+import sure
+import mock
+
+from gryphon.execution.lib import tick_profiling
+from gryphon.lib.models.datum import DatumRecorder
+
+
+class TestDatumRecorder(unittest.TestCase):
+    def setUp(self):
+        self.db = mock.MagicMock()
+
+        # Bypass the singleton so we don't leave a mock db on the shared recorder.
+        self.recorder = DatumRecorder.__new__(DatumRecorder)
+
+    def test_unbuffered(self):
+        self.recorder.create(db=self.db)
+
+        self.recorder.record('TICK_TIME', numeric_value=1)
+
+        self.db.add.call_count.should.equal(1)
+        self.db.commit.call_count.should.equal(1)
+
+    def test_buffered(self):
+        self.recorder.create(db=self.db, buffered=True)
+
+        self.recorder.record('TICK_TIME', numeric_value=1)
+        self.recorder.record('TICK_TIME', numeric_value=2)
+
+        self.db.commit.called.should.equal(False)
+
+        self.recorder.flush()
+
+        datums = self.db.bulk_save_objects.call_args[0][0]
+        [d.numeric_value for d in datums].should.equal([1, 2])
+        self.db.commit.call_count.should.equal(1)
+
+        self.recorder.flush()
+        self.db.commit.call_count.should.equal(1)
+
+    def test_backpressure(self):
+        self.recorder.create(db=self.db, buffered=True, max_queue_size=2)
+
+        self.recorder.record('TICK_TIME', numeric_value=1)
+        self.recorder.record('TICK_TIME', numeric_value=2)
+        self.recorder.record('TICK_TIME', numeric_value=3)
+
+        self.recorder.backpressure_count.should.equal(1)
+        self.recorder.queue.should.have.length_of(1)
+
+    def test_failed_backpressure_flush(self):
+        self.recorder.create(db=self.db, buffered=True, max_queue_size=2)
+        self.db.commit.side_effect = Exception('gone away')
+
+        self.recorder.record('TICK_TIME', numeric_value=1)
+        self.recorder.record('TICK_TIME', numeric_value=2)
+
+        self.recorder.queue.should.equal([])
+        self.recorder.drain_counts().should.equal((1, 2))
+        self.recorder.drain_counts().should.equal((0, 0))
+
+    def test_failed_flush(self):
+        self.recorder.create(db=self.db, buffered=True)
+        self.db.commit.side_effect = Exception('gone away')
+
+        self.recorder.record('TICK_TIME', numeric_value=1)
+
+        self.recorder.flush.when.called_with().should.throw(Exception)
+
+        self.recorder.dropped_count.should.equal(1)
+        self.recorder.queue.should.equal([])
+
+    def test_record_datum_queue_data(self):
+        self.recorder.create(db=self.db, buffered=True)
+        self.recorder.backpressure_count = 3
+
+        with mock.patch.object(tick_profiling, 'DatumRecorder', return_value=self.recorder):
+            tick_profiling.record_datum_queue_data('arb')
+
+        [(d.datum_type, d.numeric_value) for d in self.recorder.queue].should.equal([
+            ('ARB_DATUM_BACKPRESSURE', 3),
+        ])
+
+        self.recorder.backpressure_count.should.equal(0)